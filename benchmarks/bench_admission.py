@@ -0,0 +1,120 @@
+"""Orchestrator behaviour under a tool outage and a burst, with and without admission control.
+
+outage: the tool hangs past its timeout. Without a circuit breaker every call
+waits for the timeout; with one, calls fail fast once the circuit opens.
+
+burst: many calls arrive at once at a tool whose latency grows with its load.
+A per-tool concurrency limit keeps the tool within its capacity.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_admission --calls 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_e2e import percentile
+from benchmarks.fakes import FakeHTTPServer
+from src.common.http_client import HTTPClientPool
+from src.orchestrator.admission import AdmissionController, AdmissionError
+from src.orchestrator.orchestrator import Orchestrator
+from src.registry.registry import Tool
+
+class LoadSensitiveTool:
+    """Tool endpoint whose latency grows quadratically once its in-flight requests exceed its capacity.
+
+    It can also be made to hang.
+    """
+
+    def __init__(self, base_latency: float, capacity: int):
+        self.base_latency = base_latency
+        self.capacity = capacity
+        self.hang = False
+        self.in_flight = 0
+        self.peak = 0
+        self.server = FakeHTTPServer(self.handle)
+
+    async def handle(self, method: str, target: str, body: bytes):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.hang:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(self.base_latency * max(1.0, self.in_flight / self.capacity) ** 2)
+            return 200, {"echo": json.loads(body or b"{}")}
+        finally:
+            self.in_flight -= 1
+
+async def drive(orchestrator: Orchestrator, tool: Tool, calls: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    outcomes = {"success": 0, "rejected": 0, "failed": 0}
+    remaining = iter(range(calls))
+
+    async def worker():
+        for index in remaining:
+            start = time.perf_counter()
+            try:
+                await orchestrator.execute_tool(tool, {"i": index})
+                outcomes["success"] += 1
+            except AdmissionError:
+                outcomes["rejected"] += 1
+            except Exception:
+                outcomes["failed"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "elapsed_s": time.perf_counter() - start,
+        **outcomes,
+        "latency_s": {"mean": sum(latencies) / len(latencies), "p50": percentile(latencies, 0.5),
+                      "p99": percentile(latencies, 0.99)}
+    }
+
+async def run(args) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"calls": args.calls, "concurrency": args.concurrency, "outage": {}, "burst": {}}
+    modes = {
+        "no_admission": None,
+        "admission": lambda: AdmissionController(max_concurrency=args.max_concurrency, min_calls=10,
+                                                 open_duration=60.0, queue_timeout=30.0)
+    }
+
+    for mode, make_admission in modes.items():
+        for scenario in ("outage", "burst"):
+            endpoint = LoadSensitiveTool(args.tool_latency, args.tool_capacity)
+            endpoint.hang = scenario == "outage"
+            await endpoint.server.start()
+            http_client = HTTPClientPool(max_connections_per_host=args.concurrency)
+            orchestrator = Orchestrator(http_client=http_client, lazy=True,
+                                        admission=make_admission() if make_admission else None)
+            tool = Tool("echo", "Echo", {}, {}, "", endpoint.server.url, timeout=args.tool_timeout)
+            try:
+                result = await drive(orchestrator, tool, args.calls, args.concurrency)
+                result.update(tool_requests=endpoint.server.requests, tool_peak_concurrency=endpoint.peak)
+                if orchestrator.admission is not None:
+                    result["admission"] = orchestrator.admission.stats()["echo"]
+                report[scenario][mode] = result
+            finally:
+                await http_client.close()
+                await endpoint.server.stop()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    parser.add_argument("--tool-capacity", type=int, default=8,
+                        help="In-flight requests the tool serves at its base latency")
+    parser.add_argument("--tool-timeout", type=float, default=1.0)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
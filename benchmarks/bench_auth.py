@@ -0,0 +1,50 @@
+"""Per-request cost of authenticate_request with and without the verified-token cache.
+
+Run from the repository root:
+
+    JWT_SECRET=bench python -m benchmarks.bench_auth --iterations 20000 --target-rps 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import timedelta
+from typing import Any, Dict
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from src.security import auth
+
+async def measure(token: str, iterations: int, cached: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            auth.token_cache.entries.clear()
+        await auth.authenticate_request(token)
+    return (time.perf_counter() - start) / iterations
+
+async def run(args) -> Dict[str, Any]:
+    token = auth.create_access_token({"sub": "bench"}, expires_delta=timedelta(minutes=30))
+    report = {"iterations": args.iterations, "target_rps": args.target_rps}
+
+    for name, cached in (("full_decode", False), ("cached", True)):
+        per_request = await measure(token, args.iterations, cached)
+        report[name] = {
+            "us_per_request": per_request * 1e6,
+            # Share of one core spent on auth at the target request rate
+            "cpu_share_at_target_rps": per_request * args.target_rps
+        }
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--target-rps", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
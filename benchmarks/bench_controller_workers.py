@@ -0,0 +1,144 @@
+"""Controller throughput with one or more worker processes sharing a catalog snapshot.
+
+The controller runs under uvicorn --workers N against a local registry
+directory holding --tools tools, with the workers sharing one catalog
+snapshot. A closed loop of clients calls /execute_tool on endpoint tools that
+answer with a payload of about --payload-bytes, so every request costs the
+controller a decode and an encode of the payload. For every worker count the
+report gives RPS and latency percentiles, and per worker process how often it
+read storage and loaded the snapshot. Throughput can only scale up to the
+number of CPU cores available to the controller and this load generator.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_controller_workers --workers 1,2,4 --payload-bytes 200000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from typing import Any, Dict, List
+
+import httpx
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from benchmarks.bench_e2e import _free_port, run_level, wait_ready
+from benchmarks.fakes import FakeHTTPServer
+from src.registry.storage import INDEX_BLOB, LocalRegistryStorage, tool_blob_name
+from src.security.auth import create_access_token
+
+def make_payload(size: int) -> bytes:
+    """A tool result of nested records, about size bytes of JSON."""
+    record = {"id": 0, "name": "item", "tags": ["a", "b", "c"], "score": 0.5, "nested": {"x": 0, "y": "0"}}
+    count = max(1, size // len(json.dumps(record)))
+    return json.dumps({"rows": [dict(record, id=index) for index in range(count)]}).encode("utf-8")
+
+def seed_registry(root: str, tool_count: int, tool_url: str):
+    """Write the tools to a local registry directory in the per-tool layout."""
+    storage = LocalRegistryStorage(root)
+    index = {}
+    for number in range(tool_count):
+        tool = {
+            "name": f"tool_{number}",
+            "description": f"Benchmark tool {number}",
+            "parameters": {"type": "object", "properties": {"i": {"type": "integer"}}},
+            "returns": {},
+            "container_image": "",
+            "endpoint": tool_url
+        }
+        data = json.dumps(tool, sort_keys=True).encode("utf-8")
+        storage.put(tool_blob_name(tool["name"]), data)
+        index[tool["name"]] = hashlib.sha256(data).hexdigest()[:16]
+    storage.put(INDEX_BLOB, json.dumps({"tools": index}).encode("utf-8"))
+
+async def worker_stats(client: httpx.AsyncClient, url: str, workers: int, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Registry stats of each worker process, sampled until every worker has answered."""
+    stats: Dict[int, Dict[str, Any]] = {}
+    for _ in range(workers * 50):
+        # A new connection each time, so the samples reach different workers
+        response = await client.get(f"{url}/registry/stats", headers=dict(headers, Connection="close"))
+        stats[response.json()["pid"]] = response.json()
+        if len(stats) == workers:
+            break
+    return sorted(stats.values(), key=lambda worker: worker["pid"])
+
+async def run(args) -> Dict[str, Any]:
+    payload = make_payload(args.payload_bytes)
+
+    async def handle(method: str, target: str, body: bytes):
+        return 200, payload
+
+    tool = await FakeHTTPServer(handle).start()
+    token = create_access_token({"sub": "bench"}, expires_delta=timedelta(hours=12))
+    headers = {"Authorization": f"Bearer {token}"}
+    report: Dict[str, Any] = {
+        "cpus": os.cpu_count(),
+        "payload_bytes": len(payload),
+        "tools": args.tools,
+        "runs": []
+    }
+
+    async def send(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post(f"{url}/execute_tool", params={"tool_name": f"tool_{index % args.tools}"},
+                                 json={"i": index}, headers=headers)
+
+    with tempfile.TemporaryDirectory() as root:
+        seed_registry(os.path.join(root, "registry"), args.tools, tool.url)
+        try:
+            for workers in args.workers:
+                port = _free_port()
+                url = f"http://127.0.0.1:{port}"
+                env = dict(os.environ)
+                env.update({
+                    "REGISTRY_STORAGE_PATH": os.path.join(root, "registry"),
+                    "REGISTRY_SNAPSHOT_PATH": os.path.join(root, f"catalog-{workers}.snapshot")
+                })
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "src.controller.controller:app", "--host", "127.0.0.1",
+                     "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+                    env=env, stdout=subprocess.DEVNULL,
+                    stderr=None if os.getenv("BENCH_VERBOSE") else subprocess.DEVNULL
+                )
+                try:
+                    await wait_ready(url, process)
+                    limits = httpx.Limits(max_connections=args.concurrency + 10)
+                    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+                        # Warm up connections, every worker and lazily created state
+                        await run_level(client, send, args.warmup, min(args.warmup, args.concurrency) or 1)
+                        result = await run_level(client, send, args.requests, args.concurrency)
+                        result.update(workers=workers, concurrency=args.concurrency,
+                                      worker_registries=await worker_stats(client, url, workers, headers))
+                    report["runs"].append(result)
+                finally:
+                    process.terminate()
+                    process.wait()
+        finally:
+            await tool.stop()
+
+    baseline = report["runs"][0]["rps"]
+    for result in report["runs"]:
+        result["speedup"] = result["rps"] / baseline
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=lambda value: [int(count) for count in value.split(",")],
+                        default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--payload-bytes", type=int, default=200000)
+    parser.add_argument("--tools", type=int, default=200, help="Tools in the catalog")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""End-to-end throughput and latency of /agent/execute and /execute_tool against local stand-ins.
+
+The gateway and the controller run as separate processes (see e2e_service),
+with fake OpenAI, fake blob storage, fake Kubernetes and stub tool endpoints.
+Each latency is a distribution (see benchmarks.fakes.parse_latency). For every
+target, plan shape and concurrency level, a closed loop of clients sends
+requests and the report gives RPS, latency percentiles and the mean duration
+of each phase, taken from the services' /metrics.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_e2e --concurrency 1,8,32 --shapes chain,wide --output e2e.json
+    python -m benchmarks.bench_e2e --compare e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from benchmarks.bench_execution import chain_plan, diamond_plan, wide_plan
+from benchmarks.fakes import fake_openai, fake_tool, parse_latency
+from src.security.auth import create_access_token
+
+SHAPES = {"chain": chain_plan, "diamond": diamond_plan, "wide": wide_plan}
+REQUEST_PATTERN = re.compile(r"run (\w+) plan of (\d+) steps")
+PHASE_PATTERN = re.compile(r'^mcp_phase_duration_seconds_(sum|count)\{phase="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def benchmark_tools(tool_url: str) -> List[Dict[str, Any]]:
+    parameters = {"type": "object", "properties": {"i": {"type": "integer"}}}
+    return [
+        {"name": "echo", "description": "Echo the parameters", "parameters": parameters, "returns": {},
+         "container_image": "", "endpoint": tool_url},
+        {"name": "container_echo", "description": "Echo the parameters in a job", "parameters": parameters,
+         "returns": {}, "container_image": "echo:latest", "endpoint": None}
+    ]
+
+def make_llm_reply(container_every: int):
+    """Planning prompts get a plan of the shape named in the request; feedback prompts an analysis."""
+    def reply(prompt: str) -> str:
+        match = REQUEST_PATTERN.search(prompt)
+        if "Create a plan" in prompt and match:
+            plan = SHAPES[match.group(1)](int(match.group(2)))
+            for index, step in enumerate(plan):
+                if container_every and index % container_every == container_every - 1:
+                    step["tool_name"] = "container_echo"
+            return json.dumps(plan)
+        return json.dumps({"user_response": "Done.", "success": True, "issues": [], "improvements": []})
+
+    return reply
+
+def parse_phases(metrics: str) -> Dict[str, Tuple[float, float]]:
+    phases: Dict[str, List[float]] = {}
+    for kind, phase, value in PHASE_PATTERN.findall(metrics):
+        phases.setdefault(phase, [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return {phase: (total, count) for phase, (total, count) in phases.items()}
+
+async def scrape_phases(client: httpx.AsyncClient, urls: List[str]) -> Dict[str, Tuple[float, float]]:
+    phases: Dict[str, Tuple[float, float]] = {}
+    for url in urls:
+        response = await client.get(f"{url}/metrics")
+        phases.update(parse_phases(response.text))
+    return phases
+
+def phase_breakdown(before: Dict[str, Tuple[float, float]], after: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    breakdown = {}
+    for phase, (total, count) in after.items():
+        previous_total, previous_count = before.get(phase, (0.0, 0.0))
+        if count > previous_count:
+            breakdown[phase] = {
+                "count": int(count - previous_count),
+                "mean_s": (total - previous_total) / (count - previous_count)
+            }
+    return breakdown
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Service at {url} exited with {process.returncode}")
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"Service at {url} did not become ready within {timeout}s")
+
+def start_service(name: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.e2e_service", name, "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if os.getenv("BENCH_VERBOSE") else subprocess.DEVNULL
+    )
+
+async def run_level(client: httpx.AsyncClient, send, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send the requests from a closed loop of concurrent clients."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            start = time.perf_counter()
+            try:
+                response = await send(client, index)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": requests / elapsed,
+        "latency_s": {
+            "mean": sum(latencies) / len(latencies),
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies)
+        }
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Relative change of RPS and p95 for the runs present in both reports."""
+    def key(run):
+        return run["target"], run["shape"], run["concurrency"]
+
+    previous = {key(run): run for run in baseline["runs"]}
+    changes = []
+    for run in report["runs"]:
+        old = previous.get(key(run))
+        if old is None:
+            continue
+        changes.append({
+            "target": run["target"], "shape": run["shape"], "concurrency": run["concurrency"],
+            "rps_change": run["rps"] / old["rps"] - 1 if old["rps"] else None,
+            "p95_change": run["latency_s"]["p95"] / old["latency_s"]["p95"] - 1 if old["latency_s"]["p95"] else None
+        })
+    return changes
+
+async def run(args) -> Dict[str, Any]:
+    llm = await fake_openai(latency=parse_latency(args.llm_latency), reply=make_llm_reply(args.container_every)).start()
+    tool = await fake_tool(latency=parse_latency(args.tool_latency)).start()
+    gateway_port, controller_port = _free_port(), _free_port()
+    gateway_url, controller_url = f"http://127.0.0.1:{gateway_port}", f"http://127.0.0.1:{controller_port}"
+
+    token = create_access_token({"sub": "bench"}, expires_delta=timedelta(hours=12))
+    env = dict(os.environ)
+    env.update({
+        "BENCH_CONFIG": json.dumps({
+            "tools": benchmark_tools(tool.url),
+            "blob_latency": args.blob_latency,
+            "job_latency": args.job_latency
+        }),
+        "AZURE_OPENAI_ENDPOINT": llm.url,
+        "AZURE_OPENAI_KEY": "bench-key",
+        "MCP_CONTROLLER_URL": controller_url,
+        "MCP_CONTROLLER_TOKEN": token,
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        "REGISTRY_REFRESH_INTERVAL": "0"
+    })
+    processes = [start_service("controller", controller_port, env), start_service("gateway", gateway_port, env)]
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "runs": []
+    }
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def send_agent(client: httpx.AsyncClient, shape: str, index: int) -> httpx.Response:
+        # A distinct request per call so every run plans, unless plan cache hits are wanted
+        nonce = "" if args.cached_plans else f" #{uuid.uuid4().hex[:8]}"
+        request = f"Please run {shape} plan of {args.steps} steps{nonce}"
+        return await client.post(f"{gateway_url}/agent/execute", json={"request": request}, headers=headers)
+
+    async def send_tool(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post(f"{controller_url}/execute_tool", params={"tool_name": "echo"},
+                                 json={"i": index}, headers=headers)
+
+    try:
+        await asyncio.gather(wait_ready(controller_url, processes[0]), wait_ready(gateway_url, processes[1]))
+        limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            cases = []
+            if "agent" in args.targets:
+                cases += [("agent", shape, lambda c, i, shape=shape: send_agent(c, shape, i)) for shape in args.shapes]
+            if "tool" in args.targets:
+                cases.append(("tool", "single", send_tool))
+
+            for target, shape, send in cases:
+                # Warm up connections and lazily created state
+                await run_level(client, send, args.warmup, min(args.warmup, max(args.concurrency)) or 1)
+                for concurrency in args.concurrency:
+                    before = await scrape_phases(client, [gateway_url, controller_url])
+                    result = await run_level(client, send, args.requests, concurrency)
+                    after = await scrape_phases(client, [gateway_url, controller_url])
+                    result.update(target=target, shape=shape, concurrency=concurrency,
+                                  phases=phase_breakdown(before, after))
+                    report["runs"].append(result)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        await llm.stop()
+        await tool.stop()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=lambda value: value.split(","), default=["agent", "tool"])
+    parser.add_argument("--shapes", type=lambda value: value.split(","), default=["chain", "wide"])
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--llm-latency", default="lognormal:0.3,0.3")
+    parser.add_argument("--tool-latency", default="uniform:0.01,0.05")
+    parser.add_argument("--blob-latency", default="0.02")
+    parser.add_argument("--job-latency", default="uniform:0.5,1.5")
+    parser.add_argument("--container-every", type=int, default=0,
+                        help="Make every Nth step a container tool run on fake Kubernetes (0 for none)")
+    parser.add_argument("--llm-concurrency", type=int, default=64)
+    parser.add_argument("--cached-plans", action="store_true", help="Repeat identical requests so plans are cached")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--compare", help="Report changes against an earlier report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Wall-clock of ExecutionEngine.execute_plan for wide vs. chain-shaped plans.
+
+Each plan shape is run with one /execute_tool call per step and with
+independent steps batched through /execute_tools; controller requests per
+plan are reported for both.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_execution --steps 6 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fakes import fake_controller
+from src.ai.execution import ExecutionEngine
+
+def wide_plan(steps: int) -> List[Dict[str, Any]]:
+    """All steps independent of each other."""
+    return [{"tool_name": "echo", "parameters": {"i": i}, "depends_on": []} for i in range(steps)]
+
+def chain_plan(steps: int) -> List[Dict[str, Any]]:
+    """Every step depends on the previous one."""
+    return [{"tool_name": "echo", "parameters": {"i": i}} for i in range(steps)]
+
+def diamond_plan(steps: int) -> List[Dict[str, Any]]:
+    """A root step, independent middle steps and a final step joining them."""
+    middle = list(range(2, steps))
+    plan = [{"tool_name": "echo", "parameters": {"i": 0}, "depends_on": []}]
+    plan += [{"tool_name": "echo", "parameters": {"i": i}, "depends_on": [1]} for i in middle]
+    plan.append({"tool_name": "echo", "parameters": {"i": steps}, "depends_on": middle})
+    return plan
+
+async def run(args) -> Dict[str, Any]:
+    server = await fake_controller(latency=args.latency).start()
+    report = {"steps": args.steps, "latency": args.latency, "plans": {}}
+
+    try:
+        for mode, batch_window in (("per_step", None), ("batched", args.batch_window)):
+            engine = ExecutionEngine(server.url, "bench-token", max_plan_concurrency=args.plan_concurrency,
+                                     batch_window=batch_window)
+            try:
+                for name, build in (("chain", chain_plan), ("diamond", diamond_plan), ("wide", wide_plan)):
+                    timings = []
+                    requests_before = server.requests
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        results = await engine.execute_plan(build(args.steps))
+                        timings.append(time.perf_counter() - start)
+                        assert all("error" not in result for result in results)
+                    report["plans"].setdefault(name, {})[mode] = {
+                        "best": min(timings),
+                        "mean": sum(timings) / len(timings),
+                        "requests_per_plan": (server.requests - requests_before) / args.repeat
+                    }
+            finally:
+                await engine.http_client.close()
+    finally:
+        await server.stop()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--plan-concurrency", type=int, default=4)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
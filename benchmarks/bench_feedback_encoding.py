@@ -0,0 +1,118 @@
+"""Analysis prompt size, build time, memory and latency with compact result encoding vs. the indented dump.
+
+Runs have a few small steps and one step returning a large payload (a list of
+records with long text fields). The LLM stand-in's latency grows with the
+prompt size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_feedback_encoding --records 2000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from src.ai.feedback import FeedbackLoop
+from src.ai.tool_selection import estimate_tokens
+
+class IndentedDumpFeedbackLoop(FeedbackLoop):
+    """The previous prompt layout: the whole plan and all results dumped with indent=2."""
+
+    def _build_prompt(self, user_request: str, plan: List[Dict[str, Any]],
+                      results: List[Dict[str, Any]]) -> str:
+        return f"""
+            User Request: {user_request}
+
+            Plan:
+            {json.dumps(plan, indent=2)}
+
+            Execution Results:
+            {json.dumps(results, indent=2)}
+
+            Return your analysis as a JSON object.
+            """
+
+class PromptSizedLLM:
+    """LLM stand-in whose latency grows with the prompt size."""
+
+    def __init__(self, base_latency: float, per_1k_tokens: float):
+        self.base_latency = base_latency
+        self.per_1k_tokens = per_1k_tokens
+
+    async def complete(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                       model: str = None) -> str:
+        await asyncio.sleep(self.base_latency + self.per_1k_tokens * estimate_tokens(prompt) / 1000)
+        return json.dumps({"user_response": "Done.", "success": True, "issues": [], "improvements": []})
+
+def synthetic_run(records: int, text_chars: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    plan = [
+        {"tool_name": "search_orders", "parameters": {"account_id": "42"}, "depends_on": []},
+        {"tool_name": "get_customer", "parameters": {"customer_id": "7"}, "depends_on": []},
+        {"tool_name": "summarize_orders", "parameters": {"orders": "${steps.1.result}"}, "depends_on": [1, 2]}
+    ]
+    large = [
+        {"id": index, "status": "shipped", "total": index * 1.5, "notes": "lorem ipsum " * (text_chars // 12)}
+        for index in range(records)
+    ]
+    results = [
+        {"step": 1, "tool_name": "search_orders", "parameters": plan[0]["parameters"],
+         "result": {"status": "success", "result": {"orders": large}}, "execution_time": 0.4},
+        {"step": 2, "tool_name": "get_customer", "parameters": plan[1]["parameters"],
+         "result": {"status": "success", "result": {"name": "Ada", "tier": "gold"}}, "execution_time": 0.1},
+        {"step": 3, "tool_name": "summarize_orders", "parameters": {"orders": large},
+         "error": "Payload too large for summarizer"}
+    ]
+    return plan, results
+
+async def measure(feedback: FeedbackLoop, plan, results, repeat: int) -> Dict[str, Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    prompt = feedback._build_prompt("Summarize my recent orders", plan, results)
+    build_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await feedback.analyze_results("Summarize my recent orders", plan, results)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "prompt_chars": len(prompt),
+        "prompt_tokens": estimate_tokens(prompt),
+        "build_ms": build_time * 1000,
+        "build_peak_memory_kb": peak / 1024,
+        "mean_analysis_latency_s": sum(latencies) / len(latencies)
+    }
+
+async def run(args) -> Dict[str, Any]:
+    plan, results = synthetic_run(args.records, args.text_chars)
+    llm = PromptSizedLLM(args.base_latency, args.latency_per_1k_tokens)
+    indented = await measure(IndentedDumpFeedbackLoop("", "", llm=llm), plan, results, args.repeat)
+    compact = await measure(FeedbackLoop("", "", llm=llm), plan, results, args.repeat)
+    return {
+        "records": args.records,
+        "text_chars": args.text_chars,
+        "indented_dump": indented,
+        "compact": compact,
+        "prompt_token_reduction": 1 - compact["prompt_tokens"] / indented["prompt_tokens"],
+        "latency_reduction": 1 - compact["mean_analysis_latency_s"] / indented["mean_analysis_latency_s"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--text-chars", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.01,
+                        help="Added LLM latency per 1000 prompt tokens, in seconds")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Requests/sec and latency of per-call httpx clients vs. the shared HTTPClientPool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_http_clients --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.fakes import fake_controller
+from src.common.http_client import HTTPClientPool
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def per_call_client(url: str):
+    # What ExecutionEngine and Orchestrator did before the shared pool
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json={"x": 1}, timeout=30.0)
+        response.raise_for_status()
+
+def pooled_client(pool: HTTPClientPool) -> Callable:
+    async def call(url: str):
+        response = await pool.post(url, json={"x": 1}, timeout=30.0)
+        response.raise_for_status()
+    return call
+
+async def load(call: Callable, url: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call(url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000
+    }
+
+async def run(args) -> Dict[str, Any]:
+    server = await fake_controller(latency=args.latency).start()
+    url = f"{server.url}/execute_tool"
+    pool = HTTPClientPool(max_connections_per_host=args.concurrency)
+    report = {"requests": args.requests, "concurrency": args.concurrency}
+
+    try:
+        connections = server.connections
+        report["per_call_client"] = await load(per_call_client, url, args.requests, args.concurrency)
+        report["per_call_client"]["connections"] = server.connections - connections
+
+        connections = server.connections
+        report["pooled_client"] = await load(pooled_client(pool), url, args.requests, args.concurrency)
+        report["pooled_client"]["connections"] = server.connections - connections
+    finally:
+        await pool.close()
+        await server.stop()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Check that concurrent plan requests overlap on the event loop instead of serializing.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_llm_concurrency --requests 8 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+from benchmarks.fakes import fake_openai
+from src.ai.llm import LLMClient
+from src.ai.planning import PlanningModule
+
+TOOLS = [{"name": "echo", "description": "Echo the input", "parameters": {"text": "string"}, "returns": {}}]
+PLAN = json.dumps([{"tool_name": "echo", "parameters": {"text": "hi"}, "depends_on": []}])
+
+async def run(args) -> Dict[str, Any]:
+    server = await fake_openai(latency=args.latency, reply=lambda prompt: PLAN).start()
+    llm = LLMClient(api_key="fake", endpoint=server.url, max_concurrency=args.max_concurrency)
+    planning = PlanningModule(api_key="fake", endpoint=server.url, llm=llm)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(planning.create_plan(f"request {i}", TOOLS) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await llm.close()
+        await server.stop()
+
+    serialized = args.requests * args.latency
+    return {
+        "requests": args.requests,
+        "llm_latency": args.latency,
+        "wall_clock": elapsed,
+        "serialized_wall_clock": serialized,
+        "overlapped": elapsed < serialized / 2
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
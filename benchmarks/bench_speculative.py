@@ -0,0 +1,123 @@
+"""Plan-to-results latency with steps executed only after planning vs. speculatively while the plan streams.
+
+The LLM stand-in streams the plan text in small chunks after a time to first
+token, so later steps are generated while earlier ones already run against a
+fake MCP controller. A plan whose last step names an unknown tool checks that
+the speculatively started steps are cancelled when the plan is rejected.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_speculative --steps 6 --tool-latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_execution import chain_plan, wide_plan
+from benchmarks.fakes import fake_controller
+from src.ai.execution import ExecutionEngine
+from src.ai.planning import PlanningModule
+from src.registry.registry import ToolCatalog
+
+TOOLS = [{"name": "echo", "description": "Echo the parameters", "parameters": {}, "returns": {}}]
+
+class StreamingLLM:
+    """LLM stand-in generating a fixed plan at a steady rate of characters per second."""
+
+    def __init__(self, first_token: float, chars_per_second: float, chunk_chars: int = 16):
+        self.first_token = first_token
+        self.chars_per_second = chars_per_second
+        self.chunk_chars = chunk_chars
+        self.text = "[]"
+
+    async def stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000, model: str = None):
+        await asyncio.sleep(self.first_token)
+        for offset in range(0, len(self.text), self.chunk_chars):
+            chunk = self.text[offset:offset + self.chunk_chars]
+            await asyncio.sleep(len(chunk) / self.chars_per_second)
+            yield chunk
+
+    async def complete(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                       model: str = None) -> str:
+        return "".join([chunk async for chunk in self.stream(prompt)])
+
+async def sequential(planning: PlanningModule, engine: ExecutionEngine, catalog: ToolCatalog) -> List[Dict[str, Any]]:
+    plan = await planning.create_plan("bench", catalog)
+    return await engine.execute_plan(plan)
+
+async def speculative(planning: PlanningModule, engine: ExecutionEngine, catalog: ToolCatalog) -> List[Dict[str, Any]]:
+    run = engine.start_plan()
+    try:
+        async for event in planning.stream_plan("bench", catalog):
+            if event["type"] == "step":
+                run.add_step(event["step"])
+            elif event["type"] == "restart":
+                run.cancel()
+                run = engine.start_plan()
+    except BaseException:
+        run.cancel()
+        raise
+    return await run.gather()
+
+async def run(args) -> Dict[str, Any]:
+    server = await fake_controller(latency=args.tool_latency).start()
+    llm = StreamingLLM(args.first_token, args.chars_per_second)
+    planning = PlanningModule("", "", llm=llm)
+    engine = ExecutionEngine(server.url, "bench-token", max_plan_concurrency=args.steps)
+    catalog = ToolCatalog(1, TOOLS)
+    report: Dict[str, Any] = {"steps": args.steps, "plans": {}}
+
+    try:
+        for name, build in (("chain", chain_plan), ("wide", wide_plan)):
+            llm.text = json.dumps(build(args.steps), indent=2)
+            for mode, execute in (("sequential", sequential), ("speculative", speculative)):
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    results = await execute(planning, engine, catalog)
+                    timings.append(time.perf_counter() - start)
+                    assert len(results) == args.steps and all("error" not in result for result in results)
+                report["plans"].setdefault(name, {})[mode] = {
+                    "best_s": min(timings), "mean_s": sum(timings) / len(timings)
+                }
+            plan = report["plans"][name]
+            plan["latency_reduction"] = 1 - plan["speculative"]["mean_s"] / plan["sequential"]["mean_s"]
+
+        # A plan rejected at its last step
+        rejected = wide_plan(args.steps)
+        rejected[-1]["tool_name"] = "missing_tool"
+        llm.text = json.dumps(rejected, indent=2)
+        requests_before = server.requests
+        try:
+            await speculative(planning, engine, catalog)
+            report["rejected_plan"] = {"rejected": False}
+        except ValueError as e:
+            # Give cancelled requests a chance to be observed by the server
+            await asyncio.sleep(args.tool_latency)
+            report["rejected_plan"] = {
+                "rejected": True,
+                "error": str(e),
+                "steps_started": server.requests - requests_before
+            }
+    finally:
+        await engine.http_client.close()
+        await server.stop()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=6)
+    parser.add_argument("--tool-latency", type=float, default=0.3)
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--chars-per-second", type=float, default=400.0,
+                        help="Plan generation rate; about 100 tokens per second by default")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
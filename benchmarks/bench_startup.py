@@ -0,0 +1,105 @@
+"""Startup time of the gateway and controller: import time, time to listen and time to ready.
+
+Each service is started with uvicorn in a subprocess using the local fallbacks
+(local registry storage, JWT secret from the environment, no Kubernetes), and
+/healthz and /ready are polled until they answer 200.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+SERVICES = {
+    "gateway": "src.api.gateway",
+    "controller": "src.controller.controller"
+}
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import(module: str, env: Dict[str, str]) -> float:
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def _wait_for(url: str, deadline: float, poll_interval: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(poll_interval)
+    return False
+
+def measure_startup(module: str, env: Dict[str, str], timeout: float, poll_interval: float) -> Dict[str, float]:
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        base_url = f"http://127.0.0.1:{port}"
+        if not _wait_for(f"{base_url}/healthz", deadline, poll_interval):
+            raise RuntimeError(f"{module} did not start listening within {timeout}s")
+        listening = time.perf_counter() - start
+        if not _wait_for(f"{base_url}/ready", deadline, poll_interval):
+            raise RuntimeError(f"{module} did not become ready within {timeout}s")
+        return {"listening_s": listening, "ready_s": time.perf_counter() - start}
+    finally:
+        process.terminate()
+        process.wait()
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+def run(args) -> Dict[str, Any]:
+    storage = tempfile.mkdtemp(prefix="mcp-registry-")
+    env = dict(os.environ)
+    env.setdefault("JWT_SECRET", "bench-secret")
+    env.setdefault("REGISTRY_STORAGE_PATH", storage)
+    # Without a kubeconfig the controller starts with container tools disabled
+    env.setdefault("KUBECONFIG", os.path.join(storage, "missing-kubeconfig"))
+
+    report: Dict[str, Any] = {"runs": args.runs}
+    for name, module in SERVICES.items():
+        imports, listening, ready = [], [], []
+        for _ in range(args.runs):
+            imports.append(measure_import(module, env))
+            startup = measure_startup(module, env, args.timeout, args.poll_interval)
+            listening.append(startup["listening_s"])
+            ready.append(startup["ready_s"])
+        report[name] = {
+            "import_s": summarize(imports),
+            "listening_s": summarize(listening),
+            "ready_s": summarize(ready)
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--poll-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
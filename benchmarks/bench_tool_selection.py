@@ -0,0 +1,166 @@
+"""Prompt tokens and planning latency with and without tool pre-selection on a synthetic catalog.
+
+The LLM stand-in answers with a plan using the tools the request was written
+for, after a latency that grows with the prompt size, so plans that need a tool
+the selection missed fail validation and exercise the full-catalog fallback.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tool_selection --tools 500 --requests 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from src.ai.planning import PlanningModule
+from src.ai.tool_selection import ToolSelector, estimate_tokens
+from src.registry.registry import ToolCatalog
+
+DOMAINS = [
+    "invoice", "customer", "order", "shipment", "product", "warehouse", "employee", "payroll", "ticket",
+    "incident", "repository", "pipeline", "database", "bucket", "certificate", "calendar", "email", "document",
+    "spreadsheet", "weather", "stock", "currency", "flight", "hotel", "contract"
+]
+ACTIONS = [
+    "create", "get", "list", "update", "delete", "search", "export", "import", "summarize", "translate",
+    "validate", "archive", "restore", "approve", "reject", "assign", "notify", "schedule", "forecast", "audit"
+]
+
+def synthetic_catalog(size: int) -> List[Dict[str, Any]]:
+    tools = []
+    for domain in DOMAINS:
+        for action in ACTIONS:
+            name = f"{action}_{domain}"
+            tools.append({
+                "name": name,
+                "description": f"{action.capitalize()} {domain} records in the {domain} management system. "
+                               f"Use this tool when the user wants to {action} one or more {domain}s; it "
+                               f"returns the affected {domain} records with their identifiers and metadata.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        f"{domain}_id": {"type": "string", "description": f"Identifier of the {domain}"},
+                        "account_id": {"type": "string", "description": "Account that owns the records"},
+                        "filters": {"type": "object", "description": f"Optional filters to {action} by"},
+                        "limit": {"type": "integer", "description": "Maximum number of records"}
+                    },
+                    "required": [f"{domain}_id"]
+                },
+                "returns": {"type": "object"}
+            })
+    return tools[:size]
+
+def synthetic_requests(tools: List[Dict[str, Any]], count: int, seed: int) -> List[Dict[str, Any]]:
+    """Requests needing one or two tools, phrased the way users ask rather than by tool name."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        targets = rng.sample(tools, rng.choice((1, 1, 2)))
+        clauses = []
+        for tool in targets:
+            action, domain = tool["name"].split("_", 1)
+            clauses.append(f"{action} the {domain}s for account {rng.randint(1, 999)}")
+        requests.append({"request": "Please " + " and then ".join(clauses), "targets": [t["name"] for t in targets]})
+    return requests
+
+class PromptSizedLLM:
+    """LLM stand-in whose latency grows with the prompt, planning the request's target tools."""
+
+    def __init__(self, base_latency: float, per_1k_tokens: float):
+        self.base_latency = base_latency
+        self.per_1k_tokens = per_1k_tokens
+        self.targets: List[str] = []
+        self.prompt_tokens: List[int] = []
+
+    async def complete(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                       model: str = None) -> str:
+        tokens = estimate_tokens(prompt)
+        self.prompt_tokens.append(tokens)
+        await asyncio.sleep(self.base_latency + self.per_1k_tokens * tokens / 1000)
+        return json.dumps([
+            {"tool_name": name, "parameters": {}, "depends_on": []} for name in self.targets
+        ])
+
+async def measure(planning: PlanningModule, llm: PromptSizedLLM, catalog: ToolCatalog,
+                  requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = []
+    calls = 0
+    for item in requests:
+        llm.targets = item["targets"]
+        llm.prompt_tokens = []
+        start = time.perf_counter()
+        await planning.create_plan(item["request"], catalog)
+        latencies.append(time.perf_counter() - start)
+        calls += len(llm.prompt_tokens)
+        item.setdefault("tokens", []).append(sum(llm.prompt_tokens))
+    return {
+        "mean_latency_s": sum(latencies) / len(latencies),
+        "llm_calls_per_plan": calls / len(requests)
+    }
+
+async def run(args) -> Dict[str, Any]:
+    catalog = ToolCatalog(1, synthetic_catalog(args.tools))
+    requests = synthetic_requests(list(catalog.tools), args.requests, args.seed)
+    selector = ToolSelector(top_k=args.top_k, token_budget=args.token_budget)
+
+    start = time.perf_counter()
+    selector.index(catalog)
+    build_time = time.perf_counter() - start
+
+    selection_times = []
+    recalled = 0
+    for item in requests:
+        start = time.perf_counter()
+        selected = selector.select(item["request"], catalog)
+        selection_times.append(time.perf_counter() - start)
+        recalled += all(name in selected.names for name in item["targets"])
+
+    llm = PromptSizedLLM(args.base_latency, args.latency_per_1k_tokens)
+    full = await measure(PlanningModule("", "", llm=llm), llm, catalog, requests)
+    selected = await measure(PlanningModule("", "", llm=llm, tool_selector=selector), llm, catalog, requests)
+
+    full_tokens = sum(item["tokens"][0] for item in requests) / len(requests)
+    selected_tokens = sum(item["tokens"][1] for item in requests) / len(requests)
+    selection_times.sort()
+    return {
+        "tools": len(catalog),
+        "requests": len(requests),
+        "top_k": args.top_k,
+        "token_budget": args.token_budget,
+        "index_build_ms": build_time * 1000,
+        "selection_us": {
+            "mean": sum(selection_times) / len(selection_times) * 1e6,
+            "p95": selection_times[int(0.95 * (len(selection_times) - 1))] * 1e6
+        },
+        "recall": recalled / len(requests),
+        "prompt_tokens": {
+            "full_catalog": full_tokens,
+            "with_selection": selected_tokens,
+            "reduction": 1 - selected_tokens / full_tokens
+        },
+        "planning": {
+            "full_catalog": full,
+            "with_selection": selected,
+            "latency_reduction": 1 - selected["mean_latency_s"] / full["mean_latency_s"]
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=2000)
+    parser.add_argument("--base-latency", type=float, default=0.002)
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.01,
+                        help="Added LLM latency per 1000 prompt tokens, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
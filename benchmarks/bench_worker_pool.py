@@ -0,0 +1,77 @@
+"""Per-call latency of a cold worker per invocation (the Job path) vs. a warm worker pool.
+
+Subprocess workers stand in for pods. Run from the repository root:
+
+    python -m benchmarks.bench_worker_pool --calls 20 --startup-delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from src.orchestrator.worker_pool import SubprocessWorkerBackend, WarmPoolManager
+from src.registry.registry import Tool
+
+async def cold_calls(backend: SubprocessWorkerBackend, tool: Tool, calls: int) -> List[float]:
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        worker = await backend.start_worker(tool)
+        await backend.call(worker, {"i": i}, timeout=30.0)
+        await backend.stop_worker(worker)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def warm_calls(manager: WarmPoolManager, tool: Tool, calls: int) -> List[float]:
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        await manager.execute(tool, {"i": i}, timeout=30.0)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def summarize(latencies: List[float]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "first_ms": latencies[0] * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "total_s": sum(latencies)
+    }
+
+async def run(args) -> Dict[str, Any]:
+    os.environ["WORKER_STARTUP_DELAY"] = str(args.startup_delay)
+    os.environ["WORKER_LATENCY"] = str(args.latency)
+    backend = SubprocessWorkerBackend([sys.executable, "-m", "benchmarks.echo_worker"])
+    tool = Tool(
+        name="echo", description="Echo the parameters", parameters={}, returns={},
+        container_image="echo:latest", endpoint=None,
+        warm_pool={"min_workers": 0, "max_workers": 2, "idle_timeout": 60}
+    )
+    manager = WarmPoolManager(backend)
+
+    try:
+        report = {
+            "calls": args.calls,
+            "startup_delay": args.startup_delay,
+            "cold": summarize(await cold_calls(backend, tool, args.calls)),
+            "warm": summarize(await warm_calls(manager, tool, args.calls))
+        }
+    finally:
+        await manager.close()
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--startup-delay", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Run the gateway or the controller against local stand-ins, for bench_e2e.
+
+The registry reads from a FakeBlobStorage seeded with the benchmark tools and
+the controller runs container tools on FakeKubernetes. The benchmark passes
+its settings as JSON in the BENCH_CONFIG environment variable; everything else
+(LLM endpoint, controller URL, secrets) is configured through the services'
+usual environment variables.
+
+    python -m benchmarks.e2e_service controller --port 8001
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import uvicorn
+
+from benchmarks.fakes import FakeBlobStorage, FakeKubernetes, parse_latency
+from src.orchestrator.job_tracker import JobTracker
+from src.registry.storage import INDEX_BLOB, tool_blob_name
+
+def seeded_storage(tools, latency: str) -> FakeBlobStorage:
+    """Fake blob storage holding the tools in the per-tool layout."""
+    storage = FakeBlobStorage()
+    index = {}
+    for tool in tools:
+        data = json.dumps(tool, sort_keys=True).encode("utf-8")
+        storage.put(tool_blob_name(tool["name"]), data)
+        index[tool["name"]] = hashlib.sha256(data).hexdigest()[:16]
+    storage.put(INDEX_BLOB, json.dumps({"tools": index}).encode("utf-8"))
+    # Latency applies from here on, to the reads made by the service
+    storage.latency = parse_latency(latency)
+    return storage
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("service", choices=("gateway", "controller"))
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    config = json.loads(os.environ["BENCH_CONFIG"])
+    storage = seeded_storage(config["tools"], config.get("blob_latency", "0"))
+
+    if args.service == "gateway":
+        from src.api import gateway as service
+    else:
+        from src.controller import controller as service
+
+        kubernetes = FakeKubernetes(latency=parse_latency(config.get("job_latency", "1.0")))
+        orchestrator = service.orchestrator
+        orchestrator.k8s_api = kubernetes
+        orchestrator.k8s_batch_api = kubernetes
+        orchestrator.job_tracker = JobTracker(
+            kubernetes, kubernetes, namespace=orchestrator.namespace, watch_factory=kubernetes.watch
+        )
+
+        async def initialize():
+            pass
+
+        orchestrator.initialize = initialize
+
+    service.registry._storage = storage
+    uvicorn.run(service.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Stand-in tool worker for SubprocessWorkerBackend: one JSON request per stdin line.
+
+Environment:
+    WORKER_STARTUP_DELAY  seconds to sleep before serving, emulating image pull and container start
+    WORKER_LATENCY        seconds each call takes
+"""
+import json
+import os
+import sys
+import time
+
+def main():
+    time.sleep(float(os.getenv("WORKER_STARTUP_DELAY", "0")))
+    latency = float(os.getenv("WORKER_LATENCY", "0"))
+    tool_name = sys.argv[1] if len(sys.argv) > 1 else "echo"
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        time.sleep(latency)
+        sys.stdout.write(json.dumps({"result": {"tool": tool_name, "echo": request["params"]}}) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
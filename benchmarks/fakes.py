@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from src.orchestrator.job_tracker import RESULT_ANNOTATION
+from src.registry.storage import BlobConflictError, BlobNotFoundError, RegistryStorage
+
+logger = logging.getLogger(__name__)
+
+Latency = Union[float, Callable[[], float]]
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Parse a latency distribution in seconds.
+
+    "0.05" or "fixed:0.05", "uniform:0.01,0.1", "exp:0.05" (mean) or
+    "lognormal:0.05,0.5" (median, sigma).
+    """
+    kind, _, values = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    args = [float(value) for value in values.split(",")]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / args[0]) if args[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda: args[0] * random.lognormvariate(0.0, args[1])
+    raise ValueError(f"Unknown latency distribution {spec}")
+
+def _sample(latency: Latency) -> float:
+    return latency() if callable(latency) else latency
+
+class FakeHTTPServer:
+    """Minimal asyncio HTTP/1.1 server with keep-alive, used as a local stand-in for the services."""
+
+    def __init__(self, handler: Callable, host: str = "127.0.0.1", port: int = 0):
+        # Coroutine handler(method, target, body) -> (status, payload)
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.requests += 1
+                status, payload = await self.handler(method, target, body)
+                if hasattr(payload, "__aiter__"):
+                    # Stream the items as newline-delimited JSON chunks
+                    writer.write(
+                        f"HTTP/1.1 {status} OK\r\nContent-Type: application/x-ndjson\r\n"
+                        f"Transfer-Encoding: chunked\r\n\r\n".encode("latin-1")
+                    )
+                    async for item in payload:
+                        data = json.dumps(item).encode("utf-8") + b"\n"
+                        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+                        await writer.drain()
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    # Bytes are sent as they are, e.g. a payload encoded once up front
+                    data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                    writer.write(
+                        f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                    )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+def fake_controller(latency: Latency = 0.05, results: Optional[Dict[str, Any]] = None) -> FakeHTTPServer:
+    """Create a fake MCP controller whose /execute_tool and /execute_tools answer after a fixed latency."""
+    async def execute(index: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(_sample(latency))
+        return {"index": index, "status": "success", "result": results or {"echo": params}}
+
+    async def stream(invocations):
+        tasks = [asyncio.ensure_future(execute(index, item["params"])) for index, item in enumerate(invocations)]
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+
+    async def handle(method: str, target: str, body: bytes):
+        if target.startswith("/execute_tools"):
+            return 200, stream(json.loads(body))
+        await asyncio.sleep(_sample(latency))
+        return 200, {"status": "success", "result": results or {"echo": json.loads(body or b"{}")}}
+
+    return FakeHTTPServer(handle)
+
+def fake_openai(latency: Latency = 0.5, reply: Optional[Callable[[str], str]] = None) -> FakeHTTPServer:
+    """Create a fake OpenAI-compatible server answering chat completions after a fixed latency."""
+    async def handle(method: str, target: str, body: bytes):
+        request = json.loads(body or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        await asyncio.sleep(_sample(latency))
+        content = reply(prompt) if reply else "[]"
+        return 200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4}
+        }
+
+    return FakeHTTPServer(handle)
+
+def fake_tool(latency: Latency = 0.02) -> FakeHTTPServer:
+    """Create a stub tool endpoint echoing its parameters after a latency."""
+    async def handle(method: str, target: str, body: bytes):
+        await asyncio.sleep(_sample(latency))
+        return 200, {"echo": json.loads(body or b"{}")}
+
+    return FakeHTTPServer(handle)
+
+class FakeBlobStorage(RegistryStorage):
+    """In-memory registry storage with ETags and a per-operation latency."""
+
+    def __init__(self, latency: Latency = 0.0):
+        self.latency = latency
+        self.blobs: Dict[str, Tuple[bytes, str]] = {}
+        self.reads = 0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _etag(self) -> str:
+        self._version += 1
+        return f'"{self._version}"'
+
+    def get(self, name: str, if_none_match: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        time.sleep(_sample(self.latency))
+        self.reads += 1
+        blob = self.blobs.get(name)
+        if blob is None:
+            raise BlobNotFoundError(name)
+        return None if blob[1] == if_none_match else blob
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None) -> str:
+        time.sleep(_sample(self.latency))
+        with self._lock:
+            if if_match and (name not in self.blobs or self.blobs[name][1] != if_match):
+                raise BlobConflictError(name)
+            etag = self._etag()
+            self.blobs[name] = (data, etag)
+            return etag
+
+    def create(self, name: str, data: bytes) -> str:
+        time.sleep(_sample(self.latency))
+        with self._lock:
+            if name in self.blobs:
+                raise BlobConflictError(name)
+            etag = self._etag()
+            self.blobs[name] = (data, etag)
+            return etag
+
+class FakeKubernetes:
+    """Stand-in for the batch and core APIs and the job watch used by the orchestrator.
+
+    Created jobs succeed after a sampled latency with their PARAMS echoed in
+    the result annotation; completions are delivered through watch().
+    """
+
+    def __init__(self, latency: Latency = 1.0):
+        self.latency = latency
+        self.jobs: Dict[str, Any] = {}
+        self.created = 0
+        self._events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._resource_version = 0
+        self._lock = threading.Lock()
+
+    # BatchV1Api
+
+    def create_namespaced_job(self, namespace: str, body):
+        job_name = body.metadata.name
+        params = body.spec.template.spec.containers[0].env[0].value
+        with self._lock:
+            self.created += 1
+            self.jobs[job_name] = SimpleNamespace(
+                metadata=SimpleNamespace(name=job_name, annotations={}),
+                status=SimpleNamespace(succeeded=None, conditions=None)
+            )
+        timer = threading.Timer(_sample(self.latency), self._complete, (job_name, params))
+        timer.daemon = True
+        timer.start()
+        return body
+
+    def _complete(self, job_name: str, params: str):
+        with self._lock:
+            job = self.jobs.get(job_name)
+            if job is None:
+                return
+            job.metadata.annotations[RESULT_ANNOTATION] = json.dumps({"echo": json.loads(params)})
+            job.status.succeeded = 1
+            self._resource_version += 1
+        self._events.put({"type": "MODIFIED", "object": job})
+
+    def list_namespaced_job(self, namespace: str, label_selector: str = "", **kwargs):
+        with self._lock:
+            return SimpleNamespace(
+                items=list(self.jobs.values()),
+                metadata=SimpleNamespace(resource_version=str(self._resource_version))
+            )
+
+    def delete_namespaced_job(self, name: str, namespace: str, **kwargs):
+        with self._lock:
+            job = self.jobs.pop(name, None)
+        if job is not None:
+            self._events.put({"type": "DELETED", "object": job})
+
+    # CoreV1Api
+
+    def list_namespaced_pod(self, namespace: str, label_selector: str = "", **kwargs):
+        return SimpleNamespace(items=[])
+
+    def read_namespaced_pod_log(self, name: str, namespace: str, **kwargs) -> str:
+        return ""
+
+    # kubernetes.watch.Watch
+
+    def watch(self) -> "FakeWatch":
+        return FakeWatch(self._events)
+
+class FakeWatch:
+    def __init__(self, events: "queue.Queue[Dict[str, Any]]"):
+        self.events = events
+        self._stopped = False
+
+    def stream(self, func, timeout_seconds: int = 60, **kwargs) -> Iterator[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout_seconds
+        while not self._stopped and time.monotonic() < deadline:
+            try:
+                yield self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def stop(self):
+        self._stopped = True
@@ -0,0 +1,202 @@
+"""Replay journaled agent runs against their recorded tool and LLM responses.
+
+Each run's plan is re-driven through ExecutionEngine against a fake MCP
+controller that answers every tool call with the response recorded for the
+same tool and resolved parameters, after the recorded execution time scaled
+by --speed (0 replays without any waiting, which leaves only the pipeline's
+own overhead). With --pipeline the plan and analysis are also produced by
+PlanningModule and FeedbackLoop, from an LLM stand-in returning the recorded
+plan and analysis after the recorded call latencies.
+
+Replayed step results are compared with the recorded ones, so a change that
+alters what the pipeline produces shows up as mismatched steps.
+
+Run from the repository root:
+
+    python -m benchmarks.replay_journal runs.jsonl.1 runs.jsonl --speed 0 --profile 25
+"""
+import argparse
+import asyncio
+import collections
+import cProfile
+import json
+import pstats
+import sys
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from benchmarks.bench_e2e import percentile
+from benchmarks.fakes import FakeHTTPServer
+from src.ai.execution import ExecutionEngine
+from src.ai.feedback import FeedbackLoop
+from src.ai.planning import PlanningModule
+from src.monitoring.journal import read_journal
+from src.registry.registry import ToolCatalog
+
+def _call_key(tool_name: str, parameters: Any) -> Tuple[str, str]:
+    return tool_name, json.dumps(parameters, sort_keys=True, separators=(",", ":"))
+
+class RecordedController:
+    """Fake MCP controller answering tool calls with the responses recorded in the journal.
+
+    Responses are kept per tool and parameters in recorded order; a call
+    repeated more often than it was recorded cycles through them again.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float):
+        self.speed = speed
+        self.responses: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = collections.defaultdict(collections.deque)
+        for entry in entries:
+            for step in entry.get("steps") or []:
+                if step is None or step.get("error", "").startswith("Skipped because"):
+                    # Skipped steps never reached the controller
+                    continue
+                self.responses[_call_key(step["tool_name"], step["parameters"])].append(step)
+        self.misses = 0
+        self.server = FakeHTTPServer(self.handle)
+
+    async def respond(self, tool_name: str, parameters: Any) -> Tuple[int, Dict[str, Any]]:
+        recorded = self.responses.get(_call_key(tool_name, parameters))
+        if not recorded:
+            self.misses += 1
+            return 500, {"detail": f"No recorded response for {tool_name} with these parameters"}
+        step = recorded[0]
+        recorded.rotate(-1)
+        if self.speed:
+            await asyncio.sleep(step.get("execution_time", 0.0) * self.speed)
+        if "result" in step:
+            return 200, step["result"]
+        return 500, {"detail": step["error"]}
+
+    async def _stream(self, invocations: List[Dict[str, Any]]):
+        async def execute(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            status, payload = await self.respond(item["tool_name"], item["params"])
+            if status == 200:
+                return {"index": index, "status": "success", "result": payload.get("result", payload)}
+            return {"index": index, "status": "error", "status_code": status, "detail": payload["detail"]}
+
+        tasks = [asyncio.ensure_future(execute(index, item)) for index, item in enumerate(invocations)]
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+
+    async def handle(self, method: str, target: str, body: bytes):
+        if target.startswith("/execute_tools"):
+            return 200, self._stream(json.loads(body))
+        tool_name = target.split("tool_name=", 1)[1].split("&", 1)[0]
+        return await self.respond(tool_name, json.loads(body or b"{}"))
+
+class ReplayLLM:
+    """LLM stand-in returning the recorded plan, then the recorded analysis, after the recorded latencies."""
+
+    def __init__(self, entry: Dict[str, Any], speed: float):
+        self.responses = [json.dumps(entry["plan"])]
+        if entry.get("analysis") is not None:
+            self.responses.append(json.dumps(entry["analysis"]))
+        self.latencies = [call["latency_s"] * speed for call in entry.get("llm_calls", [])]
+        self.calls = 0
+
+    async def complete(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                       model: str = None) -> str:
+        index = self.calls
+        self.calls += 1
+        if index < len(self.latencies) and self.latencies[index]:
+            await asyncio.sleep(self.latencies[index])
+        return self.responses[min(index, len(self.responses) - 1)]
+
+    async def stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000, model: str = None):
+        yield await self.complete(prompt, temperature, max_tokens, model)
+
+def mismatched_steps(recorded: List[Optional[Dict[str, Any]]], replayed: List[Dict[str, Any]]) -> int:
+    """Steps whose replayed outcome differs from the recorded one; error messages may differ."""
+    mismatched = abs(len(recorded) - len(replayed))
+    for before, after in zip(recorded, replayed):
+        if before is None:
+            continue
+        if ("error" in before) != ("error" in after) or before.get("result") != after.get("result"):
+            mismatched += 1
+    return mismatched
+
+async def replay_run(entry: Dict[str, Any], engine: ExecutionEngine, args) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if args.pipeline:
+        llm = ReplayLLM(entry, args.speed)
+        tool_names = sorted({step["tool_name"] for step in entry["plan"]})
+        catalog = ToolCatalog(1, [{"name": name, "description": "", "parameters": {}, "returns": {}}
+                                  for name in tool_names])
+        plan = await PlanningModule("", "", llm=llm).create_plan(entry["request"], catalog)
+        results = await engine.execute_plan(plan)
+        if entry.get("analysis") is not None:
+            await FeedbackLoop("", "", llm=llm).analyze_results(entry["request"], plan, results)
+    else:
+        results = await engine.execute_plan(entry["plan"])
+    return {"latency_s": time.perf_counter() - start,
+            "mismatched_steps": mismatched_steps(entry["steps"] or [], results)}
+
+async def run(args, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    controller = RecordedController(entries, args.speed)
+    await controller.server.start()
+    engine = ExecutionEngine(controller.server.url, "replay-token", batch_window=args.batch_window)
+    runs = [entry for _ in range(args.repeat) for entry in entries]
+    remaining = iter(runs)
+    replayed: List[Dict[str, Any]] = []
+
+    async def worker():
+        for entry in remaining:
+            replayed.append(await replay_run(entry, engine, args))
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await engine.http_client.close()
+        await controller.server.stop()
+
+    latencies = [result["latency_s"] for result in replayed]
+    recorded = [entry["duration_s"] for entry in entries]
+    return {
+        "runs": len(replayed),
+        "speed": args.speed,
+        "pipeline": args.pipeline,
+        "elapsed_s": elapsed,
+        "runs_per_s": len(replayed) / elapsed if elapsed else None,
+        "latency_s": {"mean": sum(latencies) / len(latencies), "p50": percentile(latencies, 0.5),
+                      "p95": percentile(latencies, 0.95)},
+        "recorded_latency_s": {"mean": sum(recorded) / len(recorded), "p50": percentile(recorded, 0.5),
+                               "p95": percentile(recorded, 0.95)},
+        "tool_calls": controller.server.requests,
+        "unrecorded_tool_calls": controller.misses,
+        "mismatched_steps": sum(result["mismatched_steps"] for result in replayed)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("journals", nargs="+", help="Journal files, oldest first (e.g. runs.jsonl.1 runs.jsonl)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Scale of the recorded latencies; 0 replays without waiting")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Also run planning and feedback against the recorded LLM responses")
+    parser.add_argument("--concurrency", type=int, default=1, help="Runs replayed at the same time")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--batch-window", type=float, default=None)
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="Profile the replay and print the N most expensive functions to stderr")
+    args = parser.parse_args()
+
+    # Runs that failed before they had a plan have nothing to replay
+    entries = [entry for entry in read_journal(args.journals) if entry.get("plan") and entry.get("steps")]
+    if not entries:
+        parser.error("No replayable runs in the journal")
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    report = asyncio.run(run(args, entries))
+    if profiler is not None:
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(args.profile)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
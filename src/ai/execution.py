@@ -1,69 +1,358 @@
+import asyncio
 import logging
 import json
+import re
 import time
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Sequence, Set, Tuple
 import httpx
+from src.common.http_client import HTTPClientPool
+from src.monitoring.monitoring import SpanKind, inject_trace_headers, phase
 
 logger = logging.getLogger(__name__)
 
+# Matches references to earlier step outputs, e.g. "${steps.1.result.items.0}"
+STEP_REFERENCE_PATTERN = re.compile(r"\$\{steps\.(\d+)\.result((?:\.[\w-]+)*)\}")
+
+def _find_references(value: Any) -> List[int]:
+    """Find the (1-based) step numbers referenced inside a parameter value."""
+    if isinstance(value, str):
+        return [int(match.group(1)) for match in STEP_REFERENCE_PATTERN.finditer(value)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _find_references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _find_references(item)]
+    return []
+
+def _is_step_number(value: Any) -> bool:
+    # bool is a subclass of int, but true/false in a plan are not step numbers
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def step_dependencies(step: Dict[str, Any], step_index: int) -> List[int]:
+    """Return the 0-based indices one step of a plan depends on.
+
+    A step without a 'depends_on' key is ordered after the previous step, so
+    plans written without dependency information keep their sequential behaviour.
+    Only earlier steps are checked, so steps can be validated as they arrive.
+    """
+    if "depends_on" in step:
+        depends_on = step["depends_on"]
+        if _is_step_number(depends_on):
+            depends_on = [depends_on]
+        if not isinstance(depends_on, list):
+            raise ValueError(f"Step {step_index + 1} has an invalid depends_on value")
+    else:
+        depends_on = [step_index] if step_index > 0 else []
+
+    step_numbers = depends_on + _find_references(step.get("parameters", {}))
+    for step_number in step_numbers:
+        # Only allow dependencies on earlier steps, which keeps the plan acyclic
+        if not _is_step_number(step_number) or not 1 <= step_number <= step_index:
+            raise ValueError(f"Step {step_index + 1} depends on invalid step {step_number!r}")
+
+    return sorted(set(step_number - 1 for step_number in step_numbers))
+
+def get_step_dependencies(plan: List[Dict[str, Any]]) -> List[List[int]]:
+    """Return the 0-based indices each step of the plan depends on."""
+    return [step_dependencies(step, step_index) for step_index, step in enumerate(plan)]
+
+def _lookup(value: Any, path: str) -> Any:
+    """Walk a dotted path into a step result."""
+    for key in filter(None, path.split(".")):
+        if isinstance(value, list):
+            value = value[int(key)]
+        else:
+            value = value[key]
+    return value
+
+def _step_output(record: Dict[str, Any]) -> Any:
+    """Get the tool output of an executed step, unwrapping the controller response."""
+    if "result" not in record:
+        raise ValueError(f"Step {record['step']} has no result to reference")
+    result = record["result"]
+    if isinstance(result, dict) and result.get("status") == "success" and "result" in result:
+        return result["result"]
+    return result
+
+def _resolve_references(value: Any, results: List[Optional[Dict[str, Any]]]) -> Any:
+    """Substitute references to earlier step outputs in the parameters."""
+    if isinstance(value, str):
+        match = STEP_REFERENCE_PATTERN.fullmatch(value)
+        if match:
+            return _lookup(_step_output(results[int(match.group(1)) - 1]), match.group(2))
+        return STEP_REFERENCE_PATTERN.sub(
+            lambda m: str(_lookup(_step_output(results[int(m.group(1)) - 1]), m.group(2))),
+            value
+        )
+    if isinstance(value, dict):
+        return {key: _resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve_references(item, results) for item in value]
+    return value
+
+class ToolCallError(Exception):
+    """Raised when the MCP controller reports a failed item of a batch."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
 class ExecutionEngine:
-    def __init__(self, mcp_controller_url: str, auth_token: str):
+    def __init__(self, mcp_controller_url: str, auth_token: str,
+                 max_concurrency: int = 16, max_plan_concurrency: int = 4,
+                 http_client: Optional[HTTPClientPool] = None, timeout: float = 120.0,
+                 tool_timeouts: Optional[Dict[str, float]] = None,
+                 batch_window: Optional[float] = None, max_batch_size: int = 32):
         self.mcp_controller_url = mcp_controller_url
         self.auth_token = auth_token
-    
+        self.http_client = http_client or HTTPClientPool()
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.max_concurrency = max_concurrency
+        self.max_plan_concurrency = max_plan_concurrency
+        # With a batch window, steps that become ready within it share one /execute_tools call
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+        # Created lazily so that it is bound to the running event loop
+        self._global_semaphore = None
+
+    def _get_global_semaphore(self) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent steps across all plans."""
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._global_semaphore
+
     async def execute_plan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Execute a plan by calling the MCP controller for each step."""
-        results = []
-        
-        for step_index, step in enumerate(plan):
-            tool_name = step["tool_name"]
-            parameters = step["parameters"]
-            
+        """Execute a plan by calling the MCP controller, running independent steps concurrently."""
+        return await self.start_plan(plan).gather()
+
+    async def iter_plan(self, plan: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Execute a plan like execute_plan, yielding each step result as soon as it lands."""
+        async for result in self.start_plan(plan).as_completed():
+            yield result
+
+    def start_plan(self, plan: Sequence[Dict[str, Any]] = ()) -> "PlanRun":
+        """Start executing a plan; more steps can be added while it runs."""
+        # The whole plan is validated before any step starts
+        dependencies = get_step_dependencies(list(plan))
+        run = PlanRun(self)
+        for step, step_dependencies in zip(plan, dependencies):
+            run.add_step(step, step_dependencies)
+        return run
+
+    async def _execute_step(self, plan: List[Dict[str, Any]], step_index: int,
+                            dependencies: List[int], dependency_tasks: List[asyncio.Task],
+                            results: List[Optional[Dict[str, Any]]],
+                            plan_semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Wait for the dependencies of a step, then execute it."""
+        step = plan[step_index]
+        tool_name = step["tool_name"]
+        parameters = step["parameters"]
+
+        if dependency_tasks:
+            await asyncio.gather(*dependency_tasks)
+
+        # Implicit ordering on the previous step does not skip on failure, as before
+        failed = [dep for dep in dependencies if "error" in results[dep]]
+        if failed and "depends_on" in step:
+            logger.warning(f"Skipping step {step_index + 1}: dependency step {failed[0] + 1} failed")
+            results[step_index] = {
+                "step": step_index + 1,
+                "tool_name": tool_name,
+                "parameters": parameters,
+                "error": f"Skipped because dependency step {failed[0] + 1} failed"
+            }
+            return results[step_index]
+
+        async with plan_semaphore, self._get_global_semaphore():
             logger.info(f"Executing step {step_index + 1}/{len(plan)}: {tool_name}")
-            
+
             try:
+                parameters = _resolve_references(parameters, results)
+
                 # Execute the tool via MCP controller
                 start_time = time.time()
-                result = await self._call_mcp_controller(tool_name, parameters)
+                with phase("execution.step", tool=tool_name, step=step_index + 1):
+                    result = await self._call_mcp_controller(tool_name, parameters)
                 execution_time = time.time() - start_time
-                
+
                 # Log the result
                 logger.info(f"Step {step_index + 1} completed in {execution_time:.2f}s")
-                
-                results.append({
+
+                results[step_index] = {
                     "step": step_index + 1,
                     "tool_name": tool_name,
                     "parameters": parameters,
                     "result": result,
                     "execution_time": execution_time
-                })
+                }
             except Exception as e:
                 logger.error(f"Error executing step {step_index + 1}: {str(e)}")
-                # Add error to results
-                results.append({
+                # Record the error; steps depending on this one will be skipped
+                results[step_index] = {
                     "step": step_index + 1,
                     "tool_name": tool_name,
                     "parameters": parameters,
                     "error": str(e)
-                })
-                # Decide whether to continue or abort the plan
-                # For simplicity, we'll continue
-        
-        return results
-    
+                }
+
+        return results[step_index]
+
     async def _call_mcp_controller(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Call the MCP controller to execute a tool."""
+        """Call the MCP controller to execute a tool, batching it with other ready steps if enabled."""
+        if self.batch_window is None:
+            return await self._execute_tool(tool_name, parameters)
+
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((tool_name, parameters, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(self.batch_window, self._flush)
+        return await asyncio.wait_for(future, self.tool_timeouts.get(tool_name, self.timeout))
+
+    def _flush(self):
+        """Send the pending invocations, as one batch if there is more than one."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        # Steps cancelled or timed out while waiting for the window are dropped
+        pending = [item for item in pending if not item[2].done()]
+        if not pending:
+            return
+
+        if len(pending) == 1:
+            task = asyncio.ensure_future(self._execute_single(*pending[0]))
+        else:
+            task = asyncio.ensure_future(self._execute_batch(pending))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _execute_single(self, tool_name: str, parameters: Dict[str, Any], future: asyncio.Future):
+        try:
+            result = await self._execute_tool(tool_name, parameters)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def _execute_batch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        """Execute invocations through /execute_tools, failing the steps left without a result."""
+        invocations = [{"tool_name": tool_name, "params": parameters} for tool_name, parameters, _ in batch]
+        timeout = max(self.tool_timeouts.get(tool_name, self.timeout) for tool_name, _, _ in batch)
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            with phase("controller.dispatch", kind=SpanKind.CLIENT, batch_size=len(batch)):
+                await self._stream_batch(batch, invocations, timeout)
+        except Exception as e:
+            logger.error(f"Error calling MCP controller batch endpoint: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("No result for the step in the batch response"))
+
+    async def _stream_batch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]],
+                            invocations: List[Dict[str, Any]], timeout: float):
+        """Post the batch, resolving each step as its result line arrives."""
+        async with self.http_client.stream(
+            "POST",
+            f"{self.mcp_controller_url}/execute_tools",
+            json=invocations,
+            headers=inject_trace_headers({"Authorization": f"Bearer {self.auth_token}"}),
+            timeout=timeout
+        ) as response:
+            if response.status_code in (404, 405):
+                # The controller predates batching; stop trying and call it per step
+                logger.warning("MCP controller has no batch endpoint, executing steps individually")
+                self.batch_window = None
+                await asyncio.gather(*(self._execute_single(*item) for item in batch))
+                return
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                future = batch[item["index"]][2]
+                if future.done():
+                    continue
+                if item["status"] == "success":
+                    # Same envelope as /execute_tool, so step records look the same either way
+                    future.set_result({"status": "success", "result": item["result"]})
+                else:
+                    future.set_exception(ToolCallError(item.get("status_code", 500), item.get("detail", "")))
+
+    async def _execute_tool(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Call the MCP controller to execute a single tool."""
+        try:
+            with phase("controller.dispatch", kind=SpanKind.CLIENT, tool=tool_name):
+                response = await self.http_client.post(
                     f"{self.mcp_controller_url}/execute_tool",
                     params={"tool_name": tool_name},
                     json=parameters,
-                    headers={"Authorization": f"Bearer {self.auth_token}"},
-                    timeout=120.0
+                    headers=inject_trace_headers({"Authorization": f"Bearer {self.auth_token}"}),
+                    timeout=self.tool_timeouts.get(tool_name, self.timeout)
                 )
                 response.raise_for_status()
                 return response.json()
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling MCP controller: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+class PlanRun:
+    """Execution of one plan, whose steps are scheduled as they are added.
+
+    Each step starts as soon as its dependencies, which must be earlier steps,
+    have finished. This lets execution begin while the rest of the plan is
+    still being generated.
+    """
+
+    def __init__(self, engine: ExecutionEngine):
+        self.engine = engine
+        self.plan: List[Dict[str, Any]] = []
+        self.results: List[Optional[Dict[str, Any]]] = []
+        self.tasks: List[asyncio.Task] = []
+        self.plan_semaphore = asyncio.Semaphore(engine.max_plan_concurrency)
+
+    def add_step(self, step: Dict[str, Any], dependencies: Optional[List[int]] = None) -> asyncio.Task:
+        """Schedule the next step of the plan; raises ValueError for invalid dependencies."""
+        step_index = len(self.plan)
+        if dependencies is None:
+            dependencies = step_dependencies(step, step_index)
+        self.plan.append(step)
+        self.results.append(None)
+        task = asyncio.ensure_future(self.engine._execute_step(
+            self.plan, step_index, dependencies,
+            [self.tasks[dep] for dep in dependencies],
+            self.results, self.plan_semaphore
+        ))
+        self.tasks.append(task)
+        return task
+
+    async def gather(self) -> List[Dict[str, Any]]:
+        """Wait for all steps added so far and return their results in plan order."""
+        try:
+            return list(await asyncio.gather(*self.tasks))
+        finally:
+            self.cancel()
+
+    async def as_completed(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the result of each step added so far as soon as it lands."""
+        try:
+            for next_result in asyncio.as_completed(self.tasks):
+                yield await next_result
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Cancel the steps that are still waiting or running."""
+        for task in self.tasks:
+            task.cancel()
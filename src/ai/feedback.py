@@ -1,70 +1,225 @@
 import logging
-from typing import Dict, List, Any
-from openai import AzureOpenAI
+import json
+import re
+from typing import AsyncIterator, Dict, List, Any, Optional
+from src.ai.llm import LLMClient
+from src.ai.result_encoding import ResultEncoder, unwrap_result
 
 logger = logging.getLogger(__name__)
 
+USER_RESPONSE_PATTERN = re.compile(r'"user_response"\s*:\s*"')
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class UserResponseExtractor:
+    """Incrementally decode the "user_response" string out of a streamed JSON analysis."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None
+        self.done = False
+
+    def feed(self, text: str) -> str:
+        """Add streamed text and return the newly decoded characters of the user response."""
+        self.buffer += text
+        if self.done:
+            return ""
+
+        if self.position is None:
+            match = USER_RESPONSE_PATTERN.search(self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        decoded = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                decoded.append(char)
+                self.position += 1
+                continue
+
+            # Wait for the rest of an escape sequence that was split across chunks
+            escape = self.buffer[self.position + 1:self.position + 2]
+            if not escape:
+                break
+            if escape == "u":
+                code = self.buffer[self.position + 2:self.position + 6]
+                if len(code) < 4:
+                    break
+                decoded.append(chr(int(code, 16)))
+                self.position += 6
+            else:
+                decoded.append(JSON_ESCAPES.get(escape, escape))
+                self.position += 2
+
+        return "".join(decoded)
+
 class FeedbackLoop:
-    def __init__(self, api_key: str, endpoint: str):
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            api_version="2023-05-15",
-            azure_endpoint=endpoint
-        )
-    
-    async def analyze_results(self, user_request: str, plan: List[Dict[str, Any]], 
-                              results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze the results of the execution and provide feedback."""
-        try:
-            # Create a prompt for the LLM
-            plan_str = json.dumps(plan, indent=2)
-            results_str = json.dumps(results, indent=2)
-            
-            prompt = f"""
+    """Analyzes executed plans and formulates the response to the user.
+
+    With rule_max_chars set, runs whose steps all succeeded with results of at
+    most that many characters in total get a templated analysis without an LLM
+    call. Other error-free runs are analyzed with fast_model when it is set;
+    runs with errors always use the LLM client's default model.
+    """
+
+    def __init__(self, api_key: str, endpoint: str, llm: Optional[LLMClient] = None,
+                 encoder: Optional[ResultEncoder] = None, rule_max_chars: int = 0,
+                 fast_model: Optional[str] = None):
+        self.llm = llm or LLMClient(api_key=api_key, endpoint=endpoint)
+        self.encoder = encoder or ResultEncoder()
+        self.rule_max_chars = rule_max_chars
+        self.fast_model = fast_model
+        self.rule_analyses = 0
+        self.llm_analyses = 0
+
+    @staticmethod
+    def _succeeded(results: List[Dict[str, Any]]) -> bool:
+        return bool(results) and all(record is not None and "error" not in record for record in results)
+
+    def rule_based_analysis(self, plan: List[Dict[str, Any]],
+                            results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return a templated analysis for a trivially successful run, or None if it needs the LLM."""
+        if self.rule_max_chars <= 0 or not self._succeeded(results):
+            return None
+
+        lines = []
+        size = 0
+        for record in results:
+            output = json.dumps(unwrap_result(record.get("result")), separators=(",", ":"),
+                                ensure_ascii=False, default=str)
+            size += len(output)
+            if size > self.rule_max_chars:
+                return None
+            lines.append(f"- {record.get('tool_name')}: {output}")
+
+        return {
+            "user_response": f"Completed {len(results)} step(s) successfully:\n" + "\n".join(lines),
+            "success": True,
+            "issues": [],
+            "improvements": [],
+            "analyzed_by": "rules"
+        }
+
+    def _model_for(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """The model to analyze a run with; None for the LLM client's default."""
+        return self.fast_model if self.fast_model and self._succeeded(results) else None
+
+    def _build_prompt(self, user_request: str, plan: List[Dict[str, Any]],
+                      results: List[Dict[str, Any]]) -> str:
+        """Create the analysis prompt for the LLM."""
+        # Compact and size-bounded; large outputs are truncated with markers
+        steps_str = self.encoder.encode_run(plan, results)
+
+        # user_response comes first so that it can be streamed to the user early
+        return f"""
             User Request: {user_request}
-            
-            Plan:
-            {plan_str}
-            
-            Execution Results:
-            {results_str}
-            
+
+            Executed Plan (each step with its parameters and its result or error; values marked
+            "more chars", "more items" or "more keys" were truncated for brevity):
+            {steps_str}
+
             Analyze the results and provide feedback on the following:
             1. Was the plan successful in fulfilling the user request?
             2. Were there any errors or issues during execution?
             3. How could the plan be improved?
             4. Formulate a response to the user based on the results.
-            
+
             Return your analysis as a JSON object with the following structure:
             {{
+                "user_response": "Message to the user",
                 "success": true/false,
                 "issues": ["issue1", "issue2", ...],
-                "improvements": ["improvement1", "improvement2", ...],
-                "user_response": "Message to the user"
+                "improvements": ["improvement1", "improvement2", ...]
             }}
-            
+
             Return only the JSON object, no additional text.
             """
-            
+
+    def _default_analysis(self, error: Exception) -> Dict[str, Any]:
+        """Analysis returned when the LLM call or its parsing fails."""
+        return {
+            "success": False,
+            "issues": [f"Error analyzing results: {str(error)}"],
+            "improvements": ["Improve error handling"],
+            "user_response": "I encountered an issue while analyzing the results. Please try again."
+        }
+
+    def quick_analysis(self, plan: List[Dict[str, Any]],
+                       results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the rule-based analysis of a run that qualifies for one, or None if it needs llm_analysis."""
+        analysis = self.rule_based_analysis(plan, results)
+        if analysis is not None:
+            self.rule_analyses += 1
+        return analysis
+
+    async def analyze_results(self, user_request: str, plan: List[Dict[str, Any]],
+                              results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze the results of the execution and provide feedback."""
+        analysis = self.quick_analysis(plan, results)
+        if analysis is not None:
+            return analysis
+        return await self.llm_analysis(user_request, plan, results)
+
+    async def llm_analysis(self, user_request: str, plan: List[Dict[str, Any]],
+                           results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze the results with the LLM, skipping the rule-based fast path."""
+        self.llm_analyses += 1
+        try:
+            prompt = self._build_prompt(user_request, plan, results)
+
             # Call the LLM to analyze the results
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                max_tokens=2000
-            )
-            
-            # Extract and parse the analysis
-            analysis_text = response.choices[0].message.content.strip()
+            analysis_text = await self.llm.complete(prompt, temperature=0.2, max_tokens=2000,
+                                                    model=self._model_for(results))
+
+            # Parse the analysis
             analysis = json.loads(analysis_text)
-            
+
             return analysis
         except Exception as e:
             logger.error(f"Error analyzing results: {str(e)}")
             # Return a default analysis in case of error
-            return {
-                "success": False,
-                "issues": [f"Error analyzing results: {str(e)}"],
-                "improvements": ["Improve error handling"],
-                "user_response": "I encountered an issue while analyzing the results. Please try again."
-            }
\ No newline at end of file
+            return self._default_analysis(e)
+
+    async def stream_analysis(self, user_request: str, plan: List[Dict[str, Any]],
+                              results: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Analyze the results, yielding user response tokens as they are generated.
+
+        Yields {"type": "token", "text": ...} events followed by a single
+        {"type": "analysis", "analysis": ...} event with the parsed analysis.
+        """
+        analysis = self.quick_analysis(plan, results)
+        if analysis is not None:
+            yield {"type": "token", "text": analysis["user_response"]}
+            yield {"type": "analysis", "analysis": analysis}
+            return
+
+        self.llm_analyses += 1
+        extractor = UserResponseExtractor()
+        try:
+            prompt = self._build_prompt(user_request, plan, results)
+
+            async for delta in self.llm.stream(prompt, temperature=0.2, max_tokens=2000,
+                                               model=self._model_for(results)):
+                text = extractor.feed(delta)
+                if text:
+                    yield {"type": "token", "text": text}
+
+            analysis = json.loads(extractor.buffer.strip())
+        except Exception as e:
+            logger.error(f"Error analyzing results: {str(e)}")
+            analysis = self._default_analysis(e)
+
+        yield {"type": "analysis", "analysis": analysis}
+
+    def stats(self) -> Dict[str, Any]:
+        """How many analyses took the rule-based fast path and how many called the LLM."""
+        return {
+            "rule_analyses": self.rule_analyses,
+            "llm_analyses": self.llm_analyses,
+            "rule_max_chars": self.rule_max_chars,
+            "fast_model": self.fast_model
+        }
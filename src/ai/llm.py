@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+from openai import AsyncAzureOpenAI
+from src.ai.tool_selection import estimate_tokens
+from src.monitoring.journal import note_llm_call
+
+logger = logging.getLogger(__name__)
+
+class LLMClient:
+    """Asynchronous Azure OpenAI client with a bounded number of in-flight completions."""
+
+    def __init__(self, api_key: str, endpoint: str, api_version: str = "2023-05-15",
+                 model: str = "gpt-4", max_concurrency: int = 8, timeout: float = 60.0):
+        self.client = AsyncAzureOpenAI(
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            timeout=timeout
+        )
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Created lazily so that it is bound to the running event loop
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def complete(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                       model: Optional[str] = None) -> str:
+        """Run a chat completion for a single user prompt and return the message text."""
+        try:
+            # The timeout covers waiting for a free slot as well as the completion itself
+            return await asyncio.wait_for(
+                self._complete(prompt, temperature, max_tokens, model or self.model),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"LLM completion timed out after {self.timeout}s")
+            raise
+
+    async def _complete(self, prompt: str, temperature: float, max_tokens: int, model: str) -> str:
+        async with self._get_semaphore():
+            start = time.perf_counter()
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            latency = time.perf_counter() - start
+        text = response.choices[0].message.content.strip()
+        usage = response.usage
+        if usage is not None:
+            note_llm_call(model, latency, usage.prompt_tokens, usage.completion_tokens)
+        else:
+            note_llm_call(model, latency, estimate_tokens(prompt), estimate_tokens(text), estimated=True)
+        return text
+
+    async def stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 2000,
+                     model: Optional[str] = None) -> AsyncIterator[str]:
+        """Run a streaming chat completion, yielding content deltas as they arrive."""
+        deadline = time.monotonic() + self.timeout
+
+        async def before_deadline(awaitable):
+            return await asyncio.wait_for(awaitable, timeout=max(deadline - time.monotonic(), 0))
+
+        semaphore = self._get_semaphore()
+        await before_deadline(semaphore.acquire())
+        stream = None
+        start = time.perf_counter()
+        first_token = None
+        generated = 0
+        try:
+            stream = await before_deadline(self.client.chat.completions.create(
+                model=model or self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            ))
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await before_deadline(chunks.__anext__())
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    generated += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            # Streamed responses carry no usage, so token counts are estimated
+            note_llm_call(model or self.model, time.perf_counter() - start, estimate_tokens(prompt),
+                          (generated + 3) // 4, estimated=True, first_token=first_token)
+        except asyncio.TimeoutError:
+            logger.error(f"LLM streaming completion timed out after {self.timeout}s")
+            raise
+        finally:
+            if stream is not None:
+                await stream.close()
+            semaphore.release()
+
+    async def close(self):
+        """Close the underlying HTTP connections."""
+        await self.client.close()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+def normalize_request(user_request: str) -> str:
+    """Normalize a user request so requests differing only in whitespace or trailing punctuation share a cache entry.
+
+    Case is kept, as parameters such as identifiers are often case-sensitive.
+    """
+    normalized = " ".join(user_request.split())
+    return re.sub(r"[\s.!?]+$", "", normalized)
+
+class PlanCacheBackend:
+    """Storage for serialized plans."""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float):
+        raise NotImplementedError
+
+    def invalidate(self):
+        """Drop entries made stale by a catalog change."""
+
+class LocalPlanCacheBackend(PlanCacheBackend):
+    """In-process cache with TTL and LRU eviction."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.entries = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        self.entries[key] = value
+
+    def invalidate(self):
+        self.entries.clear()
+
+class RedisPlanCacheBackend(PlanCacheBackend):
+    """Cache shared between gateway replicas, using a redis.asyncio compatible client.
+
+    Nothing is deleted when the catalog changes: PlanCache keys embed the
+    catalog fingerprint, so entries for a previous catalog are never read
+    again and Redis expires them by their TTL. Replicas therefore need not
+    agree on when a change happened, and no key scan is needed.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: float):
+        # Redis rejects an expiry of 0 seconds
+        await self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def invalidate(self):
+        """Nothing to drop; stale entries are keyed on the previous fingerprint and expire by TTL."""
+
+class PlanCache:
+    """Cache of validated plans keyed on the normalized request and the tool catalog fingerprint."""
+
+    def __init__(self, backend: Optional[PlanCacheBackend] = None, ttl: float = 3600.0,
+                 max_entries: int = 1024, namespace: str = "mcp:plan"):
+        self.backend = backend or LocalPlanCacheBackend(max_entries=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def make_key(self, user_request: str, fingerprint: str) -> str:
+        request_hash = hashlib.sha256(normalize_request(user_request).encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{fingerprint[:16]}:{request_hash}"
+
+    async def get(self, user_request: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        """Get a cached plan, or None on a miss."""
+        try:
+            value = await self.backend.get(self.make_key(user_request, fingerprint))
+        except Exception as e:
+            # A broken cache must never fail the request
+            logger.error(f"Error reading plan cache: {str(e)}")
+            self.errors += 1
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(value)
+
+    async def set(self, user_request: str, fingerprint: str, plan: List[Dict[str, Any]]):
+        """Store a validated plan."""
+        try:
+            await self.backend.set(self.make_key(user_request, fingerprint), json.dumps(plan), self.ttl)
+        except Exception as e:
+            logger.error(f"Error writing plan cache: {str(e)}")
+            self.errors += 1
+
+    def on_catalog_changed(self):
+        """Registry listener dropping plans made for the previous catalog."""
+        self.backend.invalidate()
+        self.invalidations += 1
+        logger.info("Tool catalog changed, plan cache invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations": self.invalidations
+        }
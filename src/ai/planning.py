@@ -1,78 +1,254 @@
+import contextlib
 import logging
 import json
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
 import httpx
-from openai import AzureOpenAI
+from src.ai.execution import get_step_dependencies, step_dependencies
+from src.ai.llm import LLMClient
+from src.ai.plan_cache import PlanCache
+from src.ai.tool_selection import ToolSelector
+from src.registry.registry import ToolCatalog
 
 logger = logging.getLogger(__name__)
 
+class PlanStreamParser:
+    """Incrementally parse the steps out of a streamed JSON array plan.
+
+    Only the characters that arrived since the last call are scanned, so each
+    step is returned as soon as its closing brace has been generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.step_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add streamed text and return the steps it completed."""
+        self.buffer += text
+        steps = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "[{":
+                # Objects directly inside the top-level array are the steps
+                if char == "{" and self.depth == 1:
+                    self.step_start = self.position
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if char == "}" and self.depth == 1 and self.step_start is not None:
+                    steps.append(json.loads(self.buffer[self.step_start:self.position + 1]))
+                    self.step_start = None
+            self.position += 1
+        return steps
+
 class PlanningModule:
-    def __init__(self, api_key: str, endpoint: str):
-        self.client = AzureOpenAI(
-            api_key=api_key,
-            api_version="2023-05-15",
-            azure_endpoint=endpoint
-        )
+    def __init__(self, api_key: str, endpoint: str, llm: Optional[LLMClient] = None,
+                 plan_cache: Optional[PlanCache] = None, tool_selector: Optional[ToolSelector] = None):
+        self.llm = llm or LLMClient(api_key=api_key, endpoint=endpoint)
+        self.plan_cache = plan_cache
+        self.tool_selector = tool_selector
     
-    async def create_plan(self, user_request: str, available_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def create_plan(self, user_request: str,
+                          available_tools: Union[ToolCatalog, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """Create a plan based on the user request and available tools."""
         try:
-            # Create a prompt for the LLM
-            tools_description = "\n".join([
-                f"Tool: {tool['name']}\nDescription: {tool['description']}\nParameters: {json.dumps(tool['parameters'])}\n"
-                for tool in available_tools
-            ])
+            if not isinstance(available_tools, ToolCatalog):
+                available_tools = ToolCatalog(0, available_tools)
             
-            prompt = f"""
-            User Request: {user_request}
+            if self.plan_cache is not None:
+                plan = await self.plan_cache.get(user_request, available_tools.fingerprint)
+                if plan is not None:
+                    logger.info("Using cached plan")
+                    return plan
             
-            Available Tools:
-            {tools_description}
+            selected_tools = None
+            if self.tool_selector is not None:
+                selected_tools = self.tool_selector.select(user_request, available_tools)
             
-            Create a plan to fulfill the user request using the available tools.
-            The plan should be a JSON array of actions, where each action is an object with 'tool_name' and 'parameters'.
-            Only use tools that are listed above.
+            if selected_tools is not None:
+                try:
+                    plan = await self._generate_plan(user_request, selected_tools)
+                except ValueError as e:
+                    # The selection may have missed a tool the request needs
+                    logger.warning(f"Plan with {len(selected_tools)} selected tools failed, "
+                                   f"retrying with the full catalog: {str(e)}")
+                    plan = await self._generate_plan(user_request, available_tools)
+            else:
+                plan = await self._generate_plan(user_request, available_tools)
             
-            Example Plan:
-            [
-                {{
-                    "tool_name": "example_tool",
-                    "parameters": {{
-                        "param1": "value1",
-                        "param2": "value2"
-                    }}
-                }}
-            ]
+            if self.plan_cache is not None:
+                await self.plan_cache.set(user_request, available_tools.fingerprint, plan)
             
-            Return only the JSON array, no additional text.
-            """
+            return plan
+        except Exception as e:
+            logger.error(f"Error creating plan: {str(e)}")
+            raise
+    
+    async def stream_plan(self, user_request: str,
+                          available_tools: Union[ToolCatalog, List[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """Create a plan like create_plan, yielding each step as soon as it is generated and validated.
+
+        Yields {"type": "step", "step": ...} events followed by a single
+        {"type": "plan", "plan": ...} event once the whole plan is valid. A
+        {"type": "restart"} event means the steps yielded so far were rejected
+        and the plan is being generated again with the full catalog.
+        """
+        try:
+            if not isinstance(available_tools, ToolCatalog):
+                available_tools = ToolCatalog(0, available_tools)
             
-            # Call the LLM to generate a plan
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                max_tokens=2000
-            )
+            if self.plan_cache is not None:
+                plan = await self.plan_cache.get(user_request, available_tools.fingerprint)
+                if plan is not None:
+                    logger.info("Using cached plan")
+                    for step in plan:
+                        yield {"type": "step", "step": step}
+                    yield {"type": "plan", "plan": plan}
+                    return
             
-            # Extract and parse the plan
-            plan_text = response.choices[0].message.content.strip()
-            plan = json.loads(plan_text)
+            selected_tools = None
+            if self.tool_selector is not None:
+                selected_tools = self.tool_selector.select(user_request, available_tools)
             
-            # Validate the plan
-            self._validate_plan(plan, available_tools)
+            plan = None
+            if selected_tools is not None:
+                try:
+                    async for event in self._stream_generated_plan(user_request, selected_tools):
+                        if event["type"] == "plan":
+                            plan = event["plan"]
+                        else:
+                            yield event
+                except ValueError as e:
+                    logger.warning(f"Plan with {len(selected_tools)} selected tools failed, "
+                                   f"retrying with the full catalog: {str(e)}")
+                    yield {"type": "restart"}
+            if plan is None:
+                async for event in self._stream_generated_plan(user_request, available_tools):
+                    if event["type"] == "plan":
+                        plan = event["plan"]
+                    else:
+                        yield event
             
-            return plan
+            if self.plan_cache is not None:
+                await self.plan_cache.set(user_request, available_tools.fingerprint, plan)
+            
+            yield {"type": "plan", "plan": plan}
         except Exception as e:
             logger.error(f"Error creating plan: {str(e)}")
             raise
     
-    def _validate_plan(self, plan: List[Dict[str, Any]], available_tools: List[Dict[str, Any]]) -> None:
-        """Validate the generated plan."""
-        tool_names = [tool["name"] for tool in available_tools]
+    def _build_prompt(self, user_request: str, available_tools: ToolCatalog) -> str:
+        """Create the planning prompt for the LLM."""
+        # The tool descriptions are rendered once per catalog version
+        tools_description = available_tools.prompt
+        
+        return f"""
+        User Request: {user_request}
+        
+        Available Tools:
+        {tools_description}
+        
+        Create a plan to fulfill the user request using the available tools.
+        The plan should be a JSON array of actions, where each action is an object with 'tool_name' and 'parameters'.
+        Each action may also have a 'depends_on' list with the (1-based) numbers of earlier actions it needs;
+        use an empty list for actions that can run independently. A parameter value can use the output of an
+        earlier action with a reference such as "${{steps.1.result}}" or "${{steps.1.result.field}}".
+        Only use tools that are listed above.
         
-        for step in plan:
-            if step["tool_name"] not in tool_names:
-                raise ValueError(f"Tool {step['tool_name']} is not available")
+        Example Plan:
+        [
+            {{
+                "tool_name": "example_tool",
+                "parameters": {{
+                    "param1": "value1",
+                    "param2": "value2"
+                }},
+                "depends_on": []
+            }},
+            {{
+                "tool_name": "other_tool",
+                "parameters": {{
+                    "input": "${{steps.1.result}}"
+                }},
+                "depends_on": [1]
+            }}
+        ]
+        
+        Return only the JSON array, no additional text.
+        """
+    
+    async def _generate_plan(self, user_request: str, available_tools: ToolCatalog) -> List[Dict[str, Any]]:
+        """Ask the LLM for a plan using the given tools; raises ValueError for invalid plans."""
+        prompt = self._build_prompt(user_request, available_tools)
+        
+        # Call the LLM to generate a plan
+        plan_text = await self.llm.complete(prompt, temperature=0.2, max_tokens=2000)
+        
+        # Parse the plan
+        plan = json.loads(plan_text)
+        
+        # Validate the plan
+        self._validate_plan(plan, available_tools)
+        
+        return plan
+    
+    async def _stream_generated_plan(self, user_request: str,
+                                     available_tools: ToolCatalog) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a plan from the LLM as step events and a final plan event; raises ValueError for invalid plans."""
+        prompt = self._build_prompt(user_request, available_tools)
+        parser = PlanStreamParser()
+        steps = []
+        
+        # Closed as soon as a step is rejected, releasing the LLM concurrency slot
+        async with contextlib.aclosing(self.llm.stream(prompt, temperature=0.2, max_tokens=2000)) as deltas:
+            async for delta in deltas:
+                for step in parser.feed(delta):
+                    self._validate_step(step, len(steps), available_tools)
+                    steps.append(step)
+                    yield {"type": "step", "step": step}
+        
+        # The complete text must still be a valid plan made of exactly the streamed steps
+        plan = json.loads(parser.buffer.strip())
+        if plan != steps:
+            raise ValueError("Streamed plan steps do not match the complete plan")
+        
+        yield {"type": "plan", "plan": plan}
+    
+    def _validate_step(self, step: Dict[str, Any], step_index: int, available_tools: ToolCatalog) -> None:
+        """Validate one step against the tools and the steps before it."""
+        self._validate_tool(step, step_index, available_tools)
+        
+        # Raises ValueError for dependencies on unknown or later steps
+        step_dependencies(step, step_index)
+    
+    def _validate_tool(self, step: Any, step_index: int, available_tools: ToolCatalog) -> None:
+        """Check that a step is an object naming an available tool."""
+        if not isinstance(step, dict) or "tool_name" not in step:
+            raise ValueError(f"Step {step_index + 1} is not an object with a tool_name")
+        if step["tool_name"] not in available_tools.names:
+            raise ValueError(f"Tool {step['tool_name']} is not available")
+    
+    def _validate_plan(self, plan: List[Dict[str, Any]], available_tools: ToolCatalog) -> None:
+        """Validate the generated plan."""
+        if not isinstance(plan, list):
+            raise ValueError("Plan is not a JSON array")
+        for step_index, step in enumerate(plan):
+            self._validate_tool(step, step_index, available_tools)
             
-            # Could add more validation here, such as parameter checking
\ No newline at end of file
+            # Could add more validation here, such as parameter checking
+        
+        # Raises ValueError for dependencies on unknown or later steps
+        get_step_dependencies(plan)
\ No newline at end of file
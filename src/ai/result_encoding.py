@@ -0,0 +1,98 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from src.ai.execution import get_step_dependencies
+
+logger = logging.getLogger(__name__)
+
+def unwrap_result(result: Any) -> Any:
+    """Strip the controller's {"status": "success", "result": ...} envelope from a step result."""
+    if isinstance(result, dict) and result.get("status") == "success" and "result" in result:
+        return result["result"]
+    return result
+
+class ResultEncoder:
+    """Compact, size-bounded JSON encoding of a plan and its step results for LLM prompts.
+
+    Long strings, lists and objects are cut with explicit markers so the model
+    knows data was left out; the full results stay in the API response.
+    """
+
+    def __init__(self, max_string: int = 500, max_items: int = 20, max_depth: int = 6,
+                 max_total_chars: int = 12000, min_string: int = 40, min_items: int = 3):
+        self.max_string = max_string
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.max_total_chars = max_total_chars
+        # Lower bounds when shrinking the limits to fit max_total_chars
+        self.min_string = min_string
+        self.min_items = min_items
+
+    def encode_value(self, value: Any, max_string: int, max_items: int, depth: int = 0) -> Any:
+        """Copy a value with long strings, lists and objects truncated."""
+        if isinstance(value, str):
+            if len(value) > max_string:
+                return value[:max_string] + f"...[{len(value) - max_string} more chars]"
+            return value
+        if isinstance(value, (bool, int, float)) or value is None:
+            return value
+        if depth >= self.max_depth:
+            return f"[{type(value).__name__} nested too deep, omitted]"
+        if isinstance(value, dict):
+            encoded = {}
+            for index, (key, item) in enumerate(value.items()):
+                if index == max_items:
+                    encoded["..."] = f"[{len(value) - max_items} more keys]"
+                    break
+                encoded[str(key)] = self.encode_value(item, max_string, max_items, depth + 1)
+            return encoded
+        if isinstance(value, (list, tuple)):
+            encoded = [self.encode_value(item, max_string, max_items, depth + 1) for item in value[:max_items]]
+            if len(value) > max_items:
+                encoded.append(f"[{len(value) - max_items} more items]")
+            return encoded
+        return self.encode_value(str(value), max_string, max_items, depth)
+
+    def _encode_steps(self, plan: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]],
+                      max_string: int, max_items: int) -> str:
+        try:
+            dependencies = get_step_dependencies(plan)
+        except ValueError:
+            dependencies = [[] for _ in plan]
+
+        steps = []
+        for index, step in enumerate(plan):
+            # Plan and result are merged so parameters appear once
+            entry = {
+                "step": index + 1,
+                "tool": step.get("tool_name"),
+                "parameters": self.encode_value(step.get("parameters"), max_string, max_items),
+                "depends_on": [dep + 1 for dep in dependencies[index]]
+            }
+            record = results[index] if index < len(results) else None
+            if record is None:
+                entry["status"] = "not run"
+            elif "error" in record:
+                entry["status"] = "error"
+                entry["error"] = self.encode_value(record["error"], max_string, max_items)
+            else:
+                entry["status"] = "ok"
+                entry["result"] = self.encode_value(unwrap_result(record.get("result")), max_string, max_items)
+            steps.append(entry)
+        return json.dumps(steps, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def encode_run(self, plan: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]) -> str:
+        """Encode the steps of a run, shrinking the limits until it fits max_total_chars."""
+        max_string, max_items = self.max_string, self.max_items
+        while True:
+            encoded = self._encode_steps(plan, results, max_string, max_items)
+            if len(encoded) <= self.max_total_chars:
+                return encoded
+            if max_string <= self.min_string and max_items <= self.min_items:
+                break
+            max_string = max(self.min_string, max_string // 2)
+            max_items = max(self.min_items, max_items // 2)
+
+        # Still too large at the tightest limits, e.g. a very long plan
+        logger.warning(f"Encoded run of {len(encoded)} chars exceeds {self.max_total_chars}, cutting it")
+        return encoded[:self.max_total_chars] + f"...[{len(encoded) - self.max_total_chars} more chars]"
@@ -0,0 +1,132 @@
+import heapq
+import logging
+import math
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.registry.registry import ToolCatalog
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+CAMEL_CASE_PATTERN = re.compile(r"([a-z0-9])([A-Z])")
+STOP_WORDS = frozenset(
+    "a an and are as at be by can for from get i in into is it me my of on or please the this to use "
+    "using what which with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with camelCase and snake_case split and plurals folded."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(CAMEL_CASE_PATTERN.sub(r"\1 \2", text).lower()):
+        if token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count of a text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+def _schema_text(schema: Any) -> Iterator[str]:
+    """Property names and descriptions in a parameter schema."""
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "description" and isinstance(value, str):
+                yield value
+            elif key == "properties" and isinstance(value, dict):
+                for name, item in value.items():
+                    yield name
+                    yield from _schema_text(item)
+            else:
+                yield from _schema_text(value)
+    elif isinstance(schema, list):
+        for item in schema:
+            yield from _schema_text(item)
+
+class ToolIndex:
+    """BM25 index over the tools of one catalog version."""
+
+    # Name matches count more than matches in the description or the schema
+    NAME_WEIGHT = 3
+
+    def __init__(self, catalog: ToolCatalog, k1: float = 1.2, b: float = 0.75):
+        self.fingerprint = catalog.fingerprint
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+
+        for doc, tool in enumerate(catalog.tools):
+            terms = tokenize(tool["name"]) * self.NAME_WEIGHT
+            terms += tokenize(tool.get("description") or "")
+            terms += [term for text in _schema_text(tool.get("parameters")) for term in tokenize(text)]
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((doc, count))
+            self.lengths.append(len(terms))
+
+        documents = len(self.lengths)
+        self.average_length = sum(self.lengths) / documents if documents else 0.0
+        # Per-tool BM25 length normalization, computed once instead of per query term
+        self.norms = [k1 * (1 - b + b * length / (self.average_length or 1.0)) for length in self.lengths]
+        self.idf = {
+            term: math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        """Return up to limit (score, tool position) pairs with a positive score, best first."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, count in self.postings[term]:
+                scores[doc] = scores.get(doc, 0.0) + idf * count * (self.k1 + 1) / (count + self.norms[doc])
+        return heapq.nlargest(limit, ((score, doc) for doc, score in scores.items()))
+
+class ToolSelector:
+    """Narrows a large catalog to the tools most relevant to a request, within a prompt token budget.
+
+    The index is built once per catalog version, either lazily on first use or
+    eagerly from a registry listener.
+    """
+
+    def __init__(self, top_k: int = 20, token_budget: int = 2000, min_catalog_size: int = 30):
+        self.top_k = top_k
+        self.token_budget = token_budget
+        # Smaller catalogs are sent whole; selection would save little and risk missing a tool
+        self.min_catalog_size = min_catalog_size
+        self._index: Optional[ToolIndex] = None
+
+    def index(self, catalog: ToolCatalog) -> ToolIndex:
+        index = self._index
+        if index is None or index.fingerprint != catalog.fingerprint:
+            index = ToolIndex(catalog)
+            self._index = index
+            logger.info(f"Built tool index for {len(catalog)} tools")
+        return index
+
+    def select(self, user_request: str, catalog: ToolCatalog) -> Optional[ToolCatalog]:
+        """Return the selected tools as a catalog, or None to use the full catalog."""
+        if len(catalog) <= self.min_catalog_size:
+            return None
+
+        matches = self.index(catalog).search(user_request, self.top_k)
+        if not matches:
+            return None
+
+        selected = []
+        budget = self.token_budget
+        for _, doc in matches:
+            tool = catalog.tools[doc]
+            cost = estimate_tokens(catalog.prompt_fragments[tool["name"]])
+            if selected and cost > budget:
+                break
+            selected.append(tool)
+            budget -= cost
+        return ToolCatalog(catalog.version, selected)
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.ai.plan_cache import normalize_request
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class RequestCoalescer:
+    """Single-flight execution of identical concurrent agent requests.
+
+    The first caller starts the run and later callers with the same key wait
+    for its result. A waiter that is cancelled only stops waiting; the run
+    itself is cancelled once its last waiter has gone.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, _Flight] = {}
+        self.runs = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def make_key(self, user_request: str, catalog_fingerprint: str, scope: Optional[str]) -> str:
+        """Key on the normalized request, the tool catalog and the caller's scope."""
+        canonical = json.dumps([normalize_request(user_request), catalog_fingerprint, scope])
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def run(self, key: str, execute: Callable[[], Awaitable[Any]]) -> Any:
+        """Join the in-flight run for the key, or start one with execute."""
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            logger.info("Joining in-flight agent run for an identical request")
+        else:
+            self.runs += 1
+            # Run detached from the caller so one caller cancelling does not fail the others
+            flight = _Flight(asyncio.ensure_future(execute()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda task: self._release(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is waiting for the result any more
+                self.abandoned += 1
+                self._release(key, flight)
+                flight.task.cancel()
+
+    def _release(self, key: str, flight: _Flight):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing metrics for monitoring."""
+        return {
+            "in_flight": len(self._in_flight),
+            "waiting": sum(flight.waiters for flight in self._in_flight.values()),
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned
+        }
@@ -1,69 +1,269 @@
+import asyncio
+import contextlib
 import logging
 import json
-from fastapi import FastAPI, HTTPException, Depends
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from src.security.auth import create_access_token, authenticate_request
-from src.registry.registry import ToolRegistry
+from src.security.auth import create_access_token, authenticate_request, signing_keys
+from src.registry.registry import ToolCatalog, ToolRegistry
 from src.ai.planning import PlanningModule
-from src.ai.execution import ExecutionEngine
+from src.ai.execution import ExecutionEngine, PlanRun
 from src.ai.feedback import FeedbackLoop
+from src.ai.llm import LLMClient
+from src.ai.plan_cache import PlanCache
+from src.ai.result_encoding import ResultEncoder
+from src.ai.tool_selection import ToolSelector
+from src.common.http_client import HTTPClientPool
+from src.api.coalescing import RequestCoalescer
+from src.api.run_queue import QueueFullError, RunQueue
+from src.common.lifecycle import Readiness
+from src.monitoring.journal import RunJournal
+from src.monitoring.monitoring import MetricsMiddleware, configure_monitoring, phase, record_phase, render_metrics
 from datetime import timedelta
 
-app = FastAPI(title="MCP API Gateway")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize components
-registry = ToolRegistry()
+http_clients = HTTPClientPool(
+    max_connections_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50")),
+    http2=os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+)
+registry = ToolRegistry(refresh_interval=float(os.getenv("REGISTRY_REFRESH_INTERVAL", "30")), lazy=True)
+# Shared by planning and feedback so the concurrency limit covers both
+llm = LLMClient(
+    api_key=os.getenv("AZURE_OPENAI_KEY", "your-azure-openai-key"),
+    endpoint=os.getenv("AZURE_OPENAI_ENDPOINT", "your-azure-openai-endpoint"),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    timeout=float(os.getenv("LLM_TIMEOUT", "60"))
+)
+plan_cache = PlanCache(
+    ttl=float(os.getenv("PLAN_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1024"))
+)
+registry.add_listener(plan_cache.on_catalog_changed)
+# Large catalogs are narrowed to the tools relevant to each request before planning
+tool_selector = ToolSelector(
+    top_k=int(os.getenv("TOOL_SELECTION_TOP_K", "20")),
+    token_budget=int(os.getenv("TOOL_SELECTION_TOKEN_BUDGET", "2000")),
+    min_catalog_size=int(os.getenv("TOOL_SELECTION_MIN_TOOLS", "30"))
+)
+# Rebuild the selection index when the catalog changes rather than on the next request
+registry.add_listener(lambda: tool_selector.index(registry.catalog()))
 planning = PlanningModule(
     api_key="your-azure-openai-key",
-    endpoint="your-azure-openai-endpoint"
+    endpoint="your-azure-openai-endpoint",
+    llm=llm,
+    plan_cache=plan_cache,
+    tool_selector=tool_selector
 )
+# Stream the plan and start each step once it is validated, overlapping tool calls with plan generation.
+# Off by default: steps of a plan that is later rejected are cancelled, but may already have run.
+SPECULATIVE_EXECUTION = os.getenv("PLAN_SPECULATIVE_EXECUTION", "false").lower() == "true"
 execution = ExecutionEngine(
-    mcp_controller_url="http://mcp-controller:8000",
-    auth_token="internal-token"  # In production, use a secure token
+    mcp_controller_url=os.getenv("MCP_CONTROLLER_URL", "http://mcp-controller:8000"),
+    auth_token=os.getenv("MCP_CONTROLLER_TOKEN", "internal-token"),  # In production, use a secure token
+    max_concurrency=int(os.getenv("EXECUTION_MAX_CONCURRENCY", "16")),
+    max_plan_concurrency=int(os.getenv("EXECUTION_MAX_PLAN_CONCURRENCY", "4")),
+    http_client=http_clients,
+    timeout=float(os.getenv("EXECUTION_STEP_TIMEOUT", "120")),
+    # Independent steps that become ready together are sent to the controller in one batch
+    batch_window=(
+        float(os.getenv("EXECUTION_BATCH_WINDOW", "0.005"))
+        if os.getenv("EXECUTION_BATCH_ENABLED", "false").lower() == "true" else None
+    )
 )
+# Steps of tools with their own timeout wait for it plus a margin, so the controller's timeout error arrives first
+EXECUTION_TIMEOUT_MARGIN = float(os.getenv("EXECUTION_TIMEOUT_MARGIN", "5"))
+
+def _update_tool_timeouts():
+    """Registry listener applying the tools' own timeouts to their steps."""
+    execution.tool_timeouts = {
+        name: timeout + EXECUTION_TIMEOUT_MARGIN for name, timeout in registry.catalog().timeouts.items()
+    }
+
+registry.add_listener(_update_tool_timeouts)
 feedback = FeedbackLoop(
     api_key="your-azure-openai-key",
-    endpoint="your-azure-openai-endpoint"
+    endpoint="your-azure-openai-endpoint",
+    llm=llm,
+    # Bounds the size of step results in the analysis prompt
+    encoder=ResultEncoder(
+        max_string=int(os.getenv("FEEDBACK_MAX_FIELD_CHARS", "500")),
+        max_items=int(os.getenv("FEEDBACK_MAX_ITEMS", "20")),
+        max_total_chars=int(os.getenv("FEEDBACK_MAX_RESULTS_CHARS", "12000"))
+    ),
+    # Fast path: small, error-free runs get a templated analysis, others may use a cheaper model
+    rule_max_chars=int(os.getenv("FEEDBACK_RULE_MAX_CHARS", "0")),
+    fast_model=os.getenv("FEEDBACK_FAST_MODEL") or None
+)
+# In async mode /agent/execute returns the results without waiting for an LLM analysis,
+# which completes in the background as a run that can be fetched from /agent/runs
+FEEDBACK_ASYNC = os.getenv("FEEDBACK_MODE", "sync").lower() == "async"
+# Identical concurrent /agent/execute requests from the same scope (a token claim) share one run;
+# tokens without the claim are never coalesced. With a claim wider than "sub", a deferred analysis
+# run belongs to the caller that started the run and is not returned to the others.
+coalescer = RequestCoalescer() if os.getenv("REQUEST_COALESCING_ENABLED", "false").lower() == "true" else None
+COALESCING_SCOPE_CLAIM = os.getenv("REQUEST_COALESCING_SCOPE_CLAIM", "sub")
+
+# Agent runs submitted to /agent/runs are processed in the background by a bounded worker pool
+run_queue = RunQueue(
+    workers=int(os.getenv("RUN_QUEUE_WORKERS", "4")),
+    max_depth=int(os.getenv("RUN_QUEUE_MAX_DEPTH", "100")),
+    retention=float(os.getenv("RUN_RETENTION", "3600"))
 )
+# Compact record of every run for profiling and offline replay (see benchmarks/replay_journal.py)
+journal = RunJournal(
+    os.environ["RUN_JOURNAL_PATH"],
+    max_bytes=int(os.getenv("RUN_JOURNAL_MAX_BYTES", str(64 * 1024 * 1024))),
+    backups=int(os.getenv("RUN_JOURNAL_BACKUPS", "5")),
+    flush_interval=float(os.getenv("RUN_JOURNAL_FLUSH_INTERVAL", "1"))
+) if os.getenv("RUN_JOURNAL_PATH") else None
+readiness = Readiness()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-@app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    """Authenticate user and return token."""
-    # In a real application, verify credentials against a database
-    if form_data.username != "test" or form_data.password != "test":
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    access_token = create_access_token(
-        data={"sub": form_data.username},
-        expires_delta=timedelta(minutes=30)
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+async def _on_ready():
+    """Start the background work that needs the loaded registry."""
+    await registry.start_refresher()
+    run_queue.start(_process_run)
 
-@app.post("/agent/execute")
-async def execute_agent(request: dict, token: str = Depends(authenticate_request)):
-    """Execute the agent to fulfill a user request."""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load secrets and the tool catalog concurrently without delaying startup."""
+    readiness.start({
+        "monitoring": lambda: asyncio.get_event_loop().run_in_executor(None, configure_monitoring),
+        "signing_keys": signing_keys.get,
+        "registry": registry.initialize
+    }, on_ready=_on_ready)
+    if journal is not None:
+        journal.start()
+    yield
+    # Stop the run workers and the registry refresher and close pooled connections to the MCP controller and the LLM
+    await readiness.stop()
+    await run_queue.stop()
+    if journal is not None:
+        await journal.stop()
+    await registry.stop_refresher()
+    await http_clients.close()
+    await llm.close()
+
+app = FastAPI(title="MCP API Gateway", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, service="gateway")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe; does not depend on initialization."""
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and in-flight gauges in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe; 503 until secrets and the tool catalog are loaded."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+async def _cancel_on_disconnect(http_request: Request, awaitable: Awaitable, poll_interval: float = 0.5):
+    """Await the work, cancelling it if the HTTP client disconnects first."""
+    task = asyncio.ensure_future(awaitable)
     try:
-        user_request = request.get("request")
-        if not user_request:
-            raise HTTPException(status_code=400, detail="Missing user request")
-        
-        # Get available tools
-        tools = registry.list_tools()
-        
-        # Create a plan
-        plan = await planning.create_plan(user_request, tools)
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling agent run")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def _analyze_later(user_request: str, plan: List[Dict[str, Any]], results: List[Dict[str, Any]],
+                         emit: Callable[[str, Any], Awaitable[None]]) -> Dict[str, Any]:
+    """Run handler completing the analysis of a run whose results were already returned."""
+    with phase("feedback", deferred=True):
+        # Only runs without a rule-based analysis are deferred
+        analysis = await feedback.llm_analysis(user_request, plan, results)
+    logger.info(f"Deferred analysis completed: success={analysis['success']}")
+    await emit("analysis", analysis)
+    return {"analysis": analysis, "response": analysis["user_response"]}
+
+def _journal_run(user_request: str, kind: str, tools: ToolCatalog):
+    """Journal the run if a journal is configured; otherwise its entry is discarded."""
+    if journal is None:
+        return contextlib.nullcontext({})
+    return journal.run(user_request, kind=kind, catalog=tools.fingerprint)
+
+async def _create_plan(user_request: str, tools: ToolCatalog) -> Tuple[List[Dict[str, Any]], Optional[PlanRun]]:
+    """Create a plan, with the run of its steps when they were started speculatively."""
+    if not SPECULATIVE_EXECUTION:
+        return await planning.create_plan(user_request, tools), None
+    
+    run = execution.start_plan()
+    try:
+        async for event in planning.stream_plan(user_request, tools):
+            if event["type"] == "step":
+                run.add_step(event["step"])
+            elif event["type"] == "restart":
+                # The steps so far belong to a rejected plan
+                run.cancel()
+                run = execution.start_plan()
+    except BaseException:
+        run.cancel()
+        raise
+    return run.plan, run
+
+async def _run_agent(user_request: str, owner: Optional[str] = None) -> Dict[str, Any]:
+    """Plan, execute and analyze a user request."""
+    # Get available tools
+    tools = registry.catalog()
+    
+    with _journal_run(user_request, "execute", tools) as entry:
+        # Create a plan, possibly already executing its first steps
+        with phase("planning", tools=len(tools)):
+            plan, run = await _create_plan(user_request, tools)
+        entry["plan"] = plan
         logger.info(f"Created plan with {len(plan)} steps")
         
         # Execute the plan
-        results = await execution.execute_plan(plan)
+        with phase("execution", steps=len(plan)):
+            if run is None:
+                run = execution.start_plan(plan)
+            results = await run.gather()
+        entry["steps"] = results
         logger.info(f"Executed plan with {len(results)} results")
         
-        # Analyze results and provide feedback
-        analysis = await feedback.analyze_results(user_request, plan, results)
+        if FEEDBACK_ASYNC:
+            # A rule-based analysis is immediate; only an LLM analysis is deferred
+            analysis = feedback.quick_analysis(plan, results)
+            if analysis is None:
+                record = await run_queue.track(
+                    {"request": user_request, "analysis_only": True},
+                    lambda record, emit: _analyze_later(user_request, plan, results, emit),
+                    owner=owner
+                )
+                return {
+                    "success": True,
+                    "plan": plan,
+                    "results": results,
+                    "analysis": None,
+                    "response": None,
+                    "analysis_run_id": record["run_id"]
+                }
+        else:
+            # Analyze results and provide feedback
+            with phase("feedback"):
+                analysis = await feedback.analyze_results(user_request, plan, results)
+        entry["analysis"] = analysis
         logger.info(f"Analysis completed: success={analysis['success']}")
         
         # Return the complete response
@@ -74,6 +274,223 @@ async def execute_agent(request: dict, token: str = Depends(authenticate_request
             "analysis": analysis,
             "response": analysis["user_response"]
         }
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _agent_events(user_request: str, kind: str = "stream") -> AsyncIterator[Tuple[str, Any]]:
+    """Plan, execute and analyze a user request, yielding (event, data) as each phase completes."""
+    tools = registry.catalog()
+    
+    with _journal_run(user_request, kind, tools) as entry:
+        with phase("planning", tools=len(tools)):
+            plan, run = await _create_plan(user_request, tools)
+        entry["plan"] = plan
+        logger.info(f"Created plan with {len(plan)} steps")
+        
+        try:
+            yield "plan", plan
+        
+            # Spans must not stay open across yields, so the streamed phases are only timed
+            start = time.perf_counter()
+            if run is None:
+                run = execution.start_plan(plan)
+            results = [None] * len(plan)
+            async for result in run.as_completed():
+                results[result["step"] - 1] = result
+                yield "step", result
+            record_phase("execution", time.perf_counter() - start)
+            entry["steps"] = results
+        finally:
+            # Speculatively started steps are cancelled if the client goes away before they are consumed
+            if run is not None:
+                run.cancel()
+        logger.info(f"Executed plan with {len(results)} results")
+        
+        start = time.perf_counter()
+        async for event in feedback.stream_analysis(user_request, plan, results):
+            if event["type"] == "token":
+                yield "token", event["text"]
+            else:
+                analysis = event["analysis"]
+        record_phase("feedback", time.perf_counter() - start)
+        entry["analysis"] = analysis
+        logger.info(f"Analysis completed: success={analysis['success']}")
+        yield "analysis", analysis
+
+async def _stream_agent(user_request: str) -> AsyncIterator[str]:
+    """Plan, execute and analyze a user request, emitting an event as each phase completes."""
+    # Flush the response headers right away
+    yield ": started\n\n"
+    
+    try:
+        # Closed with the response stream, so a disconnect cancels the steps right away rather than at collection
+        async with contextlib.aclosing(_agent_events(user_request)) as events:
+            async for event, data in events:
+                yield _sse_event(event, data)
+                if event == "analysis":
+                    analysis = data
+        
+        yield _sse_event("done", {"success": True, "response": analysis["user_response"]})
     except Exception as e:
         logger.error(f"Error executing agent: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        yield _sse_event("error", {"detail": str(e)})
+
+async def _process_run(record: Dict[str, Any], emit: Callable[[str, Any], Awaitable[None]]) -> Dict[str, Any]:
+    """Run handler for the run queue, publishing the agent events of a queued run."""
+    user_request = record["request"]["request"]
+    result = {"success": True, "plan": None, "results": [], "analysis": None}
+    async with contextlib.aclosing(_agent_events(user_request, kind="queued")) as events:
+        async for event, data in events:
+            await emit(event, data)
+            if event == "plan":
+                result["plan"] = data
+                result["results"] = [None] * len(data)
+            elif event == "step":
+                result["results"][data["step"] - 1] = data
+            elif event == "analysis":
+                result["analysis"] = data
+    result["response"] = result["analysis"]["user_response"]
+    return result
+
+async def _get_own_run(run_id: str, token: Dict[str, Any]) -> Dict[str, Any]:
+    """Load a run, hiding runs submitted by other users."""
+    record = await run_queue.get(run_id)
+    if record is None or record["owner"] != token.get("sub"):
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return record
+
+async def _stream_run(run_id: str) -> AsyncIterator[str]:
+    """Replay and follow the events of a queued run as server-sent events."""
+    yield ": started\n\n"
+    async for event in run_queue.subscribe(run_id):
+        yield f"id: {event['seq']}\n" + _sse_event(event["event"], event["data"])
+
+@app.post("/token", dependencies=[Depends(readiness.require_ready)])
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    """Authenticate user and return token."""
+    # In a real application, verify credentials against a database
+    if form_data.username != "test" or form_data.password != "test":
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    access_token = create_access_token(
+        data={"sub": form_data.username},
+        expires_delta=timedelta(minutes=30)
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@app.get("/plan_cache/stats")
+async def plan_cache_stats(token: str = Depends(authenticate_request)):
+    """Return plan cache hit/miss metrics."""
+    return plan_cache.stats()
+
+@app.get("/feedback/stats")
+async def feedback_stats(token: str = Depends(authenticate_request)):
+    """Return how many analyses took the rule-based fast path."""
+    return feedback.stats()
+
+@app.get("/run_journal/stats")
+async def run_journal_stats(token: str = Depends(authenticate_request)):
+    """Return how many runs were journaled, written and dropped."""
+    if journal is None:
+        raise HTTPException(status_code=404, detail="Run journal is disabled")
+    return journal.stats()
+
+@app.get("/request_coalescing/stats")
+async def request_coalescing_stats(token: str = Depends(authenticate_request)):
+    """Return how many /agent/execute requests joined an identical in-flight run."""
+    if coalescer is None:
+        raise HTTPException(status_code=404, detail="Request coalescing is disabled")
+    return coalescer.stats()
+
+async def _hide_foreign_analysis_run(result: Dict[str, Any], token: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the analysis run of a joined run unless the caller owns it, as only its owner can read it."""
+    run_id = result.get("analysis_run_id")
+    if run_id is None:
+        return result
+    record = await run_queue.get(run_id)
+    if record is not None and record["owner"] == token.get("sub"):
+        return result
+    return dict(result, analysis_run_id=None)
+
+@app.post("/agent/execute", dependencies=[Depends(readiness.require_ready)])
+async def execute_agent(request: dict, http_request: Request, token: dict = Depends(authenticate_request)):
+    """Execute the agent to fulfill a user request."""
+    user_request = request.get("request")
+    if not user_request:
+        raise HTTPException(status_code=400, detail="Missing user request")
+    
+    try:
+        owner = token.get("sub")
+        scope = token.get(COALESCING_SCOPE_CLAIM) if coalescer is not None else None
+        if not scope:
+            # Without the scope claim, runs of different users could not be told apart
+            return await _cancel_on_disconnect(http_request, _run_agent(user_request, owner=owner))
+        
+        key = coalescer.make_key(user_request, registry.catalog().fingerprint, scope)
+        # A disconnecting client only stops waiting; the run goes on while others wait for it
+        result = await _cancel_on_disconnect(
+            http_request, coalescer.run(key, lambda: _run_agent(user_request, owner=owner))
+        )
+        return await _hide_foreign_analysis_run(result, token)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error executing agent: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/agent/execute/stream", dependencies=[Depends(readiness.require_ready)])
+async def execute_agent_stream(request: dict, token: str = Depends(authenticate_request)):
+    """Execute the agent, streaming plan, step results and the analysis as server-sent events."""
+    user_request = request.get("request")
+    if not user_request:
+        raise HTTPException(status_code=400, detail="Missing user request")
+    
+    # The response stream is cancelled, and with it the run, if the client disconnects
+    return StreamingResponse(
+        _stream_agent(user_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/agent/runs", status_code=202, dependencies=[Depends(readiness.require_ready)])
+async def submit_run(request: dict, token: dict = Depends(authenticate_request)):
+    """Queue an agent run and return its id without waiting for it."""
+    if not request.get("request"):
+        raise HTTPException(status_code=400, detail="Missing user request")
+    
+    try:
+        record = await run_queue.submit({"request": request["request"]}, owner=token.get("sub"))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return {"run_id": record["run_id"], "status": record["status"]}
+
+@app.get("/agent/runs/{run_id}")
+async def get_run(run_id: str, token: dict = Depends(authenticate_request)):
+    """Return the status of a run, with its result once it has finished."""
+    record = await _get_own_run(run_id, token)
+    record.pop("owner", None)
+    return record
+
+@app.get("/agent/runs/{run_id}/events")
+async def stream_run(run_id: str, token: dict = Depends(authenticate_request)):
+    """Stream the events of a run as server-sent events, from its first event until it finishes."""
+    await _get_own_run(run_id, token)
+    return StreamingResponse(
+        _stream_run(run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/agent/runs/{run_id}")
+async def cancel_run(run_id: str, token: dict = Depends(authenticate_request)):
+    """Cancel a queued run, or a running one on this replica."""
+    await _get_own_run(run_id, token)
+    record = await run_queue.cancel(run_id)
+    return {"run_id": run_id, "status": record["status"]}
+
+@app.get("/run_queue/stats")
+async def run_queue_stats(token: str = Depends(authenticate_request)):
+    """Return run queue depth and worker metrics."""
+    return await run_queue.stats()
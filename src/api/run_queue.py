@@ -0,0 +1,472 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+REJECTED = "rejected"
+TERMINAL_STATUSES = frozenset({SUCCEEDED, FAILED, CANCELLED, REJECTED})
+
+# Events that end a run's event stream
+TERMINAL_EVENTS = frozenset({"done", "error", "cancelled"})
+
+class QueueFullError(Exception):
+    """Raised when a run is submitted while the queue is at its depth limit."""
+
+class RunQueueBackend:
+    """Storage for queued run ids, run records and run events."""
+
+    async def push(self, run_id: str, max_depth: int) -> bool:
+        """Queue a run id; returns False if the queue already holds max_depth runs."""
+        raise NotImplementedError
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        """Take the next run id, or None if none arrived within the timeout."""
+        raise NotImplementedError
+
+    async def ack(self, run_id: str):
+        """Mark a popped run as processed."""
+
+    async def touch(self, run_id: str):
+        """Renew the claim on a popped run that is still being processed."""
+
+    async def requeue_stale(self) -> int:
+        """Queue again the popped runs whose claim lapsed, e.g. because their replica stopped; returns how many."""
+        return 0
+
+    async def requeue(self, record: Dict[str, Any]) -> bool:
+        """Put back a popped run this replica stops processing; returns False if the queue would not keep it."""
+        return False
+
+    async def depth(self) -> int:
+        raise NotImplementedError
+
+    async def save(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def append_event(self, run_id: str, event: Dict[str, Any]):
+        raise NotImplementedError
+
+    def subscribe(self, run_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the events of a run from the first one, following it until a terminal event."""
+        raise NotImplementedError
+
+class LocalRunQueueBackend(RunQueueBackend):
+    """In-process queue; runs are lost when the process exits."""
+
+    def __init__(self, max_runs: int = 1024, retention: float = 3600.0):
+        self.runs = TTLCache(maxsize=max_runs, ttl=retention)
+        self.events = TTLCache(maxsize=max_runs, ttl=retention)
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        # Created lazily so that it is bound to the running event loop
+        self._queue: Optional[asyncio.Queue] = None
+
+    def _get_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def push(self, run_id: str, max_depth: int) -> bool:
+        queue = self._get_queue()
+        if queue.qsize() >= max_depth:
+            return False
+        queue.put_nowait(run_id)
+        return True
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._get_queue().get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def depth(self) -> int:
+        return self._get_queue().qsize()
+
+    async def save(self, record: Dict[str, Any]):
+        self.runs[record["run_id"]] = dict(record)
+
+    async def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        record = self.runs.get(run_id)
+        return dict(record) if record is not None else None
+
+    async def append_event(self, run_id: str, event: Dict[str, Any]):
+        events = self.events.get(run_id)
+        if events is None:
+            events = self.events[run_id] = []
+        events.append(event)
+        for listener in self._listeners.get(run_id, ()):
+            listener.put_nowait(event)
+
+    async def subscribe(self, run_id: str) -> AsyncIterator[Dict[str, Any]]:
+        # Listen before replaying so no event falls between the two; duplicates are skipped by seq
+        listener: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(run_id, set()).add(listener)
+        try:
+            last_seq = 0
+            for event in list(self.events.get(run_id, ())):
+                last_seq = event["seq"]
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                event = await listener.get()
+                if event["seq"] <= last_seq:
+                    continue
+                last_seq = event["seq"]
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            listeners = self._listeners.get(run_id)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del self._listeners[run_id]
+
+class RedisRunQueueBackend(RunQueueBackend):
+    """Durable queue shared between gateway replicas, using a redis.asyncio compatible client.
+
+    Popped runs are moved to a processing list until they are acknowledged, and
+    claimed with a timestamp that the processing replica keeps renewing. A run
+    whose claim is older than claim_timeout is taken back from the processing
+    list and queued again, unless it already finished. Events are kept in a
+    capped stream per run so subscribers on any replica can replay and follow
+    them.
+    """
+
+    def __init__(self, client, namespace: str = "mcp:runs", retention: float = 3600.0,
+                 max_events: int = 10000, claim_timeout: float = 60.0):
+        self.client = client
+        self.namespace = namespace
+        self.retention = retention
+        self.max_events = max_events
+        self.claim_timeout = claim_timeout
+        self.queue_key = f"{namespace}:queue"
+        self.processing_key = f"{namespace}:processing"
+        self.claims_key = f"{namespace}:claims"
+
+    def _run_key(self, run_id: str) -> str:
+        return f"{self.namespace}:run:{run_id}"
+
+    def _events_key(self, run_id: str) -> str:
+        return f"{self.namespace}:events:{run_id}"
+
+    async def push(self, run_id: str, max_depth: int) -> bool:
+        # The check and the push are not atomic, so the limit can be exceeded by a few concurrent submits
+        if await self.client.llen(self.queue_key) >= max_depth:
+            return False
+        await self.client.lpush(self.queue_key, run_id)
+        return True
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        run_id = _decode(await self.client.blmove(
+            self.queue_key, self.processing_key, max(1, int(timeout)), "RIGHT", "LEFT"
+        ))
+        if run_id is not None:
+            await self.touch(run_id)
+        return run_id
+
+    async def ack(self, run_id: str):
+        await self.client.lrem(self.processing_key, 1, run_id)
+        await self.client.hdel(self.claims_key, run_id)
+
+    async def touch(self, run_id: str):
+        await self.client.hset(self.claims_key, run_id, time.time())
+
+    async def requeue_stale(self) -> int:
+        claims = {_decode(run_id): float(claimed_at)
+                  for run_id, claimed_at in (await self.client.hgetall(self.claims_key)).items()}
+        now = time.time()
+        requeued = 0
+        for run_id in await self.client.lrange(self.processing_key, 0, -1):
+            run_id = _decode(run_id)
+            claimed_at = claims.get(run_id)
+            if claimed_at is None:
+                # Popped by a replica that stopped before claiming it; the claim starts now
+                await self.client.hsetnx(self.claims_key, run_id, now)
+                continue
+            if now - claimed_at < self.claim_timeout:
+                continue
+            # Of several sweeping replicas, only the one that removes the entry requeues it
+            if not await self.client.lrem(self.processing_key, 1, run_id):
+                continue
+            record = await self.load(run_id)
+            if record is None or record["status"] in TERMINAL_STATUSES:
+                # Finished, or expired, before it was acknowledged
+                await self.client.hdel(self.claims_key, run_id)
+                continue
+            await self._push_back(record)
+            requeued += 1
+        return requeued
+
+    async def requeue(self, record: Dict[str, Any]) -> bool:
+        if await self.client.lrem(self.processing_key, 1, record["run_id"]):
+            await self._push_back(record)
+        return True
+
+    async def _push_back(self, record: Dict[str, Any]):
+        """Queue a run taken from the processing list again, ahead of the runs that have not waited yet.
+
+        The saved record may lag behind the events already emitted, so the run
+        continues after the last event in its stream, starting with a
+        "requeued" event, and subscribers never see a sequence number twice.
+        """
+        run_id = record["run_id"]
+        last = await self.client.xrevrange(self._events_key(run_id), count=1)
+        last_seq = json.loads(_field(last[0][1], "event"))["seq"] if last else 0
+        record.update(status=QUEUED, started_at=None, events=max(record["events"], last_seq) + 1)
+        await self.append_event(run_id, {"seq": record["events"], "event": "requeued", "data": {"status": QUEUED}})
+        await self.save(record)
+        await self.client.hdel(self.claims_key, run_id)
+        await self.client.rpush(self.queue_key, run_id)
+
+    async def depth(self) -> int:
+        return await self.client.llen(self.queue_key)
+
+    async def save(self, record: Dict[str, Any]):
+        await self.client.set(self._run_key(record["run_id"]), json.dumps(record), ex=int(self.retention))
+
+    async def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        value = await self.client.get(self._run_key(run_id))
+        return json.loads(value) if value is not None else None
+
+    async def append_event(self, run_id: str, event: Dict[str, Any]):
+        key = self._events_key(run_id)
+        await self.client.xadd(key, {"event": json.dumps(event)}, maxlen=self.max_events, approximate=True)
+        await self.client.expire(key, int(self.retention))
+
+    async def subscribe(self, run_id: str) -> AsyncIterator[Dict[str, Any]]:
+        key = self._events_key(run_id)
+        last_id = "0"
+        last_seq = 0
+        while True:
+            response = await self.client.xread({key: last_id}, block=1000)
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    event = json.loads(_field(fields, "event"))
+                    # A run interrupted before its record was saved may emit a sequence number again
+                    if event["seq"] <= last_seq:
+                        continue
+                    last_seq = event["seq"]
+                    yield event
+                    if event["event"] in TERMINAL_EVENTS:
+                        return
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+def _field(fields: Dict[Any, Any], name: str) -> Any:
+    """A field of a stream entry, whether or not the client decodes responses."""
+    return fields.get(name.encode("utf-8"), fields.get(name))
+
+# Coroutine handler(record, emit) -> result, where emit(event, data) publishes a run event
+RunHandler = Callable[[Dict[str, Any], Callable[[str, Any], Awaitable[None]]], Awaitable[Any]]
+
+class RunQueue:
+    """Accepts agent runs for background processing by a bounded pool of workers."""
+
+    def __init__(self, backend: Optional[RunQueueBackend] = None, workers: int = 4, max_depth: int = 100,
+                 retention: float = 3600.0, poll_timeout: float = 1.0, claim_interval: float = 10.0):
+        self.backend = backend or LocalRunQueueBackend(retention=retention)
+        self.workers = workers
+        self.max_depth = max_depth
+        self.poll_timeout = poll_timeout
+        # How often claims on runs being processed are renewed and stale claims are swept
+        self.claim_interval = claim_interval
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._handler: Optional[RunHandler] = None
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        # Runs executing on this replica, so they can be cancelled
+        self._running: Dict[str, asyncio.Task] = {}
+        self._tracked: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _new_record(request: Dict[str, Any], owner: Optional[str]) -> Dict[str, Any]:
+        return {
+            "run_id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "owner": owner,
+            "request": request,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "events": 0
+        }
+
+    async def submit(self, request: Dict[str, Any], owner: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a run and return its record; raises QueueFullError at the depth limit."""
+        record = self._new_record(request, owner)
+        await self.backend.save(record)
+        if not await self.backend.push(record["run_id"], self.max_depth):
+            record["status"] = REJECTED
+            await self.backend.save(record)
+            self.rejected += 1
+            raise QueueFullError(f"Run queue is full ({self.max_depth} runs waiting)")
+        self.submitted += 1
+        return record
+
+    async def track(self, request: Dict[str, Any], handler: RunHandler,
+                    owner: Optional[str] = None) -> Dict[str, Any]:
+        """Start a run right away, outside the queue and its depth limit, and return its record.
+
+        Used for work that finishes in the background after its request has been
+        answered, so it can be followed like a queued run.
+        """
+        record = self._new_record(request, owner)
+        record.update(status=RUNNING, started_at=time.time())
+        await self.backend.save(record)
+        task = asyncio.ensure_future(self._process(record, handler))
+        self._tracked.add(task)
+        task.add_done_callback(self._tracked.discard)
+        return record
+
+    async def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return await self.backend.load(run_id)
+
+    def subscribe(self, run_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Follow the events of a run, replaying those already emitted."""
+        return self.backend.subscribe(run_id)
+
+    async def cancel(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued run, or a running one if it executes on this replica."""
+        record = await self.backend.load(run_id)
+        if record is None or record["status"] in TERMINAL_STATUSES:
+            return record
+        task = self._running.get(run_id)
+        if task is not None:
+            task.cancel()
+        elif record["status"] == QUEUED:
+            # The worker that pops it will skip it
+            await self._finish(record, CANCELLED, error="Cancelled")
+        return await self.backend.load(run_id)
+
+    def start(self, handler: RunHandler):
+        """Start the workers processing queued runs with the handler."""
+        self._handler = handler
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.ensure_future(self._work()))
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def stop(self):
+        workers, self._workers = self._workers + list(self._tracked), []
+        if self._sweeper is not None:
+            workers.append(self._sweeper)
+            self._sweeper = None
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _emit(self, record: Dict[str, Any], event: str, data: Any):
+        record["events"] += 1
+        await self.backend.append_event(record["run_id"], {"seq": record["events"], "event": event, "data": data})
+
+    async def _finish(self, record: Dict[str, Any], status: str, result: Any = None, error: Optional[str] = None):
+        record.update(status=status, result=result, error=error, finished_at=time.time())
+        await self.backend.save(record)
+        if status == SUCCEEDED:
+            await self._emit(record, "done", {"status": status})
+        elif status == CANCELLED:
+            await self._emit(record, "cancelled", {"status": status})
+        else:
+            await self._emit(record, "error", {"status": status, "detail": error})
+        await self.backend.save(record)
+
+    async def _work(self):
+        while True:
+            try:
+                run_id = await self.backend.pop(self.poll_timeout)
+                if run_id is None:
+                    continue
+                record = await self.backend.load(run_id)
+                if record is not None and record["status"] == QUEUED:
+                    heartbeat = asyncio.ensure_future(self._keep_claimed(run_id))
+                    try:
+                        await self._process(record, self._handler, queued=True)
+                    finally:
+                        heartbeat.cancel()
+                await self.backend.ack(run_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in run queue worker: {str(e)}")
+                await asyncio.sleep(self.poll_timeout)
+
+    async def _keep_claimed(self, run_id: str):
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            try:
+                await self.backend.touch(run_id)
+            except Exception as e:
+                logger.error(f"Error renewing claim on run {run_id}: {str(e)}")
+
+    async def _sweep(self):
+        """Requeue runs abandoned by stopped replicas, at startup and then periodically."""
+        while True:
+            try:
+                requeued = await self.backend.requeue_stale()
+                if requeued:
+                    logger.warning(f"Requeued {requeued} run(s) abandoned by a stopped replica")
+            except Exception as e:
+                logger.error(f"Error requeuing stale runs: {str(e)}")
+            await asyncio.sleep(self.claim_interval)
+
+    async def _process(self, record: Dict[str, Any], handler: RunHandler, queued: bool = False):
+        run_id = record["run_id"]
+        record.update(status=RUNNING, started_at=time.time())
+        await self.backend.save(record)
+
+        task = asyncio.ensure_future(handler(record, lambda event, data: self._emit(record, event, data)))
+        self._running[run_id] = task
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The worker itself is being stopped; a durable queue gets the run back for another replica
+                task.cancel()
+                if not (queued and await self.backend.requeue(record)):
+                    await self._finish(record, FAILED, error="Interrupted by gateway shutdown")
+                raise
+            await self._finish(record, CANCELLED, error="Cancelled")
+        except Exception as e:
+            logger.error(f"Error executing run {run_id}: {str(e)}")
+            self.failed += 1
+            await self._finish(record, FAILED, error=str(e))
+        else:
+            self.completed += 1
+            await self._finish(record, SUCCEEDED, result=result)
+        finally:
+            self._running.pop(run_id, None)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue metrics for monitoring."""
+        return {
+            "depth": await self.backend.depth(),
+            "max_depth": self.max_depth,
+            "workers": self.workers,
+            "running": len(self._running),
+            "tracked": len(self._tracked),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed
+        }
@@ -0,0 +1,66 @@
+import asyncio
+import importlib.util
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class HTTPClientPool:
+    """Shared, connection-pooled HTTP clients, one per origin so limits apply per host."""
+
+    def __init__(self, max_connections_per_host: int = 50, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, connect_timeout: float = 5.0,
+                 default_timeout: float = 30.0, http2: bool = False):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.default_timeout = default_timeout
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+            self.http2 = False
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections_per_host,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.default_timeout, connect=self.connect_timeout)
+        )
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        """Get the pooled client for the origin of the given URL."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = self._create_client()
+            self._clients[origin] = client
+        return client
+
+    async def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Send a POST request over the pooled connection for the URL's origin."""
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+        return await self.get_client(url).post(url, **kwargs)
+
+    def stream(self, method: str, url: str, timeout: Optional[float] = None, **kwargs):
+        """Send a request over the pooled connection, returning a context manager for the streamed response."""
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+        return self.get_client(url).stream(method, url, **kwargs)
+
+    async def close(self):
+        """Close all pooled clients and their connections."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+        logger.info(f"Closed {len(clients)} pooled HTTP clients")
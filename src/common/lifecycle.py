@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """Runs service initialization concurrently in the background and gates requests until it is done.
+
+    Startup work (secrets, registry download, Kubernetes config) is not done at
+    import or in the blocking part of the lifespan, so the process starts
+    listening immediately and reports readiness once everything is loaded.
+    """
+
+    def __init__(self, retry_interval: float = 5.0):
+        self.retry_interval = retry_interval
+        self.ready = False
+        self.errors: Dict[str, str] = {}
+        self.started_at = time.monotonic()
+        self.ready_after: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, initializers: Dict[str, Callable[[], Awaitable[Any]]],
+              on_ready: Optional[Callable[[], Awaitable[Any]]] = None):
+        """Start the initializers concurrently, then on_ready; failed ones are retried until they succeed."""
+        self.started_at = time.monotonic()
+        self._task = asyncio.ensure_future(self._initialize(initializers, on_ready))
+
+    async def _initialize(self, initializers: Dict[str, Callable[[], Awaitable[Any]]],
+                          on_ready: Optional[Callable[[], Awaitable[Any]]]):
+        await self._run_until_done(initializers)
+        if on_ready is not None:
+            # Its failures are retried and reported like those of the initializers
+            await self._run_until_done({"on_ready": on_ready})
+        self.ready = True
+        self.ready_after = time.monotonic() - self.started_at
+        logger.info(f"Service ready after {self.ready_after:.2f}s")
+
+    async def _run_until_done(self, initializers: Dict[str, Callable[[], Awaitable[Any]]]):
+        pending = dict(initializers)
+        while pending:
+            names = list(pending)
+            results = await asyncio.gather(*(pending[name]() for name in names), return_exceptions=True)
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Initialization of {name} failed, retrying: {str(result)}")
+                    self.errors[name] = str(result)
+                else:
+                    self.errors.pop(name, None)
+                    del pending[name]
+            if pending:
+                await asyncio.sleep(self.retry_interval)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def require_ready(self):
+        """Dependency rejecting requests with 503 until initialization is complete."""
+        if not self.ready:
+            raise HTTPException(status_code=503, detail="Service is starting", headers={"Retry-After": "1"})
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "ready_after": self.ready_after, "errors": self.errors}
@@ -0,0 +1,30 @@
+import json
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+class JSONCodec:
+    """JSON decoding and encoding of tool payloads.
+
+    Payloads are decoded inline: handing a large tool response to another
+    process costs more in pickling the parsed value back than the parse
+    itself. Encoding goes straight to bytes, skipping FastAPI's
+    jsonable_encoder, which is by far the slowest step for large results.
+    """
+
+    def __init__(self):
+        self.decoded = 0
+        self.decoded_bytes = 0
+
+    def loads(self, data: bytes) -> Any:
+        self.decoded += 1
+        self.decoded_bytes += len(data)
+        return json.loads(data)
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def stats(self) -> Dict[str, Any]:
+        """Codec metrics for monitoring."""
+        return {"decoded": self.decoded, "decoded_bytes": self.decoded_bytes}
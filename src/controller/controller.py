@@ -1,17 +1,101 @@
+import asyncio
 import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
 from fastapi import FastAPI, HTTPException, Depends
-from src.security.auth import authenticate_request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from src.security.auth import authenticate_request, signing_keys
+from src.orchestrator.admission import AdmissionController, AdmissionError
 from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.result_cache import ToolResultCache
+from src.orchestrator.worker_pool import KubernetesWorkerBackend, WarmPoolManager
 from src.registry.registry import ToolRegistry
+from src.common.http_client import HTTPClientPool
+from src.common.serialization import JSONCodec
+from src.common.lifecycle import Readiness
+from src.monitoring.monitoring import MetricsMiddleware, configure_monitoring, render_metrics
 
-app = FastAPI(title="MCP Controller")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-orchestrator = Orchestrator()
-registry = ToolRegistry()
+http_clients = HTTPClientPool(
+    max_connections_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50")),
+    http2=os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+)
+codec = JSONCodec()
+result_cache = ToolResultCache(max_entries=int(os.getenv("TOOL_RESULT_CACHE_MAX_ENTRIES", "4096")))
+# Defaults for every tool; a tool's "limits" in the registry override them
+admission = AdmissionController(
+    max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", "0")) or None,
+    rate=float(os.getenv("TOOL_RATE_LIMIT", "0")) or None,
+    queue_timeout=float(os.getenv("TOOL_QUEUE_TIMEOUT", "10")),
+    failure_ratio=float(os.getenv("CIRCUIT_FAILURE_RATIO", "0.5")),
+    slow_call_duration=float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "0")) or None,
+    min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "10")),
+    open_duration=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+)
+orchestrator = Orchestrator(
+    http_client=http_clients,
+    default_timeout=float(os.getenv("TOOL_DEFAULT_TIMEOUT", "30")),
+    result_cache=result_cache,
+    admission=admission,
+    codec=codec,
+    lazy=True
+)
+# With several workers (uvicorn --workers), point them at one snapshot file so only one of them reads storage
+registry = ToolRegistry(
+    refresh_interval=float(os.getenv("REGISTRY_REFRESH_INTERVAL", "30")),
+    snapshot_path=os.getenv("REGISTRY_SNAPSHOT_PATH") or None,
+    lazy=True
+)
+readiness = Readiness()
+batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", "64"))
 
-@app.post("/execute_tool")
+async def _on_ready():
+    """Start the background work that needs the loaded registry and Kubernetes config."""
+    if os.getenv("WARM_POOLS_ENABLED", "false").lower() == "true" and orchestrator.k8s_api is not None:
+        orchestrator.worker_pools = WarmPoolManager(KubernetesWorkerBackend(orchestrator.k8s_api, http_clients))
+    await registry.start_refresher()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load secrets, the tool catalog and the Kubernetes config concurrently without delaying startup."""
+    readiness.start({
+        "monitoring": lambda: asyncio.get_event_loop().run_in_executor(None, configure_monitoring),
+        "signing_keys": signing_keys.get,
+        "registry": registry.initialize,
+        "kubernetes": orchestrator.initialize
+    }, on_ready=_on_ready)
+    yield
+    # Stop the registry refresher and job watch and close pooled connections to tool endpoints
+    await readiness.stop()
+    await registry.stop_refresher()
+    if orchestrator.job_tracker is not None:
+        orchestrator.job_tracker.stop()
+    if orchestrator.worker_pools is not None:
+        await orchestrator.worker_pools.close()
+    await http_clients.close()
+
+app = FastAPI(title="MCP Controller", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, service="controller")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe; does not depend on initialization."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe; 503 until secrets, the catalog and the Kubernetes config are loaded."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Latency histograms and in-flight gauges in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/execute_tool", dependencies=[Depends(readiness.require_ready)])
 async def execute_tool(tool_name: str, params: dict, token: str = Depends(authenticate_request)):
     """Execute a tool through the MCP orchestrator."""
     try:
@@ -25,12 +109,56 @@ async def execute_tool(tool_name: str, params: dict, token: str = Depends(authen
         # Execute the tool
         result = await orchestrator.execute_tool(tool, params)
         
-        return {"status": "success", "result": result}
+        # Encoded directly; results are plain JSON values already
+        return Response(codec.dumps({"status": "success", "result": result}), media_type="application/json")
+    except HTTPException:
+        raise
+    except AdmissionError as e:
+        # Overloaded, rate limited or failing tools are rejected without calling them
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
     except Exception as e:
         logger.error(f"Error executing tool {tool_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/list_tools")
+async def _execute_invocation(index: int, invocation: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one item of a batch, reporting failures in the item instead of failing the batch."""
+    tool_name = invocation.get("tool_name")
+    try:
+        if not registry.tool_exists(tool_name):
+            return {"index": index, "status": "error", "status_code": 404, "detail": f"Tool {tool_name} not found"}
+        result = await orchestrator.execute_tool(registry.get_tool(tool_name), invocation.get("params") or {})
+        return {"index": index, "status": "success", "result": result}
+    except AdmissionError as e:
+        return {"index": index, "status": "error", "status_code": e.status_code, "detail": e.detail}
+    except Exception as e:
+        logger.error(f"Error executing tool {tool_name}: {str(e)}")
+        return {"index": index, "status": "error", "status_code": 500, "detail": str(e)}
+
+async def _stream_invocations(invocations: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Run the invocations concurrently, yielding one JSON line per item as it finishes."""
+    tasks = [asyncio.ensure_future(_execute_invocation(index, item)) for index, item in enumerate(invocations)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield codec.dumps(await next_result) + b"\n"
+    finally:
+        # The client went away; don't keep running its tools
+        for task in tasks:
+            task.cancel()
+
+@app.post("/execute_tools", dependencies=[Depends(readiness.require_ready)])
+async def execute_tools(invocations: List[Dict[str, Any]], token: str = Depends(authenticate_request)):
+    """Execute a batch of {"tool_name", "params"} invocations concurrently.
+    
+    Results are streamed as newline-delimited JSON in completion order, each
+    tagged with the index of its invocation.
+    """
+    if len(invocations) > batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {batch_max_items} invocations")
+    
+    return StreamingResponse(_stream_invocations(invocations), media_type="application/x-ndjson")
+
+@app.get("/list_tools", dependencies=[Depends(readiness.require_ready)])
 async def list_tools(token: str = Depends(authenticate_request)):
     """List all available tools in the registry."""
     try:
@@ -38,4 +166,24 @@ async def list_tools(token: str = Depends(authenticate_request)):
         return {"status": "success", "tools": tools}
     except Exception as e:
         logger.error(f"Error listing tools: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/result_cache/stats")
+async def result_cache_stats(token: str = Depends(authenticate_request)):
+    """Return tool result cache metrics."""
+    return result_cache.stats()
+
+@app.get("/registry/stats")
+async def registry_stats(token: str = Depends(authenticate_request)):
+    """Return the catalog and snapshot sharing state of the worker serving the request."""
+    return registry.stats()
+
+@app.get("/serialization/stats")
+async def serialization_stats(token: str = Depends(authenticate_request)):
+    """Return how many tool responses were decoded, and their total size."""
+    return codec.stats()
+
+@app.get("/admission/stats")
+async def admission_stats(token: str = Depends(authenticate_request)):
+    """Return concurrency, rate limit and circuit breaker state per tool."""
+    return admission.stats()
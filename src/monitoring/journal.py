@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FORMAT_VERSION = 1
+
+# The journal entry of the run executing in the current context, if it is journaled
+_current_entry: ContextVar[Optional[Dict[str, Any]]] = ContextVar("journal_entry", default=None)
+
+def note_phase(name: str, duration: float, attributes: Optional[Dict[str, Any]] = None):
+    """Add a finished phase to the journal entry of the current run, if any."""
+    entry = _current_entry.get()
+    if entry is None:
+        return
+    record = [name, round(time.perf_counter() - duration - entry["_start"], 6), round(duration, 6)]
+    if attributes:
+        record.append({key: value for key, value in attributes.items() if isinstance(value, (str, int, float))})
+    entry["phases"].append(record)
+
+def note_llm_call(model: str, latency: float, prompt_tokens: int, completion_tokens: int,
+                  estimated: bool = False, first_token: Optional[float] = None):
+    """Add an LLM call to the journal entry of the current run, if any."""
+    entry = _current_entry.get()
+    if entry is None:
+        return
+    call = {
+        "model": model,
+        "offset_s": round(time.perf_counter() - latency - entry["_start"], 6),
+        "latency_s": round(latency, 6),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens
+    }
+    if estimated:
+        call["estimated"] = True
+    if first_token is not None:
+        call["first_token_s"] = round(first_token, 6)
+    entry["llm_calls"].append(call)
+
+def read_journal(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the entries of journal files, oldest file first when given in rotation order."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+class RunJournal:
+    """Append-only journal of agent runs, one compact JSON line per run.
+
+    Recording a run only appends it to an in-memory buffer; a background task
+    serializes and writes the buffer from a worker thread. The file is rotated
+    once it would exceed max_bytes, keeping up to backups older files
+    (path.1 being the most recent). When the buffer is full, runs are dropped
+    rather than slowing requests down.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5,
+                 flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        self._writer: Optional[asyncio.Task] = None
+        # Created lazily so that it is bound to the running event loop
+        self._lock: Optional[asyncio.Lock] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+    @contextmanager
+    def run(self, request: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Journal the run executing in this block; the caller fills in its plan, steps and analysis."""
+        entry = {
+            "v": JOURNAL_FORMAT_VERSION,
+            "run_id": uuid.uuid4().hex,
+            "started_at": time.time(),
+            "request": request,
+            **fields,
+            "plan": None,
+            "steps": None,
+            "analysis": None,
+            "phases": [],
+            "llm_calls": [],
+            "_start": time.perf_counter()
+        }
+        token = _current_entry.set(entry)
+        try:
+            yield entry
+        except BaseException as e:
+            entry["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            try:
+                _current_entry.reset(token)
+            except ValueError:
+                # A streamed run closed from another context, e.g. by the garbage collector
+                pass
+            # Snapshot the lists; tasks started by the run may still add to them
+            record = dict(entry, phases=list(entry["phases"]), llm_calls=list(entry["llm_calls"]))
+            record["duration_s"] = round(time.perf_counter() - record.pop("_start"), 6)
+            self.record(record)
+
+    def record(self, entry: Dict[str, Any]):
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(entry)
+        self.recorded += 1
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_forever())
+
+    async def stop(self):
+        """Stop the background writer and write what is still buffered."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    async def _write_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error writing run journal: {str(e)}")
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._pending:
+                return
+            entries, self._pending = self._pending, []
+            write = asyncio.get_event_loop().run_in_executor(None, self._write, entries)
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Let the write finish before releasing the lock, so writes never overlap
+                await write
+                raise
+            finally:
+                if write.done() and not write.cancelled() and write.exception() is None:
+                    self.written += len(entries)
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        data = "".join(
+            json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str) + "\n" for entry in entries
+        ).encode("utf-8")
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Journal metrics for monitoring."""
+        return {
+            "path": self.path,
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations
+        }
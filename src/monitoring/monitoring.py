@@ -1,42 +1,177 @@
+import json
 import logging
-from datetime import datetime
-from azure.monitor.opentelemetry import configure_azure_monitor
-from opentelemetry import trace
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from opentelemetry import context, propagate, trace
 from opentelemetry.trace import SpanKind, Status, StatusCode
+from src.monitoring.journal import note_phase
+from src.monitoring.metrics import registry as metrics
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenTelemetry with Azure Monitor
-configure_azure_monitor(
-    connection_string="InstrumentationKey=your-app-insights-instrumentation-key"
-)
+# Longest span attribute value; larger params and results are truncated
+MAX_ATTRIBUTE_LENGTH = int(os.getenv("TRACE_MAX_ATTRIBUTE_LENGTH", "256"))
+
+_configured = False
+
+def configure_monitoring():
+    """Initialize OpenTelemetry with Azure Monitor; called at startup rather than at import.
+
+    Without APPLICATIONINSIGHTS_CONNECTION_STRING, spans go to the no-op tracer
+    while trace context is still propagated and /metrics still works.
+    """
+    global _configured
+    connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+    if _configured or not connection_string:
+        return
+    from azure.monitor.opentelemetry import configure_azure_monitor
+
+    # Only a share of the traces is recorded and exported
+    configure_azure_monitor(
+        connection_string=connection_string,
+        sampling_ratio=float(os.getenv("TRACE_SAMPLING_RATIO", "0.1"))
+    )
+    _configured = True
 
 tracer = trace.get_tracer(__name__)
 
+phase_duration = metrics.histogram(
+    "mcp_phase_duration_seconds", "Duration of agent and tool execution phases", ("phase",)
+)
+phase_in_flight = metrics.gauge("mcp_phase_in_flight", "Phases currently executing", ("phase",))
+phase_errors = metrics.counter("mcp_phase_errors_total", "Phases that raised an error", ("phase",))
+http_duration = metrics.histogram(
+    "mcp_http_request_duration_seconds", "Duration of HTTP requests", ("method", "route", "status")
+)
+http_in_flight = metrics.gauge("mcp_http_requests_in_flight", "HTTP requests currently being served")
+
+def cap_attribute(value: Any, max_length: int = MAX_ATTRIBUTE_LENGTH) -> Any:
+    """Make a span attribute value of bounded size; containers are serialized and truncated."""
+    if isinstance(value, (bool, int, float)):
+        return value
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            value = str(value)
+    if len(value) > max_length:
+        return value[:max_length] + f"...[{len(value) - max_length} more]"
+    return value
+
+@contextmanager
+def phase(name: str, kind=SpanKind.INTERNAL, **attributes: Any) -> Iterator[trace.Span]:
+    """Time a phase into the phase metrics and trace it as a span.
+
+    Attributes are only serialized when the span is sampled, so unsampled
+    requests pay for the timing alone.
+    """
+    phase_in_flight.inc(phase=name)
+    start = time.perf_counter()
+    with tracer.start_as_current_span(name, kind=kind, record_exception=False, set_status_on_exception=False) as span:
+        if attributes and span.is_recording():
+            for key, value in attributes.items():
+                span.set_attribute(key, cap_attribute(value))
+        try:
+            yield span
+        except Exception as e:
+            phase_errors.inc(phase=name)
+            if span.is_recording():
+                span.set_status(Status(StatusCode.ERROR, cap_attribute(str(e))))
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            phase_duration.observe(duration, phase=name)
+            phase_in_flight.dec(phase=name)
+            note_phase(name, duration, attributes)
+
+def record_phase(name: str, duration: float):
+    """Record the duration of a phase that cannot be wrapped in phase(), e.g. one spanning yields."""
+    phase_duration.observe(duration, phase=name)
+    note_phase(name, duration)
+
+def inject_trace_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Add the current trace context (traceparent) to outgoing request headers."""
+    headers = dict(headers or {})
+    propagate.inject(headers)
+    return headers
+
+class MetricsMiddleware:
+    """ASGI middleware timing requests and continuing the trace of the calling service."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+        self._route_paths: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope) -> str:
+        # Label by route template, not by raw path, to keep the number of series bounded
+        if self._route_paths is None:
+            app = scope.get("app")
+            self._route_paths = {
+                route.endpoint: route.path for route in getattr(app, "routes", ()) if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", ())}
+        token = context.attach(propagate.extract(carrier))
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(f"{self.service} {scope['method']}", kind=SpanKind.SERVER) as span:
+                await self.app(scope, receive, send_wrapper)
+                if span.is_recording():
+                    span.set_attribute("http.route", self._route(scope))
+                    span.set_attribute("http.status_code", status["code"])
+        finally:
+            http_in_flight.dec()
+            http_duration.observe(
+                time.perf_counter() - start, method=scope["method"], route=self._route(scope), status=str(status["code"])
+            )
+            context.detach(token)
+
+def render_metrics() -> str:
+    """Metrics in the Prometheus text exposition format."""
+    return metrics.render()
+
 class MonitoringService:
     def __init__(self):
         self.tracer = tracer
-    
+
     def start_span(self, name: str, kind=SpanKind.INTERNAL):
         """Start a new monitoring span."""
         return self.tracer.start_as_current_span(name, kind=kind)
-    
+
     def log_tool_execution(self, tool_name: str, params: dict, result: dict, execution_time: float):
         """Log a tool execution to Azure Monitor."""
         with self.tracer.start_as_current_span(f"tool_execution_{tool_name}") as span:
-            span.set_attribute("tool.name", tool_name)
-            span.set_attribute("tool.params", str(params))
-            span.set_attribute("tool.result", str(result))
-            span.set_attribute("tool.execution_time", execution_time)
-            span.set_status(Status(StatusCode.OK))
-            
+            if span.is_recording():
+                span.set_attribute("tool.name", tool_name)
+                span.set_attribute("tool.params", cap_attribute(params))
+                span.set_attribute("tool.result", cap_attribute(result))
+                span.set_attribute("tool.execution_time", execution_time)
+                span.set_status(Status(StatusCode.OK))
+
             logger.info(f"Tool {tool_name} executed in {execution_time:.2f}s")
-    
+
     def log_error(self, tool_name: str, error_message: str):
         """Log an error during tool execution."""
         with self.tracer.start_as_current_span(f"tool_error_{tool_name}") as span:
-            span.set_attribute("tool.name", tool_name)
-            span.set_attribute("error.message", error_message)
-            span.set_status(Status(StatusCode.ERROR))
-            
-            logger.error(f"Error executing tool {tool_name}: {error_message}")
\ No newline at end of file
+            if span.is_recording():
+                span.set_attribute("tool.name", tool_name)
+                span.set_attribute("error.message", cap_attribute(error_message))
+                span.set_status(Status(StatusCode.ERROR))
+
+            logger.error(f"Error executing tool {tool_name}: {error_message}")
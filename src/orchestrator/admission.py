@@ -0,0 +1,310 @@
+import asyncio
+import collections
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+import httpx
+from src.monitoring.metrics import registry as metrics
+from src.registry.registry import Tool
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Settings a tool's "limits" may override, i.e. the ToolLimiter arguments
+LIMIT_SETTINGS = frozenset({
+    "max_concurrency", "rate", "burst", "queue_timeout", "failure_ratio", "slow_call_duration",
+    "slow_call_ratio", "window", "min_calls", "open_duration"
+})
+
+tool_in_flight = metrics.gauge("mcp_tool_in_flight", "Tool executions currently running", ("tool",))
+tool_queued = metrics.gauge("mcp_tool_queued", "Tool executions waiting for admission", ("tool",))
+tool_circuit_state = metrics.gauge(
+    "mcp_tool_circuit_state", "Circuit breaker state per tool (0 closed, 1 half open, 2 open)", ("tool",)
+)
+tool_rejections = metrics.counter(
+    "mcp_tool_rejections_total", "Tool executions rejected by admission control", ("tool", "reason")
+)
+
+class AdmissionError(Exception):
+    """Raised when a tool execution is not admitted; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Rate limit of rate calls per second with bursts of up to burst calls.
+
+    Tokens are reserved in arrival order, so the balance may go negative; a
+    caller then waits until its token has been refilled.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token, returning how long to wait for it, or None if that exceeds max_wait."""
+        self._refill(time.monotonic())
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+    def refund(self):
+        """Return a reserved token that was not used, e.g. because the call was rejected later."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class CircuitBreaker:
+    """Fails fast for a tool whose recent calls mostly failed or were slow.
+
+    Outcomes of the last window calls are kept. Once at least min_calls are
+    recorded and the failure or slow-call ratio reaches its threshold, the
+    circuit opens and calls are rejected for open_duration seconds. Then a
+    single trial call is let through: success closes the circuit, failure
+    reopens it.
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, slow_call_duration: Optional[float] = None,
+                 slow_call_ratio: float = 0.8, window: int = 20, min_calls: int = 10,
+                 open_duration: float = 30.0):
+        self.failure_ratio = failure_ratio
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_ratio = slow_call_ratio
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        # (failed, slow) per call
+        self.outcomes: Deque[Tuple[bool, bool]] = collections.deque(maxlen=window)
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_duration - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; moves an open circuit to half open once its time is up."""
+        if self.state == OPEN and self.retry_after() <= 0:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record(self, failed: bool, duration: float):
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        if self.state == HALF_OPEN:
+            self.trial_in_flight = False
+            if failed or slow:
+                self._open()
+            else:
+                self.state = CLOSED
+                self.outcomes.clear()
+            return
+
+        self.outcomes.append((failed, slow))
+        calls = len(self.outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self.outcomes if failed)
+        slow_calls = sum(1 for _, slow in self.outcomes if slow)
+        if failures / calls >= self.failure_ratio or (
+                self.slow_call_duration is not None and slow_calls / calls >= self.slow_call_ratio):
+            self._open()
+
+    def release_trial(self):
+        """Give up a half-open trial that ended without an outcome, e.g. when cancelled."""
+        if self.state == HALF_OPEN:
+            self.trial_in_flight = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self.outcomes)
+        return {
+            "state": self.state,
+            "recent_calls": calls,
+            "failure_ratio": sum(1 for failed, _ in self.outcomes if failed) / calls if calls else 0.0,
+            "slow_call_ratio": sum(1 for _, slow in self.outcomes if slow) / calls if calls else 0.0,
+            "retry_after": self.retry_after() if self.state == OPEN else 0.0
+        }
+
+def is_failure(error: BaseException) -> bool:
+    """Whether an error counts against the tool; rejected requests (4xx) are the caller's fault."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return True
+
+class ToolLimiter:
+    """Admission control for one tool: concurrency limit, rate limit, queueing deadline and circuit breaker."""
+
+    def __init__(self, tool_name: str, max_concurrency: Optional[int] = None, rate: Optional[float] = None,
+                 burst: Optional[float] = None, queue_timeout: float = 10.0,
+                 failure_ratio: float = 0.5, slow_call_duration: Optional[float] = None,
+                 slow_call_ratio: float = 0.8, window: int = 20, min_calls: int = 10,
+                 open_duration: float = 30.0):
+        self.tool_name = tool_name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rate, burst or max(1.0, rate)) if rate else None
+        self.breaker = CircuitBreaker(failure_ratio, slow_call_duration, slow_call_ratio, window,
+                                      min_calls, open_duration)
+        # Created lazily so that it is bound to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self._semaphore is None and self.max_concurrency:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: float) -> AdmissionError:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        tool_rejections.inc(tool=self.tool_name, reason=reason)
+        logger.warning(f"Rejected execution of {self.tool_name}: {detail}")
+        return AdmissionError(status_code, detail, retry_after)
+
+    async def _wait_for_admission(self, deadline: float):
+        """Wait for a rate-limit token and a concurrency slot until the deadline.
+
+        A reserved token is refunded if no slot is obtained.
+        """
+        wait = None
+        if self.bucket is not None:
+            wait = self.bucket.reserve(deadline - time.monotonic())
+            if wait is None:
+                raise self._reject("rate_limited", 429, f"Rate limit of {self.bucket.rate}/s for tool "
+                                   f"{self.tool_name} exceeded", 1 / self.bucket.rate)
+
+        try:
+            if wait is not None:
+                await asyncio.sleep(wait)
+
+            semaphore = self._get_semaphore()
+            if semaphore is not None:
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=max(deadline - time.monotonic(), 0))
+                except asyncio.TimeoutError:
+                    raise self._reject("queue_timeout", 503, f"Tool {self.tool_name} is at its concurrency "
+                                       f"limit of {self.max_concurrency}", self.queue_timeout)
+        except BaseException:
+            if wait is not None:
+                self.bucket.refund()
+            raise
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold an execution slot for the tool, recording the outcome for the circuit breaker."""
+        if not self.breaker.allow():
+            raise self._reject("circuit_open", 503, f"Circuit for tool {self.tool_name} is open",
+                               self.breaker.retry_after())
+        tool_circuit_state.set(CIRCUIT_STATE_VALUES[self.breaker.state], tool=self.tool_name)
+
+        deadline = time.monotonic() + self.queue_timeout
+        self.queued += 1
+        tool_queued.inc(tool=self.tool_name)
+        try:
+            await self._wait_for_admission(deadline)
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        finally:
+            self.queued -= 1
+            tool_queued.dec(tool=self.tool_name)
+
+        if self.breaker.state == OPEN:
+            # The circuit opened while this call was queued
+            if self._semaphore is not None:
+                self._semaphore.release()
+            if self.bucket is not None:
+                self.bucket.refund()
+            raise self._reject("circuit_open", 503, f"Circuit for tool {self.tool_name} is open",
+                               self.breaker.retry_after())
+
+        self.admitted += 1
+        self.in_flight += 1
+        tool_in_flight.inc(tool=self.tool_name)
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self.breaker.record(is_failure(e), time.monotonic() - start)
+            raise
+        else:
+            self.breaker.record(False, time.monotonic() - start)
+        finally:
+            self.in_flight -= 1
+            tool_in_flight.dec(tool=self.tool_name)
+            if self._semaphore is not None:
+                self._semaphore.release()
+            tool_circuit_state.set(CIRCUIT_STATE_VALUES[self.breaker.state], tool=self.tool_name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rate": self.bucket.rate if self.bucket is not None else None,
+            "tokens": self.bucket.tokens if self.bucket is not None else None,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "circuit": self.breaker.stats()
+        }
+
+class AdmissionController:
+    """Per-tool limiters, configured from defaults overridden by each tool's "limits" setting.
+
+    Keys of "limits" other than LIMIT_SETTINGS are logged and ignored.
+
+    A tool's limiter is replaced when its configuration changes in the registry.
+    """
+
+    def __init__(self, **defaults: Any):
+        self.defaults = defaults
+        self._limiters: Dict[str, Tuple[Dict[str, Any], ToolLimiter]] = {}
+
+    def limiter(self, tool: Tool) -> ToolLimiter:
+        limits = tool.limits or {}
+        settings = dict(self.defaults, **{key: value for key, value in limits.items() if key in LIMIT_SETTINGS})
+        entry = self._limiters.get(tool.name)
+        if entry is None or entry[0] != settings:
+            unknown = sorted(set(limits) - LIMIT_SETTINGS)
+            if unknown:
+                logger.warning(f"Ignoring unknown limits {unknown} of tool {tool.name}")
+            entry = (settings, ToolLimiter(tool.name, **settings))
+            self._limiters[tool.name] = entry
+        return entry[1]
+
+    def admit(self, tool: Tool):
+        """Context manager holding an execution slot for the tool; raises AdmissionError if not admitted."""
+        return self.limiter(tool).admit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Limiter and circuit breaker state per tool, for monitoring."""
+        return {name: limiter.stats() for name, (_, limiter) in self._limiters.items()}
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from kubernetes import watch
+
+logger = logging.getLogger(__name__)
+
+MANAGED_BY_LABEL = "mcp.io/managed-by"
+RESULT_ANNOTATION = "mcp.io/result"
+
+class JobFailedError(Exception):
+    """Raised when a tool job fails or is deleted before completing."""
+
+class JobTracker:
+    """Follows tool jobs through one shared watch stream and resolves their results.
+
+    The Kubernetes client is synchronous, so the watch runs on a background
+    thread and hands terminal job states back to the event loop.
+    """
+
+    def __init__(self, batch_api, core_api, namespace: str = "default",
+                 label_selector: str = f"{MANAGED_BY_LABEL}=mcp-controller",
+                 watch_factory: Callable[[], Any] = watch.Watch, watch_timeout: int = 60):
+        self.batch_api = batch_api
+        self.core_api = core_api
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.watch_factory = watch_factory
+        self.watch_timeout = watch_timeout
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._watch = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the shared watch on the current event loop, if it is not running yet."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_event_loop()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="job-tracker", daemon=True)
+        self._thread.start()
+        logger.info(f"Started job tracker for {self.namespace}/{self.label_selector}")
+
+    def stop(self):
+        """Stop the watch and fail all jobs still being waited on."""
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+        for job_name in list(self._pending):
+            self._reject(job_name, JobFailedError("Job tracker stopped"))
+
+    def expect(self, job_name: str) -> asyncio.Future:
+        """Register interest in a job before it is created, so no completion is missed."""
+        self.start()
+        future = self._loop.create_future()
+        self._pending[job_name] = future
+        return future
+
+    def discard(self, job_name: str):
+        """Stop expecting a job, e.g. because creating it failed."""
+        self._pending.pop(job_name, None)
+
+    async def wait_for_job(self, job_name: str, timeout: float) -> Dict[str, Any]:
+        """Wait for an expected job to finish and return its result.
+
+        A job that is still running when the wait times out or is cancelled is deleted.
+        """
+        future = self._pending.get(job_name) or self.expect(job_name)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Job {job_name} did not finish within {timeout}s, deleting it")
+            raise
+        except asyncio.CancelledError:
+            logger.warning(f"Stopped waiting for job {job_name}, deleting it")
+            raise
+        finally:
+            self._pending.pop(job_name, None)
+            # wait_for cancels the future when it gives up, so the job has not finished
+            if future.cancelled():
+                asyncio.get_event_loop().run_in_executor(None, self._delete_job, job_name)
+
+    def _run(self):
+        """Watch loop; re-lists after every disconnect so no transition is lost."""
+        while not self._stopped.is_set():
+            try:
+                jobs = self.batch_api.list_namespaced_job(
+                    namespace=self.namespace, label_selector=self.label_selector
+                )
+                for job in jobs.items:
+                    self._handle_job("MODIFIED", job)
+
+                self._watch = self.watch_factory()
+                for event in self._watch.stream(
+                    self.batch_api.list_namespaced_job,
+                    namespace=self.namespace,
+                    label_selector=self.label_selector,
+                    resource_version=jobs.metadata.resource_version,
+                    timeout_seconds=self.watch_timeout
+                ):
+                    self._handle_job(event["type"], event["object"])
+                    if self._stopped.is_set():
+                        break
+            except Exception as e:
+                logger.error(f"Job watch failed, restarting: {str(e)}")
+                self._stopped.wait(1.0)
+
+    def _handle_job(self, event_type: str, job):
+        """Resolve waiters for jobs that reached a terminal state."""
+        job_name = job.metadata.name
+        if job_name not in self._pending:
+            return
+
+        status = job.status
+        if event_type == "DELETED":
+            self._loop.call_soon_threadsafe(self._reject, job_name, JobFailedError(f"Job {job_name} was deleted"))
+        elif status is not None and status.succeeded:
+            result = self._collect_result(job)
+            self._loop.call_soon_threadsafe(self._resolve, job_name, result)
+        elif status is not None and any(
+            condition.type == "Failed" and condition.status == "True"
+            for condition in (status.conditions or [])
+        ):
+            logs = self._read_logs(job_name)
+            self._loop.call_soon_threadsafe(
+                self._reject, job_name, JobFailedError(f"Job {job_name} failed: {logs[-1000:]}")
+            )
+
+    def _collect_result(self, job) -> Dict[str, Any]:
+        """Read the result from the job's annotation, or else from the last line of its logs."""
+        annotations = job.metadata.annotations or {}
+        output = annotations.get(RESULT_ANNOTATION)
+        if output is None:
+            lines = [line for line in self._read_logs(job.metadata.name).splitlines() if line.strip()]
+            output = lines[-1] if lines else ""
+
+        try:
+            return json.loads(output)
+        except ValueError:
+            return {"output": output}
+
+    def _read_logs(self, job_name: str) -> str:
+        """Read the logs of the most recent pod of a job."""
+        try:
+            pods = self.core_api.list_namespaced_pod(
+                namespace=self.namespace, label_selector=f"job-name={job_name}"
+            )
+            if not pods.items:
+                return ""
+            pod = max(pods.items, key=lambda item: str(item.metadata.creation_timestamp or ""))
+            return self.core_api.read_namespaced_pod_log(name=pod.metadata.name, namespace=self.namespace)
+        except Exception as e:
+            logger.error(f"Error reading logs of job {job_name}: {str(e)}")
+            return ""
+
+    def _delete_job(self, job_name: str):
+        try:
+            self.batch_api.delete_namespaced_job(
+                name=job_name, namespace=self.namespace, propagation_policy="Background"
+            )
+        except Exception as e:
+            logger.error(f"Error deleting job {job_name}: {str(e)}")
+
+    def _resolve(self, job_name: str, result: Dict[str, Any]):
+        future = self._pending.get(job_name)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def _reject(self, job_name: str, error: Exception):
+        future = self._pending.get(job_name)
+        if future is not None and not future.done():
+            future.set_exception(error)
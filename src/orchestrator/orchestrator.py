@@ -1,35 +1,97 @@
+import asyncio
+import contextlib
 import logging
 import json
+import math
 import uuid
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from src.common.http_client import HTTPClientPool
+from src.common.serialization import JSONCodec
+from src.monitoring.monitoring import phase
+from src.orchestrator.admission import AdmissionController, AdmissionError
+from src.orchestrator.job_tracker import JobTracker, MANAGED_BY_LABEL
+from src.orchestrator.result_cache import ToolResultCache
+from src.orchestrator.worker_pool import WarmPoolManager, WorkerError
 from src.registry.registry import Tool
 from kubernetes import client, config
 
 logger = logging.getLogger(__name__)
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, http_client: Optional[HTTPClientPool] = None, default_timeout: float = 30.0,
+                 result_cache: Optional[ToolResultCache] = None, namespace: str = "default",
+                 default_job_timeout: float = 600.0, worker_pools: Optional[WarmPoolManager] = None,
+                 admission: Optional[AdmissionController] = None, codec: Optional[JSONCodec] = None,
+                 lazy: bool = False):
+        self.http_client = http_client or HTTPClientPool()
+        # Decodes tool responses, large ones in a process pool if it has one
+        self.codec = codec or JSONCodec()
+        self.default_timeout = default_timeout
+        self.result_cache = result_cache
+        self.namespace = namespace
+        self.default_job_timeout = default_job_timeout
+        self.worker_pools = worker_pools
+        # Per-tool concurrency and rate limits and circuit breakers; cache hits are not limited
+        self.admission = admission
+        self.k8s_api: Optional[client.CoreV1Api] = None
+        self.k8s_batch_api: Optional[client.BatchV1Api] = None
+        self.job_tracker: Optional[JobTracker] = None
+        # Lazy orchestrators load the Kubernetes config in initialize(), so constructing one does no I/O
+        if not lazy:
+            self._load_kubernetes_config(required=True)
+    
+    async def initialize(self):
+        """Load the Kubernetes config off the event loop; container tools are disabled without one."""
+        await asyncio.get_event_loop().run_in_executor(None, self._load_kubernetes_config)
+    
+    def _load_kubernetes_config(self, required: bool = False):
         try:
-            # Try to load in-cluster config (for deployment in AKS)
-            config.load_incluster_config()
-        except:
-            # Fall back to local kubeconfig
-            config.load_kube_config()
+            try:
+                # Try to load in-cluster config (for deployment in AKS)
+                config.load_incluster_config()
+            except config.ConfigException:
+                # Fall back to local kubeconfig
+                config.load_kube_config()
+        except Exception as e:
+            if required:
+                raise
+            logger.warning(f"Kubernetes is not configured, container tools are disabled: {str(e)}")
+            return
         
         self.k8s_api = client.CoreV1Api()
         self.k8s_batch_api = client.BatchV1Api()
+        self.job_tracker = JobTracker(self.k8s_batch_api, self.k8s_api, namespace=self.namespace)
     
     async def execute_tool(self, tool: Tool, params: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a tool based on its configuration."""
+        if tool.cacheable and self.result_cache is not None:
+            return await self.result_cache.get_or_execute(
+                tool.name, params, tool.cache_ttl, lambda: self._execute_tool(tool, params)
+            )
+        return await self._execute_tool(tool, params)
+    
+    async def _execute_tool(self, tool: Tool, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a tool to its API endpoint or a Kubernetes job once admitted."""
+        admission = self.admission.admit(tool) if self.admission is not None else contextlib.nullcontext()
         try:
-            # Check if the tool has an endpoint (API) or needs to be executed as a container
-            if tool.endpoint:
-                # Call the API endpoint
-                return await self._call_api_endpoint(tool, params)
-            else:
-                # Create a Kubernetes job to run the tool
-                return await self._create_k8s_job(tool, params)
+            async with admission:
+                # Check if the tool has an endpoint (API) or needs to be executed as a container
+                if tool.endpoint:
+                    # Call the API endpoint
+                    with phase("orchestrator.backend", backend="endpoint", tool=tool.name):
+                        return await self._call_api_endpoint(tool, params)
+                elif tool.warm_pool and self.worker_pools is not None:
+                    # Run on a pre-started worker, falling back to a job
+                    with phase("orchestrator.backend", backend="warm_pool", tool=tool.name):
+                        return await self._call_warm_worker(tool, params)
+                else:
+                    # Create a Kubernetes job to run the tool
+                    with phase("orchestrator.backend", backend="job", tool=tool.name):
+                        return await self._create_k8s_job(tool, params)
+        except AdmissionError:
+            # Already logged by the limiter
+            raise
         except Exception as e:
             logger.error(f"Error executing tool {tool.name}: {str(e)}")
             raise
@@ -37,27 +99,44 @@ class Orchestrator:
     async def _call_api_endpoint(self, tool: Tool, params: Dict[str, Any]) -> Dict[str, Any]:
         """Call an API endpoint for the tool."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    tool.endpoint,
-                    json=params,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self.http_client.post(
+                tool.endpoint,
+                json=params,
+                timeout=tool.timeout or self.default_timeout
+            )
+            response.raise_for_status()
+            return self.codec.loads(response.content)
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling {tool.endpoint}: {str(e)}")
             raise
     
+    async def _call_warm_worker(self, tool: Tool, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the tool on a warm worker, using a job if no worker could be reached.
+
+        A worker that fails once the call was sent raises WorkerCallError: the
+        tool may have run, and a job would wait for the timeout a second time.
+        """
+        try:
+            return await self.worker_pools.execute(tool, params, tool.timeout or self.default_job_timeout)
+        except WorkerError as e:
+            logger.warning(f"Warm worker unavailable for {tool.name}, falling back to a job: {str(e)}")
+            return await self._create_k8s_job(tool, params)
+    
     async def _create_k8s_job(self, tool: Tool, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a Kubernetes job to run the tool."""
+        """Create a Kubernetes job to run the tool and wait for its result."""
+        if self.job_tracker is None:
+            raise RuntimeError(f"Cannot run container tool {tool.name}: Kubernetes is not configured")
         job_name = f"{tool.name.lower()}-{uuid.uuid4().hex[:8]}"
+        timeout = tool.timeout or self.default_job_timeout
         
         # Create the job specification
         job = client.V1Job(
             api_version="batch/v1",
             kind="Job",
-            metadata=client.V1ObjectMeta(name=job_name),
+            metadata=client.V1ObjectMeta(
+                name=job_name,
+                labels={MANAGED_BY_LABEL: "mcp-controller", "mcp.io/tool": tool.name.lower()}
+            ),
             spec=client.V1JobSpec(
                 template=client.V1PodTemplateSpec(
                     metadata=client.V1ObjectMeta(name=job_name),
@@ -77,14 +156,27 @@ class Orchestrator:
                         restart_policy="Never"
                     )
                 ),
-                backoff_limit=2
+                backoff_limit=2,
+                # Let Kubernetes enforce the deadline too and clean up finished jobs; it must be a positive integer
+                active_deadline_seconds=max(1, math.ceil(timeout)),
+                ttl_seconds_after_finished=300
             )
         )
         
-        # Create the job
-        self.k8s_batch_api.create_namespaced_job(namespace="default", body=job)
+        # Register with the tracker first so a fast completion cannot be missed
+        self.job_tracker.expect(job_name)
+        
+        # Create the job without blocking the event loop
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None, lambda: self.k8s_batch_api.create_namespaced_job(namespace=self.namespace, body=job)
+            )
+        except Exception:
+            self.job_tracker.discard(job_name)
+            raise
         
         logger.info(f"Created job {job_name} to execute tool {tool.name}")
         
-        # For simplicity, we'll return a job ID that could be used to check status later
-        return {"job_id": job_name, "status": "submitted"}
\ No newline at end of file
+        result = await self.job_tracker.wait_for_job(job_name, timeout)
+        logger.info(f"Job {job_name} completed")
+        return result
\ No newline at end of file
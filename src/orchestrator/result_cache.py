@@ -0,0 +1,99 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class ToolResultCache:
+    """Bounded cache of results for tools declared cacheable, with single-flight execution.
+
+    Identical concurrent calls share one execution, which is cancelled once
+    its last caller has gone. Every caller gets its own copy of the result, so
+    mutating it cannot change what the cache returns to others.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        # key -> (expires_at, result); TTLs are per tool so expiry is checked on read
+        self.entries = LRUCache(maxsize=max_entries)
+        self._in_flight: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def make_key(self, tool_name: str, params: Dict[str, Any]) -> str:
+        """Key on the tool name and the canonical JSON form of the parameters."""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    async def get_or_execute(self, tool_name: str, params: Dict[str, Any], ttl: float,
+                             execute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return a cached result, join an identical in-flight execution, or execute the tool."""
+        key = self.make_key(tool_name, params)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self.hits += 1
+                return copy.deepcopy(result)
+            self.entries.pop(key, None)
+
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            logger.info(f"Joining in-flight execution of {tool_name}")
+        else:
+            self.misses += 1
+            # Run detached from the caller so one caller cancelling does not fail the others
+            flight = _Flight(asyncio.ensure_future(execute()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda task: self._complete(key, ttl, flight))
+
+        flight.waiters += 1
+        try:
+            return copy.deepcopy(await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is waiting for the result any more
+                self.abandoned += 1
+                self._release(key, flight)
+                flight.task.cancel()
+
+    def _complete(self, key: str, ttl: float, flight: _Flight):
+        """Store a copy of a successful result and release the in-flight slot."""
+        if not self._release(key, flight):
+            return
+        task = flight.task
+        if not task.cancelled() and task.exception() is None:
+            self.entries[key] = (time.monotonic() + ttl, copy.deepcopy(task.result()))
+
+    def _release(self, key: str, flight: _Flight) -> bool:
+        if self._in_flight.get(key) is not flight:
+            return False
+        del self._in_flight[key]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache metrics for monitoring."""
+        return {
+            "entries": len(self.entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned
+        }
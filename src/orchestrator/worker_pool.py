@@ -0,0 +1,337 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import httpx
+from src.common.http_client import HTTPClientPool
+from src.registry.registry import Tool
+
+logger = logging.getLogger(__name__)
+
+class WorkerError(Exception):
+    """Raised when no warm worker could be started or reached before the call was sent.
+
+    The tool has not run, so callers can fall back to another way of running
+    it; errors of the tool itself are raised as ToolExecutionError.
+    """
+
+class WorkerCallError(Exception):
+    """Raised when a warm worker fails after the call was sent, e.g. by timing out.
+
+    The tool may have run, so the call must not be retried another way.
+    """
+
+class ToolExecutionError(Exception):
+    """Raised when a warm worker reports that the tool itself failed."""
+
+class Worker:
+    def __init__(self, worker_id: str, handle: Any):
+        self.worker_id = worker_id
+        self.handle = handle
+        self.last_used = time.monotonic()
+
+class WorkerBackend:
+    """Starts, calls and stops long-running tool workers."""
+
+    async def start_worker(self, tool: Tool) -> Worker:
+        raise NotImplementedError
+
+    async def call(self, worker: Worker, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def stop_worker(self, worker: Worker):
+        raise NotImplementedError
+
+class SubprocessWorkerBackend(WorkerBackend):
+    """Local workers speaking one JSON object per line over stdin/stdout, standing in for pods."""
+
+    def __init__(self, command: List[str]):
+        self.command = command
+
+    async def start_worker(self, tool: Tool) -> Worker:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.command, tool.name,
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise WorkerError(f"Worker for {tool.name} could not be started: {str(e)}")
+        return Worker(f"{tool.name}-{process.pid}", process)
+
+    async def call(self, worker: Worker, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        process = worker.handle
+        try:
+            process.stdin.write(json.dumps({"params": params}).encode("utf-8") + b"\n")
+            await process.stdin.drain()
+        except ConnectionError as e:
+            raise WorkerError(f"Worker {worker.worker_id} is not reachable: {str(e)}")
+
+        # From here on the worker may have run the tool
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=timeout)
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            raise WorkerCallError(f"Worker {worker.worker_id} did not respond: {str(e)}")
+        if not line:
+            raise WorkerCallError(f"Worker {worker.worker_id} exited")
+
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            raise WorkerCallError(f"Worker {worker.worker_id} sent an invalid response: {str(e)}")
+        if "error" in response:
+            raise ToolExecutionError(response["error"])
+        if "result" not in response:
+            raise WorkerCallError(f"Worker {worker.worker_id} sent a response without a result")
+        return response["result"]
+
+    async def stop_worker(self, worker: Worker):
+        process = worker.handle
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+
+class KubernetesWorkerBackend(WorkerBackend):
+    """Long-running tool pods accepting parameters with POST /invoke."""
+
+    def __init__(self, core_api, http_client: HTTPClientPool, namespace: str = "default",
+                 port: int = 8080, startup_timeout: float = 120.0):
+        self.core_api = core_api
+        self.http_client = http_client
+        self.namespace = namespace
+        self.port = port
+        self.startup_timeout = startup_timeout
+
+    async def start_worker(self, tool: Tool) -> Worker:
+        from kubernetes import client
+
+        pod_name = f"{tool.name.lower()}-worker-{uuid.uuid4().hex[:8]}"
+        pod = client.V1Pod(
+            metadata=client.V1ObjectMeta(
+                name=pod_name,
+                labels={"mcp.io/managed-by": "mcp-controller", "mcp.io/worker-for": tool.name.lower()}
+            ),
+            spec=client.V1PodSpec(
+                containers=[
+                    client.V1Container(
+                        name="worker",
+                        image=tool.container_image,
+                        env=[client.V1EnvVar(name="MCP_WORKER_PORT", value=str(self.port))],
+                        ports=[client.V1ContainerPort(container_port=self.port)],
+                        readiness_probe=client.V1Probe(
+                            tcp_socket=client.V1TCPSocketAction(port=self.port),
+                            period_seconds=1
+                        )
+                    )
+                ],
+                restart_policy="Never"
+            )
+        )
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(
+                None, lambda: self.core_api.create_namespaced_pod(namespace=self.namespace, body=pod)
+            )
+        except Exception as e:
+            raise WorkerError(f"Worker pod {pod_name} could not be created: {str(e)}")
+
+        # Worker startup is rare compared to calls, so a short readiness poll is acceptable here
+        deadline = time.monotonic() + self.startup_timeout
+        error = "did not become ready"
+        while time.monotonic() < deadline:
+            try:
+                status = (await loop.run_in_executor(
+                    None, lambda: self.core_api.read_namespaced_pod_status(name=pod_name, namespace=self.namespace)
+                )).status
+            except Exception as e:
+                error = f"could not be read: {str(e)}"
+                break
+            if status.phase in ("Failed", "Succeeded"):
+                break
+            if status.pod_ip and any(c.type == "Ready" and c.status == "True" for c in status.conditions or []):
+                return Worker(pod_name, f"http://{status.pod_ip}:{self.port}")
+            await asyncio.sleep(0.5)
+
+        await self.stop_worker(Worker(pod_name, None))
+        raise WorkerError(f"Worker pod {pod_name} {error}")
+
+    async def call(self, worker: Worker, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        try:
+            response = await self.http_client.post(f"{worker.handle}/invoke", json=params, timeout=timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            # No connection, so the request was never sent
+            raise WorkerError(f"Worker {worker.worker_id} is not reachable: {str(e)}")
+        except httpx.TransportError as e:
+            raise WorkerCallError(f"Worker {worker.worker_id} did not respond: {str(e)}")
+        if response.status_code >= 500:
+            raise ToolExecutionError(response.text)
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError as e:
+            raise WorkerCallError(f"Worker {worker.worker_id} sent an invalid response: {str(e)}")
+
+    async def stop_worker(self, worker: Worker):
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None, lambda: self.core_api.delete_namespaced_pod(name=worker.worker_id, namespace=self.namespace)
+            )
+        except Exception as e:
+            logger.error(f"Error deleting worker pod {worker.worker_id}: {str(e)}")
+
+class WorkerPool:
+    """Workers for a single tool, sized between min_workers and max_workers."""
+
+    def __init__(self, tool: Tool, backend: WorkerBackend, min_workers: int = 0,
+                 max_workers: int = 4, idle_timeout: float = 300.0):
+        self.tool = tool
+        self.backend = backend
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self.idle: Deque[Worker] = deque()
+        self.size = 0
+        # A closed pool stops its busy workers when they are released instead of keeping them idle
+        self.closed = False
+        self._available = asyncio.Condition()
+
+    async def acquire(self) -> Worker:
+        """Take an idle worker, start a new one below max_workers, or wait for one."""
+        async with self._available:
+            while not self.idle and self.size >= self.max_workers:
+                await self._available.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.size += 1
+
+        try:
+            worker = await self.backend.start_worker(self.tool)
+            logger.info(f"Started worker {worker.worker_id} for tool {self.tool.name}")
+            return worker
+        except Exception:
+            async with self._available:
+                self.size -= 1
+                self._available.notify()
+            raise
+
+    async def release(self, worker: Worker, healthy: bool = True):
+        """Return a worker to the pool, or discard it if it misbehaved or the pool was closed."""
+        keep = healthy and not self.closed
+        if not keep:
+            await self.backend.stop_worker(worker)
+        async with self._available:
+            if keep:
+                worker.last_used = time.monotonic()
+                self.idle.append(worker)
+            else:
+                self.size -= 1
+            self._available.notify()
+
+    async def execute(self, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        worker = await self.acquire()
+        try:
+            result = await self.backend.call(worker, params, timeout)
+        except ToolExecutionError:
+            await self.release(worker)
+            raise
+        except BaseException:
+            await self.release(worker, healthy=False)
+            raise
+        await self.release(worker)
+        return result
+
+    async def scale(self):
+        """Start workers up to min_workers and stop those idle for longer than idle_timeout."""
+        expired = []
+        async with self._available:
+            now = time.monotonic()
+            # idle is used LIFO, so the least recently used workers are on the left
+            while self.idle and self.size > self.min_workers and now - self.idle[0].last_used > self.idle_timeout:
+                expired.append(self.idle.popleft())
+                self.size -= 1
+            missing = max(self.min_workers - self.size, 0)
+            self.size += missing
+
+        for worker in expired:
+            logger.info(f"Stopping idle worker {worker.worker_id} for tool {self.tool.name}")
+            await self.backend.stop_worker(worker)
+        for _ in range(missing):
+            try:
+                worker = await self.backend.start_worker(self.tool)
+            except Exception as e:
+                logger.error(f"Error starting worker for tool {self.tool.name}: {str(e)}")
+                async with self._available:
+                    self.size -= 1
+                continue
+            await self.release(worker)
+
+    async def close(self):
+        async with self._available:
+            self.closed = True
+            workers = list(self.idle)
+            self.idle.clear()
+            self.size -= len(workers)
+        for worker in workers:
+            await self.backend.stop_worker(worker)
+
+class WarmPoolManager:
+    """Per-tool warm worker pools for container tools that opt in with a 'warm_pool' setting.
+
+    A tool's pool is replaced, and the old one drained, when its image or
+    warm_pool setting changes in the registry.
+    """
+
+    def __init__(self, backend: WorkerBackend, scale_interval: float = 10.0):
+        self.backend = backend
+        self.scale_interval = scale_interval
+        self.pools: Dict[str, WorkerPool] = {}
+        self._settings: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._draining: Set[asyncio.Task] = set()
+        self._scaler: Optional[asyncio.Task] = None
+
+    def get_pool(self, tool: Tool) -> WorkerPool:
+        settings = tool.warm_pool or {}
+        pool = self.pools.get(tool.name)
+        if pool is None or self._settings[tool.name] != (tool.container_image, settings):
+            if pool is not None:
+                logger.info(f"Warm pool settings of tool {tool.name} changed, replacing its workers")
+                # Idle workers stop now, busy ones once their call returns
+                task = asyncio.ensure_future(pool.close())
+                self._draining.add(task)
+                task.add_done_callback(self._draining.discard)
+            pool = WorkerPool(
+                tool, self.backend,
+                min_workers=settings.get("min_workers", 0),
+                max_workers=settings.get("max_workers", 4),
+                idle_timeout=settings.get("idle_timeout", 300.0)
+            )
+            self.pools[tool.name] = pool
+            self._settings[tool.name] = (tool.container_image, dict(settings))
+        if self._scaler is None:
+            self._scaler = asyncio.ensure_future(self._scale_forever())
+        return pool
+
+    async def execute(self, tool: Tool, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Run the tool on a warm worker."""
+        return await self.get_pool(tool).execute(params, timeout)
+
+    async def _scale_forever(self):
+        while True:
+            await asyncio.sleep(self.scale_interval)
+            for pool in list(self.pools.values()):
+                try:
+                    await pool.scale()
+                except Exception as e:
+                    logger.error(f"Error scaling worker pool for {pool.tool.name}: {str(e)}")
+
+    async def close(self):
+        """Stop the scaler and all idle workers."""
+        if self._scaler is not None:
+            self._scaler.cancel()
+            self._scaler = None
+        for pool in self.pools.values():
+            await pool.close()
+        if self._draining:
+            await asyncio.gather(*self._draining, return_exceptions=True)
@@ -1,84 +1,383 @@
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List, Any
-from azure.storage.blob import BlobServiceClient
-from azure.identity import DefaultAzureCredential
+import os
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, List, Any, Mapping, Optional, Tuple
+from src.registry.storage import (
+    BlobConflictError, BlobNotFoundError, INDEX_BLOB, LEGACY_BLOB, RegistryStorage,
+    default_storage, tool_blob_name
+)
+from src.registry.snapshot import CatalogSnapshot, SharedCatalog
 
 logger = logging.getLogger(__name__)
 
 class Tool:
+    __slots__ = ("name", "description", "parameters", "returns", "container_image", "endpoint",
+                 "timeout", "cacheable", "cache_ttl", "warm_pool", "limits")
+    
     def __init__(self, name: str, description: str, parameters: Dict, returns: Dict, 
-                 container_image: str, endpoint: str):
+                 container_image: str, endpoint: str, timeout: Optional[float] = None,
+                 cacheable: bool = False, cache_ttl: float = 300.0,
+                 warm_pool: Optional[Dict[str, Any]] = None, limits: Optional[Dict[str, Any]] = None):
         self.name = name
         self.description = description
         self.parameters = parameters
         self.returns = returns
         self.container_image = container_image
         self.endpoint = endpoint
+        # Per-tool execution timeout in seconds, None uses the orchestrator default
+        self.timeout = timeout
+        # Idempotent tools can have their results memoized by the orchestrator
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        # Container tools may run on pre-started workers, e.g. {"min_workers": 1, "max_workers": 4}
+        self.warm_pool = warm_pool
+        # Admission control overrides, e.g. {"max_concurrency": 4, "rate": 10, "open_duration": 60}
+        self.limits = limits
+    
+    @classmethod
+    def from_dict(cls, tool_data: Dict[str, Any]) -> "Tool":
+        """Create a tool from its stored representation."""
+        return cls(
+            name=tool_data["name"],
+            description=tool_data["description"],
+            parameters=tool_data["parameters"],
+            returns=tool_data["returns"],
+            container_image=tool_data["container_image"],
+            endpoint=tool_data["endpoint"],
+            timeout=tool_data.get("timeout"),
+            cacheable=tool_data.get("cacheable", False),
+            cache_ttl=tool_data.get("cache_ttl", 300.0),
+            warm_pool=tool_data.get("warm_pool"),
+            limits=tool_data.get("limits")
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the stored representation of the tool."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class ToolCatalog:
+    """Immutable, precomputed views of the tools in the registry at one catalog version."""
+    __slots__ = ("version", "tools", "names", "timeouts", "prompt_fragments", "prompt", "fingerprint")
+    
+    def __init__(self, version: int, tools: Iterable[Dict[str, Any]],
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.version = version
+        self.tools: Tuple[Dict[str, Any], ...] = tuple(tools)
+        self.names: FrozenSet[str] = frozenset(tool["name"] for tool in self.tools)
+        # Execution timeouts of the tools that set one; not part of the fingerprint
+        self.timeouts: Dict[str, float] = timeouts or {}
+        # Rendered once per catalog version instead of once per planning request
+        self.prompt_fragments: Dict[str, str] = {
+            tool["name"]: f"Tool: {tool['name']}\nDescription: {tool['description']}\n"
+                          f"Parameters: {json.dumps(tool['parameters'])}\n"
+            for tool in self.tools
+        }
+        self.prompt = "\n".join(self.prompt_fragments.values())
+        catalog = json.dumps(list(self.tools), sort_keys=True, separators=(",", ":"))
+        self.fingerprint = hashlib.sha256(catalog.encode("utf-8")).hexdigest()
+    
+    def __len__(self) -> int:
+        return len(self.tools)
+    
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self.names
 
 class ToolRegistry:
-    def __init__(self):
-        self.tools = {}
-        self.credential = DefaultAzureCredential()
-        self.blob_service_client = BlobServiceClient(
-            account_url="https://mcpstorage.blob.core.windows.net",
-            credential=self.credential
-        )
-        self.container_client = self.blob_service_client.get_container_client("tool-registry")
-        self._load_tools_from_storage()
+    def __init__(self, storage: Optional[RegistryStorage] = None, refresh_interval: float = 30.0,
+                 snapshot_path: Optional[str] = None, snapshot_wait: float = 10.0, lazy: bool = False):
+        # A dict, or the read-only mapping of a shared catalog snapshot
+        self.tools: Mapping[str, Tool] = {}
+        self.version = 0
+        self.refresh_interval = refresh_interval
+        self._storage = storage
+        self._catalog: Optional[ToolCatalog] = None
+        self._listeners: List[Callable[[], None]] = []
+        # Per-tool revisions from the index, so a refresh only downloads tools that changed
+        self._revisions: Dict[str, str] = {}
+        self._index_etag: Optional[str] = None
+        self._legacy_etag: Optional[str] = None
+        self._lock = threading.Lock()
+        # Bumped when a tool is registered, so a refresh that read storage before the write is discarded
+        self._generation = 0
+        self._refresher: Optional[asyncio.Task] = None
+        # Processes sharing a snapshot read storage only in the one publishing it
+        self._shared = SharedCatalog(snapshot_path) if snapshot_path else None
+        self.snapshot_wait = snapshot_wait
+        self._snapshot_identity = None
+        self._published = False
+        self.storage_syncs = 0
+        self.snapshot_loads = 0
+        self.snapshot_publishes = 0
+        # Lazy registries are loaded by initialize(), so constructing one does no I/O
+        if not lazy and self._load_tools_from_storage():
+            self._catalog_changed()
+    
+    @property
+    def storage(self) -> RegistryStorage:
+        # The Azure clients are only imported and created when storage is first used
+        if self._storage is None:
+            self._storage = default_storage()
+        return self._storage
+    
+    async def initialize(self):
+        """Load the tools from storage off the event loop."""
+        if await asyncio.get_event_loop().run_in_executor(None, self._load_tools_from_storage):
+            # Listeners are notified on the event loop, where their state is used
+            self._catalog_changed()
     
-    def _load_tools_from_storage(self):
-        """Load tools from Azure Blob Storage."""
+    def _load_tools_from_storage(self) -> bool:
+        """Load tools from storage, or from the shared snapshot once it is published."""
         try:
-            blob_client = self.container_client.get_blob_client("tools.json")
-            if blob_client.exists():
-                blob_data = blob_client.download_blob()
-                tools_data = json.loads(blob_data.readall().decode("utf-8"))
-                for tool_data in tools_data:
-                    tool = Tool(
-                        name=tool_data["name"],
-                        description=tool_data["description"],
-                        parameters=tool_data["parameters"],
-                        returns=tool_data["returns"],
-                        container_image=tool_data["container_image"],
-                        endpoint=tool_data["endpoint"]
-                    )
-                    self.tools[tool.name] = tool
-                logger.info(f"Loaded {len(self.tools)} tools from storage")
+            if self._shared is not None and not self._shared.wait(self.snapshot_wait):
+                # Don't hold up readiness for a publisher that is slow to start
+                logger.warning("No catalog snapshot was published in time, loading the tools from storage")
+                changed = self._refresh_from_storage()
             else:
-                logger.warning("No tools.json found in storage")
+                changed = self._sync()
+            if changed:
+                logger.info(f"Loaded {len(self.tools)} tools from storage")
+            return changed
         except Exception as e:
             logger.error(f"Error loading tools from storage: {str(e)}")
+            return False
+    
+    def refresh(self) -> bool:
+        """Sync with storage using conditional reads; returns True if the catalog changed."""
+        changed = self._sync()
+        if changed:
+            self._catalog_changed()
+        return changed
+    
+    def _sync(self) -> bool:
+        """Swap in the current tools without notifying listeners, so it can run in a worker thread.
+        
+        With a shared snapshot, only the publishing process reads storage and
+        the others load the snapshot whenever it is republished.
+        """
+        if self._shared is not None and not self._shared.try_lead():
+            return self._refresh_from_snapshot()
+        changed = self._refresh_from_storage()
+        if self._shared is not None and (changed or not self._published):
+            self._publish_snapshot()
+        return changed
+    
+    def _refresh_from_snapshot(self) -> bool:
+        identity = self._shared.current()
+        if identity is None or identity == self._snapshot_identity:
+            return False
+        snapshot = self._shared.load(Tool.from_dict)
+        with self._lock:
+            self.tools = snapshot
+            self._revisions = dict(snapshot.revisions)
+            # Storage was not read, so the next sync from it, if this process takes over, is a full one
+            self._index_etag = None
+            self._legacy_etag = None
+            self._snapshot_identity = snapshot.identity
+        self.snapshot_loads += 1
+        return True
+    
+    def _publish_snapshot(self):
+        try:
+            tools = self.tools
+            self._shared.publish({name: tool.to_dict() for name, tool in tools.items()}, dict(self._revisions),
+                                 views=self._catalog_views(tools.values()))
+            self._published = True
+            self.snapshot_publishes += 1
+        except Exception as e:
+            logger.error(f"Error publishing the catalog snapshot: {str(e)}")
+    
+    def _refresh_from_storage(self) -> bool:
+        self.storage_syncs += 1
+        generation = self._generation
+        try:
+            response = self.storage.get(INDEX_BLOB, if_none_match=self._index_etag)
+        except BlobNotFoundError:
+            return self._refresh_legacy()
+        if response is None:
+            return False
+        
+        data, etag = response
+        index = json.loads(data.decode("utf-8"))["tools"]
+        tools = {}
+        for name, revision in index.items():
+            current = self.tools.get(name)
+            if current is not None and self._revisions.get(name) == revision:
+                tools[name] = current
+            else:
+                tool_data, _ = self.storage.get(tool_blob_name(name))
+                tools[name] = Tool.from_dict(json.loads(tool_data.decode("utf-8")))
+        
+        changed = len(tools) != len(self.tools) or any(self.tools.get(name) is not tool for name, tool in tools.items())
+        with self._lock:
+            if self._generation != generation:
+                # The index may predate a tool registered meanwhile; the next refresh reads the newer one
+                return False
+            # Swap in the new snapshot in one assignment; readers never see a partial catalog
+            self.tools = tools
+            self._revisions = dict(index)
+            self._index_etag = etag
+        return changed
+    
+    def _refresh_legacy(self) -> bool:
+        """Load the single tools.json blob written before the per-tool layout existed."""
+        generation = self._generation
+        try:
+            response = self.storage.get(LEGACY_BLOB, if_none_match=self._legacy_etag)
+        except BlobNotFoundError:
+            logger.warning("No tools found in storage")
+            return False
+        if response is None:
+            return False
+        
+        data, etag = response
+        tools = {}
+        for tool_data in json.loads(data.decode("utf-8")):
+            tool = Tool.from_dict(tool_data)
+            tools[tool.name] = tool
+        with self._lock:
+            if self._generation != generation:
+                return False
+            self.tools = tools
+            self._legacy_etag = etag
+        return True
+    
+    async def start_refresher(self):
+        """Start polling storage for catalog changes in the background."""
+        if self._refresher is None and self.refresh_interval > 0:
+            self._refresher = asyncio.ensure_future(self._refresh_forever())
+    
+    async def stop_refresher(self):
+        """Stop the background refresher."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+    
+    async def _refresh_forever(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                # Storage clients are synchronous, so keep them off the event loop
+                if await loop.run_in_executor(None, self._sync):
+                    self._catalog_changed()
+                    logger.info(f"Tool catalog refreshed: {len(self.tools)} tools")
+            except Exception as e:
+                logger.error(f"Error refreshing tools from storage: {str(e)}")
     
-    def register_tool(self, tool: Tool) -> bool:
-        """Register a new tool in the registry."""
+    async def register_tool(self, tool: Tool) -> bool:
+        """Register a new tool in the registry, writing it to storage off the event loop."""
         if tool.name in self.tools:
             logger.warning(f"Tool {tool.name} already exists")
             return False
         
-        self.tools[tool.name] = tool
-        self._save_tools_to_storage()
+        # Storage clients are synchronous, so the writes run in a worker thread without holding the lock
+        loop = asyncio.get_event_loop()
+        revisions = await loop.run_in_executor(None, self._save_tool_to_storage, tool)
+        with self._lock:
+            tools = dict(self.tools)
+            tools[tool.name] = tool
+            self.tools = tools
+            self._revisions.update(revisions)
+            self._generation += 1
+        
+        if self._shared is not None and self._shared.leading:
+            await loop.run_in_executor(None, self._publish_snapshot)
+        self._catalog_changed()
         return True
     
-    def _save_tools_to_storage(self):
-        """Save tools to Azure Blob Storage."""
+    def add_listener(self, listener: Callable[[], None]):
+        """Register a callback invoked whenever the tool catalog changes."""
+        self._listeners.append(listener)
+    
+    def _catalog_changed(self):
+        """Bump the catalog version and notify listeners; called on the event loop, never from a worker thread."""
+        with self._lock:
+            self.version += 1
+            self._catalog = None
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Error notifying registry listener: {str(e)}")
+    
+    @staticmethod
+    def _catalog_views(tools: Iterable[Tool]) -> Dict[str, Any]:
+        """What a ToolCatalog is built from, in a form that can be published with a snapshot."""
+        views = {"tools": [], "timeouts": {}}
+        for tool in tools:
+            views["tools"].append({
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters,
+                "returns": tool.returns
+            })
+            if tool.timeout:
+                views["timeouts"][tool.name] = tool.timeout
+        return views
+    
+    def catalog(self) -> ToolCatalog:
+        """Get the precomputed catalog views, rebuilt only when the catalog changes."""
+        catalog = self._catalog
+        if catalog is None or catalog.version != self.version:
+            tools = self.tools
+            # A snapshot carries the views, so followers build the catalog without decoding any tool
+            views = tools.views() if isinstance(tools, CatalogSnapshot) else None
+            if views is None:
+                views = self._catalog_views(tools.values())
+            catalog = ToolCatalog(self.version, views["tools"], timeouts=views["timeouts"])
+            self._catalog = catalog
+        return catalog
+    
+    def fingerprint(self) -> str:
+        """Hash of the list_tools() output, recomputed only when the catalog changes."""
+        return self.catalog().fingerprint
+    
+    def _save_tool_to_storage(self, tool: Tool) -> Dict[str, str]:
+        """Write one tool blob and add it to the index; returns the revisions written, empty on failure."""
         try:
-            tools_data = []
-            for tool in self.tools.values():
-                tools_data.append({
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.parameters,
-                    "returns": tool.returns,
-                    "container_image": tool.container_image,
-                    "endpoint": tool.endpoint
-                })
+            data = json.dumps(tool.to_dict(), sort_keys=True).encode("utf-8")
+            revision = hashlib.sha256(data).hexdigest()[:16]
+            self.storage.put(tool_blob_name(tool.name), data)
             
-            blob_client = self.container_client.get_blob_client("tools.json")
-            blob_client.upload_blob(json.dumps(tools_data), overwrite=True)
-            logger.info("Saved tools to storage")
+            # Other replicas may update the index concurrently, so retry on conflicts
+            for _ in range(5):
+                try:
+                    index_data, index_etag = self.storage.get(INDEX_BLOB)
+                    index = json.loads(index_data.decode("utf-8"))
+                except BlobNotFoundError:
+                    index, index_etag = {"tools": dict(self._revisions)}, None
+                    index["tools"].update({name: "" for name in self.tools if name not in self._revisions})
+                index["tools"][tool.name] = revision
+                revisions = {tool.name: revision}
+                
+                try:
+                    if index_etag is None:
+                        revisions.update(self._migrate_legacy_tools(index))
+                        self.storage.create(INDEX_BLOB, json.dumps(index).encode("utf-8"))
+                    else:
+                        self.storage.put(INDEX_BLOB, json.dumps(index).encode("utf-8"), if_match=index_etag)
+                    logger.info(f"Saved tool {tool.name} to storage")
+                    return revisions
+                except BlobConflictError:
+                    logger.info("Registry index changed concurrently, retrying")
+            logger.error(f"Could not update the registry index for {tool.name}")
         except Exception as e:
-            logger.error(f"Error saving tools to storage: {str(e)}")
+            logger.error(f"Error saving tool {tool.name} to storage: {str(e)}")
+        return {}
+    
+    def _migrate_legacy_tools(self, index: Dict[str, Any]) -> Dict[str, str]:
+        """Write per-tool blobs for tools loaded from tools.json before creating the index; returns their revisions."""
+        revisions = {}
+        for name, revision in list(index["tools"].items()):
+            if revision or name not in self.tools:
+                continue
+            data = json.dumps(self.tools[name].to_dict(), sort_keys=True).encode("utf-8")
+            self.storage.put(tool_blob_name(name), data)
+            index["tools"][name] = revisions[name] = hashlib.sha256(data).hexdigest()[:16]
+        return revisions
     
     def tool_exists(self, tool_name: str) -> bool:
         """Check if a tool exists in the registry."""
@@ -86,18 +385,28 @@ class ToolRegistry:
     
     def get_tool(self, tool_name: str) -> Tool:
         """Get a tool from the registry."""
-        if tool_name not in self.tools:
+        tool = self.tools.get(tool_name)
+        if tool is None:
             raise ValueError(f"Tool {tool_name} not found")
-        return self.tools[tool_name]
+        return tool
     
     def list_tools(self) -> List[Dict[str, Any]]:
         """List all tools in the registry."""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.parameters,
-                "returns": tool.returns
+        return list(self.catalog().tools)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Catalog and snapshot sharing metrics of this process, for monitoring."""
+        stats = {
+            "pid": os.getpid(),
+            "tools": len(self.tools),
+            "version": self.version,
+            "storage_syncs": self.storage_syncs
+        }
+        if self._shared is not None:
+            stats["snapshot"] = {
+                "path": self._shared.path,
+                "publisher": self._shared.leading,
+                "loads": self.snapshot_loads,
+                "publishes": self.snapshot_publishes
             }
-            for tool in self.tools.values()
-        ]
\ No newline at end of file
+        return stats
@@ -0,0 +1,152 @@
+import fcntl
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"MCPCATALOG1\n"
+
+class CatalogSnapshot(Mapping):
+    """Read-only tools of a catalog snapshot file, mapped into memory.
+
+    The file holds a header line with the offset of every tool followed by the
+    tools' JSON and the catalog views published with them. A tool is only
+    decoded when it is first looked up, so building the catalog from the views
+    decodes none, and the file's pages are shared by every process that maps it.
+    """
+
+    def __init__(self, path: str, decode: Callable[[Dict[str, Any]], Any]):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        header_end = self._map.find(b"\n", len(SNAPSHOT_MAGIC))
+        header = json.loads(self._map[len(SNAPSHOT_MAGIC):header_end])
+        self._body = header_end + 1
+        self._offsets: Dict[str, Tuple[int, int]] = header["tools"]
+        self.revisions: Dict[str, str] = header["revisions"]
+        self._views_range: Optional[Tuple[int, int]] = header.get("views")
+        self._decode = decode
+        self._decoded: Dict[str, Any] = {}
+
+    def views(self) -> Optional[Any]:
+        """The catalog views published with the tools, or None if there are none."""
+        if self._views_range is None:
+            return None
+        offset, length = self._views_range
+        start = self._body + offset
+        return json.loads(self._map[start:start + length])
+
+    def __getitem__(self, name: str) -> Any:
+        tool = self._decoded.get(name)
+        if tool is None:
+            offset, length = self._offsets[name]
+            start = self._body + offset
+            tool = self._decode(json.loads(self._map[start:start + length]))
+            self._decoded[name] = tool
+        return tool
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._offsets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+class SharedCatalog:
+    """Catalog snapshot shared by the processes of one host, e.g. the workers of one pod.
+
+    The process holding the lock file publishes the snapshot and is the only
+    one syncing with storage. Taking the lock stamps the lock file, so a
+    snapshot older than it was left by a previous publisher and is ignored.
+    When the publisher exits the lock is released and the next process to
+    refresh takes over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._lock_fd: Optional[int] = None
+
+    @property
+    def leading(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_lead(self) -> bool:
+        """Become the publishing process if no other process is."""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        self._lock_fd = fd
+        logger.info(f"Publishing the catalog snapshot at {self.path} from process {os.getpid()}")
+        return True
+
+    def current(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the snapshot published by the current publisher, None if it has not published yet."""
+        try:
+            snapshot = os.stat(self.path)
+            lock = os.stat(self.lock_path)
+        except FileNotFoundError:
+            return None
+        if snapshot.st_mtime_ns < lock.st_mtime_ns:
+            return None
+        return snapshot.st_ino, snapshot.st_mtime_ns, snapshot.st_size
+
+    def wait(self, timeout: float, interval: float = 0.05) -> bool:
+        """Wait until a snapshot is published or this process becomes the publisher."""
+        deadline = time.monotonic() + timeout
+        while self.current() is None and not self.try_lead():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def load(self, decode: Callable[[Dict[str, Any]], Any]) -> CatalogSnapshot:
+        return CatalogSnapshot(self.path, decode)
+
+    def publish(self, tools: Dict[str, Dict[str, Any]], revisions: Dict[str, str], views: Any = None):
+        """Replace the snapshot; processes still mapping the previous one keep reading it unchanged.
+
+        views, if given, is stored as one JSON value that readers can load without decoding any tool.
+        """
+        blobs = {name: json.dumps(tool, separators=(",", ":")).encode("utf-8") for name, tool in tools.items()}
+        offsets = {}
+        position = 0
+        for name, blob in blobs.items():
+            offsets[name] = (position, len(blob))
+            position += len(blob)
+        views_blob = json.dumps(views, separators=(",", ":")).encode("utf-8") if views is not None else b""
+        header = json.dumps({
+            "tools": offsets,
+            "revisions": revisions,
+            "views": (position, len(views_blob)) if views is not None else None
+        }, separators=(",", ":")).encode("utf-8")
+
+        # Write to a temporary file and rename so readers never see a partial snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(SNAPSHOT_MAGIC + header + b"\n")
+                for blob in blobs.values():
+                    f.write(blob)
+                f.write(views_blob)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional, Tuple
+from urllib.parse import quote
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError, ResourceModifiedError, ResourceNotFoundError, ResourceNotModifiedError
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_BLOB = "index.json"
+LEGACY_BLOB = "tools.json"
+
+def tool_blob_name(tool_name: str) -> str:
+    """Name of the per-tool blob in the sharded layout."""
+    return f"tools/{quote(tool_name, safe='')}.json"
+
+class BlobNotFoundError(Exception):
+    """Raised when a registry blob does not exist."""
+
+class BlobConflictError(Exception):
+    """Raised when a conditional write loses against a concurrent writer."""
+
+class RegistryStorage:
+    """Blob storage for the registry with ETag-based conditional reads and writes."""
+
+    def get(self, name: str, if_none_match: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        """Return (data, etag), or None if the blob still has the etag given in if_none_match."""
+        raise NotImplementedError
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None) -> str:
+        """Write a blob and return its new etag; with if_match, only if the blob still has that etag."""
+        raise NotImplementedError
+
+    def create(self, name: str, data: bytes) -> str:
+        """Write a blob only if it does not exist yet and return its etag."""
+        raise NotImplementedError
+
+class AzureBlobRegistryStorage(RegistryStorage):
+    """Registry storage in an Azure Blob Storage container."""
+
+    def __init__(self, container_client):
+        self.container_client = container_client
+
+    def get(self, name: str, if_none_match: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        blob_client = self.container_client.get_blob_client(name)
+        try:
+            if if_none_match:
+                downloader = blob_client.download_blob(etag=if_none_match, match_condition=MatchConditions.IfModified)
+            else:
+                downloader = blob_client.download_blob()
+        except ResourceNotModifiedError:
+            return None
+        except ResourceNotFoundError:
+            raise BlobNotFoundError(name)
+        return downloader.readall(), downloader.properties.etag
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None) -> str:
+        blob_client = self.container_client.get_blob_client(name)
+        try:
+            if if_match:
+                response = blob_client.upload_blob(
+                    data, overwrite=True, etag=if_match, match_condition=MatchConditions.IfNotModified
+                )
+            else:
+                response = blob_client.upload_blob(data, overwrite=True)
+        except ResourceModifiedError:
+            raise BlobConflictError(name)
+        return response["etag"]
+
+    def create(self, name: str, data: bytes) -> str:
+        try:
+            response = self.container_client.get_blob_client(name).upload_blob(data, overwrite=False)
+        except ResourceExistsError:
+            raise BlobConflictError(name)
+        return response["etag"]
+
+class LocalRegistryStorage(RegistryStorage):
+    """Registry storage in a local directory, for development and tests without Azure."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split("/"))
+
+    def _etag(self, path: str) -> str:
+        with open(path, "rb") as f:
+            return f'"{hashlib.sha256(f.read()).hexdigest()[:32]}"'
+
+    def get(self, name: str, if_none_match: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        path = self._path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise BlobNotFoundError(name)
+        etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+        if if_none_match == etag:
+            return None
+        return data, etag
+
+    def _write(self, path: str, data: bytes) -> str:
+        # Write to a temporary file and rename so readers never see a partial blob
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None) -> str:
+        path = self._path(name)
+        with self._lock:
+            if if_match and (not os.path.exists(path) or self._etag(path) != if_match):
+                raise BlobConflictError(name)
+            return self._write(path, data)
+
+    def create(self, name: str, data: bytes) -> str:
+        path = self._path(name)
+        with self._lock:
+            if os.path.exists(path):
+                raise BlobConflictError(name)
+            return self._write(path, data)
+
+def default_storage() -> RegistryStorage:
+    """Local storage when REGISTRY_STORAGE_PATH is set, the Azure registry container otherwise."""
+    local_path = os.getenv("REGISTRY_STORAGE_PATH")
+    if local_path:
+        logger.info(f"Using local registry storage at {local_path}")
+        return LocalRegistryStorage(local_path)
+
+    from azure.identity import DefaultAzureCredential
+    from azure.storage.blob import BlobServiceClient
+
+    blob_service_client = BlobServiceClient(
+        account_url="https://mcpstorage.blob.core.windows.net",
+        credential=DefaultAzureCredential()
+    )
+    return AzureBlobRegistryStorage(blob_service_client.get_container_client("tool-registry"))
@@ -1,8 +1,12 @@
+import asyncio
+import hashlib
 import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+from cachetools import LRUCache
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from azure.identity import ClientSecretCredential
-from azure.keyvault.secrets import SecretClient
 import jwt
 from datetime import datetime, timedelta
 
@@ -15,29 +19,145 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 key_vault_name = "mcp-keyvault"
 key_vault_uri = f"https://{key_vault_name}.vault.azure.net/"
 
-# Get credentials from Key Vault
-credential = ClientSecretCredential(
-    tenant_id="TENANT_ID",  # Replace with your tenant ID
-    client_id="CLIENT_ID",  # Replace with your client ID
-    client_secret="CLIENT_SECRET"  # Replace with your client secret
-)
+class SigningKeys:
+    """JWT signing secrets, reloaded from Key Vault periodically so keys can rotate without a restart.
 
-secret_client = SecretClient(vault_url=key_vault_uri, credential=credential)
+    Tokens are signed with the current secret and verified against the current
+    and the previous one, so tokens issued just before a rotation stay valid.
+    """
 
-# Get the secret for JWT signing
-try:
-    jwt_secret = secret_client.get_secret("JwtSecret").value
-except Exception as e:
-    logger.error(f"Error retrieving JWT secret: {str(e)}")
-    jwt_secret = "placeholder-secret"  # Use a default for development
+    def __init__(self, refresh_interval: float = 300.0):
+        self.refresh_interval = refresh_interval
+        self.keys: List[str] = []
+        self.version = 0
+        self.loaded_at = 0.0
+        self._secret_client = None
+        self._refreshing: Optional[asyncio.Future] = None
 
-def authenticate_request(token: str = Depends(oauth2_scheme)):
+    def _get_secret_client(self):
+        if self._secret_client is None:
+            # Imported here so that importing the services does not pay for the Azure SDKs
+            from azure.identity import ClientSecretCredential
+            from azure.keyvault.secrets import SecretClient
+            
+            # Get credentials from Key Vault
+            credential = ClientSecretCredential(
+                tenant_id="TENANT_ID",  # Replace with your tenant ID
+                client_id="CLIENT_ID",  # Replace with your client ID
+                client_secret="CLIENT_SECRET"  # Replace with your client secret
+            )
+            self._secret_client = SecretClient(vault_url=key_vault_uri, credential=credential)
+        return self._secret_client
+
+    def _fetch(self) -> List[str]:
+        """Fetch the current and previous signing secrets."""
+        if os.getenv("JWT_SECRET"):
+            return [secret for secret in (os.getenv("JWT_SECRET"), os.getenv("JWT_SECRET_PREVIOUS")) if secret]
+
+        # Get the secret for JWT signing
+        try:
+            secret_client = self._get_secret_client()
+            keys = [secret_client.get_secret("JwtSecret").value]
+        except Exception as e:
+            logger.error(f"Error retrieving JWT secret: {str(e)}")
+            return self.keys or ["placeholder-secret"]  # Use a default for development
+
+        try:
+            keys.append(secret_client.get_secret("JwtSecretPrevious").value)
+        except Exception:
+            pass
+        return keys
+
+    def load(self):
+        """Load the secrets, bumping the version if they changed."""
+        keys = self._fetch()
+        if keys != self.keys:
+            self.keys = keys
+            self.version += 1
+            logger.info(f"Loaded JWT signing keys (version {self.version})")
+        self.loaded_at = time.monotonic()
+
+    def signing_key(self) -> str:
+        if not self.keys:
+            self.load()
+        return self.keys[0]
+
+    async def get(self) -> List[str]:
+        """Get the verification keys, reloading them off the event loop when they are stale."""
+        if not self.keys:
+            await self._refresh()
+        elif time.monotonic() - self.loaded_at > self.refresh_interval and self._refreshing is None:
+            # Keep serving the known keys while a single background reload runs
+            asyncio.ensure_future(self._refresh())
+        return self.keys
+
+    async def _refresh(self):
+        if self._refreshing is None:
+            self._refreshing = asyncio.get_event_loop().run_in_executor(None, self.load)
+        refreshing = self._refreshing
+        try:
+            await refreshing
+        finally:
+            if self._refreshing is refreshing:
+                self._refreshing = None
+
+class VerifiedTokenCache:
+    """Bounded cache of verified token payloads, keyed on a hash of the token."""
+
+    def __init__(self, max_entries: int = 10000):
+        # token hash -> (payload, expires_at, signing keys version)
+        self.entries = LRUCache(maxsize=max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str, keys_version: int) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self.entries.get(key)
+        if entry is not None:
+            payload, expires_at, version = entry
+            # Entries die with the token, and with the keys that verified them
+            if expires_at > datetime.now().timestamp() and version == keys_version:
+                self.hits += 1
+                return payload
+            self.entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, token: str, payload: Dict[str, Any], keys_version: int):
+        self.entries[self._key(token)] = (payload, payload["exp"], keys_version)
+
+signing_keys = SigningKeys(refresh_interval=float(os.getenv("JWT_KEY_REFRESH_INTERVAL", "300")))
+token_cache = VerifiedTokenCache(max_entries=int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000")))
+
+def verify_token(token: str, keys: List[str], keys_version: int) -> Dict[str, Any]:
+    """Verify a token against the given keys, using the cache of already verified tokens."""
+    payload = token_cache.get(token, keys_version)
+    if payload is not None:
+        return payload
+
+    for index, key in enumerate(keys):
+        try:
+            payload = jwt.decode(token, key, algorithms=["HS256"], options={"require": ["exp"]})
+            break
+        except jwt.InvalidSignatureError:
+            if index == len(keys) - 1:
+                raise
+    if payload["exp"] < datetime.now().timestamp():
+        raise jwt.ExpiredSignatureError("Signature has expired")
+
+    token_cache.put(token, payload, keys_version)
+    return payload
+
+async def authenticate_request(token: str = Depends(oauth2_scheme)):
     """Validate the JWT token and return the user information."""
+    keys = await signing_keys.get()
     try:
-        payload = jwt.decode(token, jwt_secret, algorithms=["HS256"])
-        if payload.get("exp") < datetime.now().timestamp():
-            raise HTTPException(status_code=401, detail="Token expired")
-        return payload
+        return verify_token(token, keys, signing_keys.version)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
     except jwt.PyJWTError as e:
         logger.error(f"JWT error: {str(e)}")
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -50,5 +170,5 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.now() + timedelta(minutes=15)
     to_encode.update({"exp": expire.timestamp()})
-    encoded_jwt = jwt.encode(to_encode, jwt_secret, algorithm="HS256")
-    return encoded_jwt
\ No newline at end of file
+    encoded_jwt = jwt.encode(to_encode, signing_keys.signing_key(), algorithm="HS256")
+    return encoded_jwt
@@ -0,0 +1,259 @@
+"""Shared fixtures: the gateway against a fake OpenAI-compatible server and a fake MCP controller.
+
+The gateway reads its configuration at import time, so the environment is set
+here before any test imports it; tests get everything through fixtures rather
+than importing this module, which would pick new ports. The fake services run on an event loop in a
+background thread; the gateway runs in the TestClient's own loop.
+"""
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+from benchmarks.fakes import fake_controller, fake_openai
+
+LLM_LATENCY = 0.3
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+LLM_PORT = _free_port()
+CONTROLLER_PORT = _free_port()
+REGISTRY_DIR = tempfile.mkdtemp(prefix="registry-")
+
+with open(os.path.join(REGISTRY_DIR, "tools.json"), "w") as f:
+    json.dump([{"name": "echo", "description": "Echo the parameters", "parameters": {}, "returns": {},
+                "container_image": "", "endpoint": "http://127.0.0.1:1/echo"}], f)
+
+os.environ.update({
+    "JWT_SECRET": "test-secret",
+    "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{LLM_PORT}",
+    "AZURE_OPENAI_KEY": "test-key",
+    "MCP_CONTROLLER_URL": f"http://127.0.0.1:{CONTROLLER_PORT}",
+    "REGISTRY_STORAGE_PATH": REGISTRY_DIR,
+    "REGISTRY_REFRESH_INTERVAL": "0",
+    "LLM_MAX_CONCURRENCY": "64"
+})
+
+PLAN = [{"tool_name": "echo", "parameters": {"i": 0}, "depends_on": []}]
+ANALYSIS = {"user_response": "Done.", "success": True, "issues": [], "improvements": []}
+
+def llm_reply(prompt: str) -> str:
+    """A one-step plan for planning prompts, a successful analysis for feedback prompts."""
+    return json.dumps(PLAN if "Create a plan" in prompt else ANALYSIS)
+
+class BackgroundLoop:
+    """Event loop in a daemon thread, for fake services shared by all tests."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+@pytest.fixture(scope="session")
+def fake_services():
+    background = BackgroundLoop()
+    llm = fake_openai(latency=LLM_LATENCY, reply=llm_reply)
+    llm.port = LLM_PORT
+    controller = fake_controller(latency=0.01)
+    controller.port = CONTROLLER_PORT
+    background.run(llm.start())
+    background.run(controller.start())
+    yield {"llm": llm, "llm_latency": LLM_LATENCY, "controller": controller}
+    background.run(llm.stop())
+    background.run(controller.stop())
+
+@pytest.fixture(scope="session")
+def gateway(fake_services):
+    """The gateway module, configured against the fake services."""
+    from src.api import gateway
+
+    return gateway
+
+@pytest.fixture(scope="session")
+def client(gateway):
+    """A client of the gateway app, started and ready; its portal runs calls on the app's event loop."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(gateway.app) as client:
+        for _ in range(200):
+            if client.get("/ready").status_code == 200:
+                break
+            time.sleep(0.05)
+        yield client
+
+@pytest.fixture
+def wait_for_run(client):
+    """Poll a run of /agent/runs until it has finished, so its work does not spill into later tests."""
+    from src.api.run_queue import TERMINAL_STATUSES
+
+    def wait(run_id: str, headers: dict, timeout: float = 10.0) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            response = client.get(f"/agent/runs/{run_id}", headers=headers)
+            assert response.status_code == 200
+            if response.json()["status"] in TERMINAL_STATUSES or time.monotonic() > deadline:
+                return response.json()
+            time.sleep(0.05)
+
+    return wait
+
+@pytest.fixture
+def auth_headers():
+    """Build Authorization headers for a token with the given claims."""
+    from src.security.auth import create_access_token
+
+    def build(**claims) -> dict:
+        token = create_access_token(dict({"sub": "test-user"}, **claims), expires_delta=timedelta(hours=1))
+        return {"Authorization": f"Bearer {token}"}
+
+    return build
+
+class StubRedis:
+    """The parts of the redis.asyncio client the Redis backends use, returning bytes like Redis.
+
+    Expiry follows the now attribute rather than the clock, so tests can move time forward.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.lists: Dict[str, List[bytes]] = {}
+        self.hashes: Dict[str, Dict[bytes, bytes]] = {}
+        self.strings: Dict[str, bytes] = {}
+        self.expires_at: Dict[str, float] = {}
+        self.streams: Dict[str, List[Tuple[bytes, Dict[bytes, bytes]]]] = {}
+        self._stream_ids = 0
+
+    @staticmethod
+    def _bytes(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    # Lists
+
+    async def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    async def lpush(self, key: str, value):
+        self.lists.setdefault(key, []).insert(0, self._bytes(value))
+
+    async def rpush(self, key: str, value):
+        self.lists.setdefault(key, []).append(self._bytes(value))
+
+    async def blmove(self, source: str, destination: str, timeout: int, src: str, dest: str) -> Optional[bytes]:
+        deadline = time.monotonic() + timeout
+        while not self.lists.get(source):
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(0.01)
+        value = self.lists[source].pop()
+        self.lists.setdefault(destination, []).insert(0, value)
+        return value
+
+    async def lrange(self, key: str, start: int, stop: int) -> List[bytes]:
+        return list(self.lists.get(key, []))
+
+    async def lrem(self, key: str, count: int, value) -> int:
+        values = self.lists.get(key, [])
+        if self._bytes(value) in values:
+            values.remove(self._bytes(value))
+            return 1
+        return 0
+
+    # Hashes
+
+    async def hset(self, key: str, field, value):
+        self.hashes.setdefault(key, {})[self._bytes(field)] = self._bytes(value)
+
+    async def hsetnx(self, key: str, field, value):
+        self.hashes.setdefault(key, {}).setdefault(self._bytes(field), self._bytes(value))
+
+    async def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key: str, field):
+        self.hashes.get(key, {}).pop(self._bytes(field), None)
+
+    # Strings
+
+    async def get(self, key: str) -> Optional[bytes]:
+        expires_at = self.expires_at.get(key)
+        if expires_at is not None and self.now >= expires_at:
+            self.strings.pop(key, None)
+        return self.strings.get(key)
+
+    async def set(self, key: str, value, ex: Optional[int] = None):
+        assert ex is None or (isinstance(ex, int) and ex > 0), "redis rejects a non-positive expiry"
+        self.strings[key] = self._bytes(value)
+        if ex is not None:
+            self.expires_at[key] = self.now + ex
+
+    async def expire(self, key: str, seconds: int):
+        pass
+
+    # Streams
+
+    async def xadd(self, key: str, fields: Dict[str, Any], maxlen: int, approximate: bool):
+        self._stream_ids += 1
+        entry_id = f"{self._stream_ids}-0".encode("ascii")
+        self.streams.setdefault(key, []).append(
+            (entry_id, {self._bytes(name): self._bytes(value) for name, value in fields.items()})
+        )
+        return entry_id
+
+    async def xrevrange(self, key: str, count: Optional[int] = None):
+        entries = list(reversed(self.streams.get(key, [])))
+        return entries[:count] if count is not None else entries
+
+    async def xread(self, streams: Dict[str, Any], block: Optional[int] = None):
+        deadline = time.monotonic() + (block or 0) / 1000
+        while True:
+            response = []
+            for key, last_id in streams.items():
+                last = int(self._bytes(last_id).split(b"-")[0])
+                entries = [entry for entry in self.streams.get(key, []) if int(entry[0].split(b"-")[0]) > last]
+                if entries:
+                    response.append((key.encode("utf-8"), entries))
+            if response or time.monotonic() >= deadline:
+                return response
+            await asyncio.sleep(0.01)
+
+@pytest.fixture
+def redis() -> StubRedis:
+    return StubRedis()
+
+class StubLLM:
+    """An LLMClient streaming reply(prompt) in small chunks, counting its streams that are not closed yet."""
+
+    def __init__(self, reply: Callable[[str], str], chunk_size: int = 7):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.open_streams = 0
+
+    async def complete(self, prompt: str, **kwargs) -> str:
+        return self.reply(prompt)
+
+    async def stream(self, prompt: str, **kwargs):
+        text = self.reply(prompt)
+        self.open_streams += 1
+        try:
+            for position in range(0, len(text), self.chunk_size):
+                await asyncio.sleep(0)
+                yield text[position:position + self.chunk_size]
+        finally:
+            self.open_streams -= 1
+
+@pytest.fixture
+def stub_llm():
+    """Build a StubLLM answering with the given reply function."""
+    return StubLLM
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+import pytest
+
+from src.orchestrator.admission import AdmissionController, AdmissionError, ToolLimiter
+from src.registry.registry import Tool
+
+def make_limiter(**settings) -> ToolLimiter:
+    # A rate low enough that no token is refilled during a test
+    return ToolLimiter("tool", max_concurrency=1, rate=0.001, burst=2, **settings)
+
+def test_queue_timeout_refunds_the_token():
+    limiter = make_limiter(queue_timeout=0.05)
+
+    async def scenario():
+        async with limiter.admit():
+            with pytest.raises(AdmissionError) as error:
+                async with limiter.admit():
+                    pass
+        return error.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert limiter.rejected == {"queue_timeout": 1}
+    assert limiter.bucket.tokens == pytest.approx(1, abs=0.01)
+
+def test_cancelled_wait_refunds_the_token():
+    limiter = make_limiter(queue_timeout=10)
+
+    async def queued():
+        async with limiter.admit():
+            pass
+
+    async def scenario():
+        async with limiter.admit():
+            waiter = asyncio.ensure_future(queued())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+    asyncio.run(scenario())
+    assert limiter.bucket.tokens == pytest.approx(1, abs=0.01)
+
+def test_circuit_opening_while_queued_refunds_the_token():
+    limiter = make_limiter(queue_timeout=10, min_calls=1)
+
+    async def queued():
+        async with limiter.admit():
+            pass
+
+    async def scenario():
+        waiter = asyncio.ensure_future(queued())
+        with pytest.raises(RuntimeError):
+            async with limiter.admit():
+                await asyncio.sleep(0.01)
+                # Fails and opens the circuit while the other call is queued
+                raise RuntimeError("tool failed")
+        with pytest.raises(AdmissionError):
+            await waiter
+
+    asyncio.run(scenario())
+    assert limiter.rejected == {"circuit_open": 1}
+    assert limiter.bucket.tokens == pytest.approx(1, abs=0.01)
+
+def test_unknown_limits_are_ignored_and_logged(caplog):
+    controller = AdmissionController(queue_timeout=5)
+    tool = Tool("tool", "A tool", {}, {}, "", "http://tool", limits={"max_concurrency": 2, "max_concurency": 3})
+
+    with caplog.at_level(logging.WARNING):
+        limiter = controller.limiter(tool)
+
+    assert limiter.max_concurrency == 2
+    assert "max_concurency" in caplog.text
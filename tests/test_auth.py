@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from src.security import auth
+from src.security.auth import SigningKeys, VerifiedTokenCache
+
+class FrozenDatetime(datetime):
+    """datetime whose now() is moved by tests."""
+    current = datetime(2030, 1, 1)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(auth, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2030, 1, 1))
+    return FrozenDatetime
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = VerifiedTokenCache(max_entries=16)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    return cache
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Count the signature checks made by jwt.decode."""
+    calls = []
+    decode = jwt.decode
+
+    def counted(*args, **kwargs):
+        calls.append(args[1])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counted)
+    return calls
+
+def sign(key: str, expires_at: datetime, sub: str = "user") -> str:
+    return jwt.encode({"sub": sub, "exp": expires_at.timestamp()}, key, algorithm="HS256")
+
+def test_verified_token_is_served_from_the_cache(clock, token_cache, decodes):
+    token = sign("current", clock.current + timedelta(minutes=5))
+
+    assert auth.verify_token(token, ["current"], 1)["sub"] == "user"
+    assert auth.verify_token(token, ["current"], 1)["sub"] == "user"
+
+    assert decodes == ["current"]
+    assert token_cache.hits == 1 and token_cache.misses == 1
+
+def test_cached_token_expires_with_the_token(clock, token_cache, decodes):
+    token = sign("current", clock.current + timedelta(minutes=5))
+    auth.verify_token(token, ["current"], 1)
+
+    clock.current += timedelta(minutes=6)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        auth.verify_token(token, ["current"], 1)
+    assert len(token_cache.entries) == 0
+
+def test_token_signed_with_the_previous_key_is_accepted_until_it_is_dropped(clock, token_cache, decodes):
+    token = sign("old", clock.current + timedelta(minutes=5))
+
+    # Just after a rotation both keys verify, the current one first
+    assert auth.verify_token(token, ["new", "old"], 2)["sub"] == "user"
+    assert decodes == ["new", "old"]
+
+    # Once the old key is dropped the keys version changes, so the cached result is not used
+    with pytest.raises(jwt.InvalidSignatureError):
+        auth.verify_token(token, ["newer", "new"], 3)
+    assert token_cache.misses == 2
+
+def test_keys_version_changes_only_when_the_keys_do(monkeypatch):
+    keys = SigningKeys()
+    monkeypatch.setenv("JWT_SECRET", "first")
+    monkeypatch.delenv("JWT_SECRET_PREVIOUS", raising=False)
+    keys.load()
+    keys.load()
+    assert keys.keys == ["first"] and keys.version == 1
+
+    monkeypatch.setenv("JWT_SECRET", "second")
+    monkeypatch.setenv("JWT_SECRET_PREVIOUS", "first")
+    keys.load()
+    assert keys.keys == ["second", "first"] and keys.version == 2
+    assert keys.signing_key() == "second"
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeHTTPServer, fake_controller
+from src.ai.execution import ExecutionEngine
+
+@pytest.fixture(scope="module")
+def controller(fake_services):
+    """The controller module, configured like the gateway against the test registry."""
+    from src.controller import controller
+
+    return controller
+
+@pytest.fixture(scope="module")
+def controller_client(controller):
+    from fastapi.testclient import TestClient
+
+    with TestClient(controller.app) as client:
+        for _ in range(200):
+            if client.get("/ready").status_code == 200:
+                break
+            time.sleep(0.05)
+        yield client
+
+@pytest.fixture
+def tools(controller, monkeypatch):
+    """Tool calls taking longer the lower their "i", failing when it is negative."""
+    async def execute_tool(tool, params):
+        await asyncio.sleep(0.1 * (3 - abs(params["i"])))
+        if params["i"] < 0:
+            raise RuntimeError("tool failed")
+        return {"echo": params}
+
+    monkeypatch.setattr(controller.orchestrator, "execute_tool", execute_tool)
+
+def test_batch_results_stream_in_completion_order(controller_client, tools, auth_headers):
+    invocations = [{"tool_name": "echo", "params": {"i": i}} for i in range(3)]
+    invocations.append({"tool_name": "missing", "params": {"i": 3}})
+    invocations.append({"tool_name": "echo", "params": {"i": -2.5}})
+
+    response = controller_client.post("/execute_tools", json=invocations, headers=auth_headers())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Unknown tools are reported without being called, then the fastest calls land first
+    assert [line["index"] for line in lines] == [3, 4, 2, 1, 0]
+    assert lines[0] == {"index": 3, "status": "error", "status_code": 404, "detail": "Tool missing not found"}
+    assert lines[1] == {"index": 4, "status": "error", "status_code": 500, "detail": "tool failed"}
+    assert lines[2] == {"index": 2, "status": "success", "result": {"echo": {"i": 2}}}
+
+def test_oversized_batch_is_rejected(controller, controller_client, tools, auth_headers, monkeypatch):
+    monkeypatch.setattr(controller, "batch_max_items", 2)
+    invocations = [{"tool_name": "echo", "params": {"i": i}} for i in range(3)]
+
+    response = controller_client.post("/execute_tools", json=invocations, headers=auth_headers())
+
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Batches are limited to 2 invocations"
+
+PLAN = [{"tool_name": "echo", "parameters": {"i": i}, "depends_on": []} for i in range(3)]
+
+def run_plan(server: FakeHTTPServer, plan: list) -> tuple:
+    """Execute the plan with batching against the server, returning the engine and the results."""
+    async def scenario():
+        await server.start()
+        engine = ExecutionEngine(server.url, "token", batch_window=0.05)
+        try:
+            return engine, await engine.execute_plan(plan)
+        finally:
+            await engine.http_client.close()
+            await server.stop()
+
+    return asyncio.run(scenario())
+
+def test_ready_steps_share_one_batch_call():
+    server = fake_controller(latency=0.01)
+
+    engine, results = run_plan(server, PLAN)
+
+    assert [record["result"] for record in results] == [
+        {"status": "success", "result": {"echo": {"i": i}}} for i in range(3)
+    ]
+    assert server.requests == 1 and engine.batch_window == 0.05
+
+@pytest.mark.parametrize("status", [404, 405])
+def test_controller_without_batch_endpoint_is_called_per_step(status):
+    targets = []
+
+    async def handle(method, target, body):
+        targets.append(target.split("?")[0])
+        if target.startswith("/execute_tools"):
+            return status, {"detail": "Not Found"}
+        return 200, {"status": "success", "result": {"echo": json.loads(body)}}
+
+    engine, results = run_plan(FakeHTTPServer(handle), PLAN)
+
+    assert [record["result"]["result"] for record in results] == [{"echo": {"i": i}} for i in range(3)]
+    # Batching is switched off after the first refusal
+    assert targets == ["/execute_tools"] + ["/execute_tool"] * 3
+    assert engine.batch_window is None
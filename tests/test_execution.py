@@ -0,0 +1,20 @@
+import pytest
+
+from src.ai.execution import get_step_dependencies, step_dependencies
+
+def test_dependencies_from_depends_on_and_references():
+    plan = [
+        {"tool_name": "a", "parameters": {}},
+        {"tool_name": "b", "parameters": {}, "depends_on": []},
+        {"tool_name": "c", "parameters": {"x": "${steps.1.result.id}"}, "depends_on": 2},
+        {"tool_name": "d", "parameters": {}}
+    ]
+
+    assert get_step_dependencies(plan) == [[], [], [0, 1], [2]]
+
+@pytest.mark.parametrize("depends_on", [
+    True, [True], [False], [1, True], [{"step": 1}], [[1]], ["1"], [1.0], [0], [3], {"step": 1}, "1"
+])
+def test_invalid_depends_on_is_a_value_error(depends_on):
+    with pytest.raises(ValueError):
+        step_dependencies({"tool_name": "c", "parameters": {}, "depends_on": depends_on}, 2)
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.api.coalescing import RequestCoalescer
+from src.api.run_queue import SUCCEEDED
+
+@pytest.fixture
+def coalescing(gateway, monkeypatch):
+    """Coalesce requests by an "org" claim, with the analysis deferred to a background run."""
+    coalescer = RequestCoalescer()
+    monkeypatch.setattr(gateway, "coalescer", coalescer)
+    monkeypatch.setattr(gateway, "COALESCING_SCOPE_CLAIM", "org")
+    monkeypatch.setattr(gateway, "FEEDBACK_ASYNC", True)
+    return coalescer
+
+def execute_concurrently(client, request: str, headers: list):
+    def execute(caller_headers):
+        return client.post("/agent/execute", json={"request": request}, headers=caller_headers)
+
+    with ThreadPoolExecutor(len(headers)) as pool:
+        return list(pool.map(execute, headers))
+
+def test_same_scope_shares_run_and_hides_foreign_analysis_run(client, coalescing, auth_headers, wait_for_run):
+    alice = auth_headers(sub="alice", org="acme")
+    bob = auth_headers(sub="bob", org="acme")
+
+    responses = execute_concurrently(client, "Echo shared request", [alice, bob])
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert coalescing.stats()["runs"] == 1 and coalescing.stats()["coalesced"] == 1
+    run_ids = [response.json()["analysis_run_id"] for response in responses]
+    # Only the caller that started the run gets its analysis run, and can read it
+    owned = [(run_id, caller) for run_id, caller in zip(run_ids, [alice, bob]) if run_id is not None]
+    assert len(owned) == 1
+    run_id, caller = owned[0]
+    assert wait_for_run(run_id, caller)["status"] == SUCCEEDED
+
+def test_tokens_without_scope_claim_are_not_coalesced(client, coalescing, auth_headers, wait_for_run):
+    alice = auth_headers(sub="alice")
+    bob = auth_headers(sub="bob")
+
+    responses = execute_concurrently(client, "Echo unscoped request", [alice, bob])
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert coalescing.stats()["runs"] == 0 and coalescing.stats()["coalesced"] == 0
+    for response, caller in zip(responses, [alice, bob]):
+        assert wait_for_run(response.json()["analysis_run_id"], caller)["status"] == SUCCEEDED
+
+def test_coalescing_key_keeps_case():
+    coalescer = RequestCoalescer()
+
+    assert coalescer.make_key("get order AbC12", "catalog", None) != coalescer.make_key("get order abc12", "catalog", None)
+    assert coalescer.make_key("get order AbC12", "catalog", None) == coalescer.make_key(" get  order AbC12?", "catalog", None)
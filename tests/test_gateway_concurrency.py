@@ -0,0 +1,25 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CONCURRENT_REQUESTS = 8
+
+def test_concurrent_agent_requests_overlap(client, fake_services, auth_headers):
+    """N concurrent /agent/execute requests take about as long as one, not N times as long."""
+    headers = auth_headers()
+    latency = fake_services["llm_latency"]
+
+    def execute(index: int):
+        return client.post("/agent/execute", json={"request": f"Echo request {index}"}, headers=headers)
+
+    requests_before = fake_services["llm"].requests
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENT_REQUESTS) as pool:
+        responses = list(pool.map(execute, range(CONCURRENT_REQUESTS)))
+    elapsed = time.perf_counter() - start
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS
+    assert all(response.json()["response"] == "Done." for response in responses)
+    # Each request plans and analyzes: two LLM calls
+    assert fake_services["llm"].requests - requests_before == 2 * CONCURRENT_REQUESTS
+    serialized = 2 * latency * CONCURRENT_REQUESTS
+    assert elapsed < 2 * latency + 1.0 < serialized
@@ -0,0 +1,40 @@
+import pytest
+
+@pytest.fixture
+def async_feedback(gateway, monkeypatch):
+    """Deferred analyses, counting how often the rule-based analysis is computed."""
+    monkeypatch.setattr(gateway, "FEEDBACK_ASYNC", True)
+    calls = []
+    rule_based_analysis = gateway.feedback.rule_based_analysis
+
+    def counted(plan, results):
+        calls.append(plan)
+        return rule_based_analysis(plan, results)
+
+    monkeypatch.setattr(gateway.feedback, "rule_based_analysis", counted)
+    return calls
+
+def test_rule_based_analysis_is_returned_without_recomputing(gateway, client, async_feedback, auth_headers,
+                                                            monkeypatch):
+    monkeypatch.setattr(gateway.feedback, "rule_max_chars", 10000)
+
+    response = client.post("/agent/execute", json={"request": "Echo quickly"}, headers=auth_headers())
+
+    assert response.status_code == 200
+    assert response.json()["analysis"]["analyzed_by"] == "rules"
+    assert response.json().get("analysis_run_id") is None
+    assert len(async_feedback) == 1
+
+def test_deferred_llm_analysis_does_not_recompute_rules(client, async_feedback, auth_headers, fake_services,
+                                                        wait_for_run):
+    headers = auth_headers()
+    llm_requests = fake_services["llm"].requests
+
+    response = client.post("/agent/execute", json={"request": "Echo later"}, headers=headers)
+
+    assert response.status_code == 200
+    record = wait_for_run(response.json()["analysis_run_id"], headers)
+    assert record["result"]["response"] == "Done."
+    assert len(async_feedback) == 1
+    # One call to plan, one to analyze
+    assert fake_services["llm"].requests - llm_requests == 2
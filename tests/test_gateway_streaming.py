@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+def parse_events(lines) -> list:
+    """(event, data) pairs of a server-sent event stream, skipping comments."""
+    events = []
+    event = None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+def test_events_arrive_in_phase_order(gateway, client, auth_headers, monkeypatch, stub_llm):
+    analysis = {"user_response": "Echoed it.", "success": True, "issues": [], "improvements": []}
+    monkeypatch.setattr(gateway.feedback, "llm", stub_llm(lambda prompt: json.dumps(analysis), chunk_size=3))
+
+    with client.stream("POST", "/agent/execute/stream", json={"request": "Echo a stream"},
+                       headers=auth_headers()) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.iter_lines())
+
+    names = [event for event, _ in events]
+    assert names[:2] == ["plan", "step"] and names[-2:] == ["analysis", "done"]
+    assert set(names[2:-2]) == {"token"} and len(names[2:-2]) > 1
+    # The tokens spell the response before the parsed analysis arrives
+    assert "".join(data for event, data in events if event == "token") == "Echoed it."
+    assert events[-2][1] == analysis
+    assert events[-1][1] == {"success": True, "response": "Echoed it."}
+
+def test_failure_ends_the_stream_with_an_error_event(gateway, client, auth_headers, monkeypatch):
+    async def fail(user_request, tools):
+        raise RuntimeError("planning failed")
+
+    monkeypatch.setattr(gateway.planning, "create_plan", fail)
+
+    with client.stream("POST", "/agent/execute/stream", json={"request": "Echo a failure"},
+                       headers=auth_headers()) as response:
+        events = parse_events(response.iter_lines())
+
+    assert events == [("error", {"detail": "planning failed"})]
+
+def test_closing_the_stream_cancels_started_steps(gateway, client, monkeypatch, stub_llm):
+    plan = [{"tool_name": "echo", "parameters": {"i": 1}, "depends_on": []},
+            {"tool_name": "echo", "parameters": {"i": 2}, "depends_on": []}]
+    monkeypatch.setattr(gateway.planning, "llm", stub_llm(lambda prompt: json.dumps(plan)))
+    monkeypatch.setattr(gateway, "SPECULATIVE_EXECUTION", True)
+    started, cancelled = [], []
+
+    async def hang(tool_name, parameters):
+        started.append(parameters["i"])
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(parameters["i"])
+            raise
+
+    monkeypatch.setattr(gateway.execution, "_call_mcp_controller", hang)
+
+    async def disconnect():
+        # As the response stream is when the client goes away
+        stream = gateway._stream_agent("Echo twice and disconnect")
+        received = [await stream.__anext__(), await stream.__anext__()]
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return received
+
+    received = client.portal.call(disconnect)
+    assert received[0] == ": started\n\n" and received[1].startswith("event: plan\n")
+    assert sorted(cancelled) == [1, 2]
@@ -0,0 +1,14 @@
+from src.registry.registry import Tool
+
+def test_tool_timeouts_follow_the_registry(gateway, client):
+    assert "slow_report" not in gateway.execution.tool_timeouts
+
+    tool = Tool("slow_report", "Build a slow report", {}, {}, "", "http://127.0.0.1:1/report", timeout=300)
+    # Registered on the app's event loop, where catalog listeners run
+    assert client.portal.call(gateway.registry.register_tool, tool)
+
+    catalog = gateway.registry.catalog()
+    assert catalog.timeouts["slow_report"] == 300
+    assert gateway.execution.tool_timeouts["slow_report"] == 300 + gateway.EXECUTION_TIMEOUT_MARGIN
+    # Tools without their own timeout keep the engine default
+    assert "echo" not in gateway.execution.tool_timeouts
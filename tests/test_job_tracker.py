@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.fakes import FakeKubernetes
+from src.orchestrator.job_tracker import RESULT_ANNOTATION, JobTracker
+from src.orchestrator.orchestrator import Orchestrator
+from src.registry.registry import Tool
+
+def job_body(job_name: str, params: dict):
+    """The parts of a V1Job that FakeKubernetes reads."""
+    container = SimpleNamespace(env=[SimpleNamespace(name="PARAMS", value=json.dumps(params))])
+    return SimpleNamespace(
+        metadata=SimpleNamespace(name=job_name),
+        spec=SimpleNamespace(template=SimpleNamespace(spec=SimpleNamespace(containers=[container])))
+    )
+
+def make_tracker(kubernetes: FakeKubernetes, watch_timeout: int = 60) -> JobTracker:
+    return JobTracker(kubernetes, kubernetes, watch_factory=kubernetes.watch, watch_timeout=watch_timeout)
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+def test_completion_before_wait_is_not_missed():
+    kubernetes = FakeKubernetes(latency=0.0)
+
+    async def scenario():
+        tracker = make_tracker(kubernetes)
+        future = tracker.expect("early")
+        kubernetes.create_namespaced_job("default", job_body("early", {"i": 1}))
+        # The job completes before anyone waits for it
+        await wait_until(future.done)
+        try:
+            return await tracker.wait_for_job("early", timeout=1.0)
+        finally:
+            tracker.stop()
+
+    assert asyncio.run(scenario()) == {"echo": {"i": 1}}
+
+def test_completion_during_watch_reconnect_is_picked_up_by_relist():
+    kubernetes = FakeKubernetes(latency=3600)
+
+    async def scenario():
+        tracker = make_tracker(kubernetes, watch_timeout=1)
+        tracker.expect("reconnect")
+        kubernetes.create_namespaced_job("default", job_body("reconnect", {"i": 2}))
+        # The job succeeds without a watch event, as if it finished while the watch was disconnected
+        job = kubernetes.jobs["reconnect"]
+        job.metadata.annotations[RESULT_ANNOTATION] = json.dumps({"done": True})
+        job.status.succeeded = 1
+        try:
+            return await tracker.wait_for_job("reconnect", timeout=5.0)
+        finally:
+            tracker.stop()
+
+    assert asyncio.run(scenario()) == {"done": True}
+
+def test_timeout_deletes_the_job():
+    kubernetes = FakeKubernetes(latency=3600)
+
+    async def scenario():
+        tracker = make_tracker(kubernetes)
+        tracker.expect("slow")
+        kubernetes.create_namespaced_job("default", job_body("slow", {}))
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await tracker.wait_for_job("slow", timeout=0.1)
+            await wait_until(lambda: "slow" not in kubernetes.jobs)
+        finally:
+            tracker.stop()
+
+    asyncio.run(scenario())
+
+def test_cancelled_wait_deletes_the_job():
+    kubernetes = FakeKubernetes(latency=3600)
+
+    async def scenario():
+        tracker = make_tracker(kubernetes)
+        tracker.expect("abandoned")
+        kubernetes.create_namespaced_job("default", job_body("abandoned", {}))
+        waiter = asyncio.ensure_future(tracker.wait_for_job("abandoned", timeout=60))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            await wait_until(lambda: "abandoned" not in kubernetes.jobs)
+        finally:
+            tracker.stop()
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("timeout, deadline", [(0.3, 1), (2.5, 3), (30, 30)])
+def test_job_deadline_is_the_timeout_rounded_up(timeout, deadline):
+    kubernetes = FakeKubernetes(latency=0.0)
+    bodies = []
+    create_namespaced_job = kubernetes.create_namespaced_job
+
+    def record(namespace, body):
+        bodies.append(body)
+        return create_namespaced_job(namespace, body)
+
+    kubernetes.create_namespaced_job = record
+    orchestrator = Orchestrator(lazy=True)
+    orchestrator.k8s_api = orchestrator.k8s_batch_api = kubernetes
+    orchestrator.job_tracker = make_tracker(kubernetes)
+    tool = Tool("job", "Runs as a job", {}, {}, "job:latest", "", timeout=timeout)
+
+    async def scenario():
+        try:
+            return await orchestrator.execute_tool(tool, {"i": 1})
+        finally:
+            orchestrator.job_tracker.stop()
+
+    assert asyncio.run(scenario()) == {"echo": {"i": 1}}
+    assert bodies[0].spec.active_deadline_seconds == deadline
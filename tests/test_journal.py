@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import pytest
+
+from src.monitoring.journal import RunJournal, note_llm_call, note_phase, read_journal
+
+def write(journal: RunJournal, *requests: str):
+    """Record a run per request and flush them in one write."""
+    for request in requests:
+        with journal.run(request):
+            pass
+    asyncio.run(journal.flush())
+
+def test_run_records_its_phases_calls_and_error(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"))
+
+    with pytest.raises(RuntimeError):
+        with journal.run("Echo", user="alice") as entry:
+            entry["plan"] = [{"tool_name": "echo"}]
+            note_phase("planning", 0.0, {"tools": 3, "ignored": [1]})
+            note_llm_call("model", 0.0, 10, 5, estimated=True)
+            raise RuntimeError("execution failed")
+    # Outside a run, notes go nowhere
+    note_phase("planning", 0.0)
+    asyncio.run(journal.flush())
+
+    [record] = read_journal([journal.path])
+    assert record["request"] == "Echo" and record["user"] == "alice" and record["error"] == "execution failed"
+    assert record["plan"] == [{"tool_name": "echo"}] and "_start" not in record
+    assert record["phases"][0][0] == "planning" and record["phases"][0][3] == {"tools": 3}
+    assert record["llm_calls"][0]["prompt_tokens"] == 10 and record["llm_calls"][0]["estimated"] is True
+    assert journal.stats()["written"] == 1 and journal.stats()["pending"] == 0
+
+def test_file_is_rotated_keeping_the_newest_backups(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"), max_bytes=1, backups=2)
+
+    write(journal, "first")
+    write(journal, "second")
+    write(journal, "third")
+    write(journal, "fourth")
+
+    # The oldest file is gone; backups read in rotation order, oldest first
+    paths = [f"{journal.path}.2", f"{journal.path}.1", journal.path]
+    assert [record["request"] for record in read_journal(paths)] == ["second", "third", "fourth"]
+    assert not os.path.exists(f"{journal.path}.3")
+    assert journal.stats()["rotations"] == 3
+
+def test_rotation_without_backups_starts_a_new_file(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"), max_bytes=1, backups=0)
+
+    write(journal, "first")
+    write(journal, "second")
+
+    assert [record["request"] for record in read_journal([journal.path])] == ["second"]
+    assert os.listdir(tmp_path) == ["runs.jsonl"]
+
+def test_batch_fitting_under_max_bytes_is_appended(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"), max_bytes=1024 * 1024)
+
+    write(journal, "first", "second")
+    write(journal, "third")
+
+    assert [record["request"] for record in read_journal([journal.path])] == ["first", "second", "third"]
+    assert journal.stats()["rotations"] == 0
+
+def test_runs_are_dropped_when_the_buffer_is_full(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"), max_pending=2)
+
+    for request in ("first", "second", "third"):
+        with journal.run(request):
+            pass
+    assert journal.stats()["dropped"] == 1 and journal.stats()["pending"] == 2
+    asyncio.run(journal.flush())
+    write(journal, "fourth")
+
+    assert [record["request"] for record in read_journal([journal.path])] == ["first", "second", "fourth"]
+    assert journal.stats()["recorded"] == 3 and journal.stats()["written"] == 3
+
+def test_stop_writes_what_is_buffered(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.jsonl"), flush_interval=60)
+
+    async def scenario():
+        journal.start()
+        with journal.run("Echo"):
+            pass
+        await journal.stop()
+
+    asyncio.run(scenario())
+    assert [record["request"] for record in read_journal([journal.path])] == ["Echo"]
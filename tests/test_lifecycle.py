@@ -0,0 +1,52 @@
+import asyncio
+
+from src.common.lifecycle import Readiness
+
+def flaky(failures: int):
+    """An initializer failing the first given number of calls."""
+    calls = []
+
+    async def initialize():
+        calls.append(len(calls))
+        if len(calls) <= failures:
+            raise RuntimeError(f"attempt {len(calls)} failed")
+
+    return initialize, calls
+
+async def wait_until_ready(readiness: Readiness, errors: list, timeout: float = 5.0):
+    """Wait for readiness, collecting the distinct error states seen on the way."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not readiness.ready:
+        assert asyncio.get_running_loop().time() < deadline, "not ready in time"
+        if readiness.errors and dict(readiness.errors) not in errors:
+            errors.append(dict(readiness.errors))
+        await asyncio.sleep(0.001)
+
+def test_failed_initializers_are_retried_until_ready():
+    readiness = Readiness(retry_interval=0.01)
+    secrets, secret_calls = flaky(2)
+    registry, registry_calls = flaky(0)
+    errors = []
+
+    async def scenario():
+        readiness.start({"secrets": secrets, "registry": registry})
+        await wait_until_ready(readiness, errors)
+
+    asyncio.run(scenario())
+    assert len(secret_calls) == 3 and len(registry_calls) == 1
+    assert errors[0] == {"secrets": "attempt 1 failed"}
+    assert readiness.status()["errors"] == {} and readiness.ready_after is not None
+
+def test_failed_on_ready_is_retried_and_reported():
+    readiness = Readiness(retry_interval=0.01)
+    on_ready, calls = flaky(1)
+    errors = []
+
+    async def scenario():
+        readiness.start({}, on_ready=on_ready)
+        await wait_until_ready(readiness, errors)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert errors == [{"on_ready": "attempt 1 failed"}]
+    assert readiness.status()["errors"] == {}
@@ -0,0 +1,85 @@
+import pytest
+
+from src.monitoring import monitoring
+from src.monitoring.metrics import MetricsRegistry
+from src.monitoring.monitoring import cap_attribute, phase
+
+def test_metrics_render_in_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    duration = registry.histogram("duration_seconds", "Duration", ("route",), buckets=(0.1, 1.0))
+
+    requests.inc(route='/say "hi"\n')
+    requests.inc(2, route='/say "hi"\n')
+    in_flight.inc()
+    in_flight.dec(0.5)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        duration.observe(value, route="/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/say \\"hi\\"\\n"} 3',
+        "# HELP in_flight In flight",
+        "# TYPE in_flight gauge",
+        "in_flight 0.5",
+        "# HELP duration_seconds Duration",
+        "# TYPE duration_seconds histogram",
+        # Buckets are cumulative, and a value on a bound falls in that bucket
+        'duration_seconds_bucket{route="/a",le="0.1"} 2',
+        'duration_seconds_bucket{route="/a",le="1"} 3',
+        'duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'duration_seconds_sum{route="/a"} 3.65',
+        'duration_seconds_count{route="/a"} 4'
+    ]
+
+def test_registering_a_metric_again_returns_the_existing_one():
+    registry = MetricsRegistry()
+
+    assert registry.counter("calls_total", "Calls") is registry.counter("calls_total", "Calls")
+
+def samples(name: str) -> dict:
+    """The values of a phase metric by phase name."""
+    metric = monitoring.metrics.metrics[name]
+    return {key[0]: value for key, value in metric.values.items()}
+
+def test_phase_times_successes_and_counts_errors():
+    count_before = samples("mcp_phase_duration_seconds").get("test.phase", ([0], [0.0]))[0][:]
+    errors_before = samples("mcp_phase_errors_total").get("test.phase", 0)
+
+    with phase("test.phase"):
+        assert samples("mcp_phase_in_flight")["test.phase"] == 1
+    with pytest.raises(RuntimeError):
+        with phase("test.phase"):
+            raise RuntimeError("failed")
+
+    counts, _ = samples("mcp_phase_duration_seconds")["test.phase"]
+    assert sum(counts) == sum(count_before) + 2
+    assert samples("mcp_phase_errors_total")["test.phase"] == errors_before + 1
+    assert samples("mcp_phase_in_flight")["test.phase"] == 0
+
+def test_attributes_are_not_serialized_for_unsampled_spans(monkeypatch):
+    def fail(value, max_length=0):
+        raise AssertionError("attribute serialized")
+
+    monkeypatch.setattr(monitoring, "cap_attribute", fail)
+
+    # Without a configured exporter spans are not recording
+    with phase("test.unsampled", params={"large": "x" * 10000}) as span:
+        assert not span.is_recording()
+
+def test_attribute_values_are_capped():
+    assert cap_attribute("x" * 300, max_length=256) == "x" * 256 + "...[44 more]"
+    assert cap_attribute({"a": [1, 2]}) == '{"a": [1, 2]}'
+    assert cap_attribute(1.5) == 1.5 and cap_attribute(True) is True
+
+def test_metrics_endpoint_labels_requests_by_route(client):
+    client.get("/agent/runs/not-a-run")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/agent/runs/{run_id}",status="401"' in response.text
+    assert "not-a-run" not in response.text
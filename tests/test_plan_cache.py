@@ -0,0 +1,49 @@
+import asyncio
+
+from src.ai.plan_cache import PlanCache, RedisPlanCacheBackend
+
+PLAN = [{"tool_name": "echo", "parameters": {"i": 0}, "depends_on": []}]
+
+def test_redis_backend_get_set_and_ttl(redis):
+    cache = PlanCache(backend=RedisPlanCacheBackend(redis), ttl=60)
+
+    async def scenario():
+        assert await cache.get("Echo something", "fingerprint-a") is None
+        await cache.set("Echo something", "fingerprint-a", PLAN)
+        # Bytes from Redis are decoded, and trivially different phrasings share the entry
+        assert await cache.get("Echo   something!", "fingerprint-a") == PLAN
+        assert list(redis.expires_at.values()) == [60]
+
+        redis.now = 61
+        assert await cache.get("Echo something", "fingerprint-a") is None
+
+    asyncio.run(scenario())
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_redis_backend_sub_second_ttl_still_expires(redis):
+    cache = PlanCache(backend=RedisPlanCacheBackend(redis), ttl=0.5)
+
+    asyncio.run(cache.set("Echo something", "fingerprint-a", PLAN))
+
+    assert list(redis.expires_at.values()) == [1]
+
+def test_requests_differing_in_case_do_not_share_a_plan(redis):
+    cache = PlanCache(backend=RedisPlanCacheBackend(redis), ttl=60)
+
+    async def scenario():
+        await cache.set("get order AbC12", "fingerprint-a", PLAN)
+        return await cache.get("get order abc12", "fingerprint-a"), await cache.get("get order AbC12.", "fingerprint-a")
+
+    assert asyncio.run(scenario()) == (None, PLAN)
+
+def test_catalog_change_is_a_new_key_space(redis):
+    cache = PlanCache(backend=RedisPlanCacheBackend(redis), ttl=60)
+
+    async def scenario():
+        await cache.set("Echo something", "fingerprint-a", PLAN)
+        cache.on_catalog_changed()
+        # Plans for the previous catalog stay in Redis until they expire, but are never read
+        assert await cache.get("Echo something", "fingerprint-b") is None
+        assert len(redis.strings) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+from src.ai.execution import ExecutionEngine
+from src.ai.planning import PlanningModule, PlanStreamParser
+from src.registry.registry import ToolCatalog
+
+PLAN = [
+    {"tool_name": "echo", "parameters": {"text": 'a "quoted" } brace [ \\', "nested": {"list": [1, {"x": 2}]}},
+     "depends_on": []},
+    {"tool_name": "echo", "parameters": {"text": "${steps.1.result}"}, "depends_on": [1]}
+]
+
+CATALOG = ToolCatalog(1, [{"name": name, "description": name, "parameters": {}} for name in ("echo", "search")])
+
+def by_catalog(replies: dict):
+    """Answer with the reply of the first tool named in the prompt's catalog."""
+    def reply(prompt: str) -> str:
+        for tool_name, text in replies.items():
+            if f"Tool: {tool_name}\n" in prompt:
+                return text
+        raise AssertionError("no reply for the prompt")
+
+    return reply
+
+class StubSelector:
+    """Selects only the echo tool, whatever the request."""
+
+    def select(self, user_request: str, catalog: ToolCatalog) -> ToolCatalog:
+        return ToolCatalog(catalog.version, [tool for tool in catalog.tools if tool["name"] == "echo"])
+
+def test_parser_returns_each_step_whatever_the_chunk_boundaries():
+    text = json.dumps(PLAN, indent=2)
+
+    for size in range(1, len(text) + 1):
+        parser = PlanStreamParser()
+        steps = []
+        for position in range(0, len(text), size):
+            steps.extend(parser.feed(text[position:position + size]))
+        assert steps == PLAN, f"chunks of {size}"
+
+def test_parser_returns_a_step_once_its_closing_brace_arrives():
+    parser = PlanStreamParser()
+    text = json.dumps(PLAN)
+    first_end = len(json.dumps(PLAN[0])) + 1
+
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [PLAN[0]]
+    assert parser.feed(text[first_end:]) == [PLAN[1]]
+
+@pytest.mark.parametrize("plan", [
+    [["echo"]], ["echo"], [{"parameters": {}}], {"tool_name": "echo", "parameters": {}}
+], ids=["list", "string", "no-tool-name", "object"])
+def test_malformed_plan_falls_back_to_the_full_catalog(plan, stub_llm):
+    fallback = [{"tool_name": "search", "parameters": {}}]
+    llm = stub_llm(by_catalog({"search": json.dumps(fallback), "echo": json.dumps(plan)}))
+    planning = PlanningModule("", "", llm=llm, tool_selector=StubSelector())
+
+    assert asyncio.run(planning.create_plan("Find", CATALOG)) == fallback
+
+def test_rejected_stream_is_closed_before_the_restart(stub_llm):
+    plan = [{"tool_name": "echo", "parameters": {}}, {"tool_name": "search", "parameters": {}}]
+    llm = stub_llm(by_catalog({"search": json.dumps(plan), "echo": json.dumps(plan)}))
+    planning = PlanningModule("", "", llm=llm, tool_selector=StubSelector())
+
+    async def scenario():
+        events = []
+        async for event in planning.stream_plan("Echo then search", CATALOG):
+            events.append((event["type"], llm.open_streams))
+        return events
+
+    assert asyncio.run(scenario()) == [
+        ("step", 1), ("restart", 0), ("step", 1), ("step", 1), ("plan", 0)
+    ]
+
+def test_steps_of_a_rejected_plan_are_cancelled(gateway, monkeypatch, stub_llm):
+    plan = [{"tool_name": "echo", "parameters": {"i": 1}}, {"tool_name": "search", "parameters": {"i": 2}}]
+    llm = stub_llm(by_catalog({"search": json.dumps(plan), "echo": json.dumps(plan)}))
+    execution = ExecutionEngine("http://controller", "token")
+    started = []
+
+    async def hang(tool_name, parameters):
+        started.append(parameters["i"])
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(execution, "_call_mcp_controller", hang)
+    monkeypatch.setattr(gateway, "planning", PlanningModule("", "", llm=llm, tool_selector=StubSelector()))
+    monkeypatch.setattr(gateway, "execution", execution)
+    monkeypatch.setattr(gateway, "SPECULATIVE_EXECUTION", True)
+
+    async def scenario():
+        original_start_plan = execution.start_plan
+        runs = []
+
+        def start_plan(steps=()):
+            runs.append(original_start_plan(steps))
+            return runs[-1]
+
+        monkeypatch.setattr(execution, "start_plan", start_plan)
+        created, run = await gateway._create_plan("Echo then search", CATALOG)
+        await asyncio.sleep(0)
+        rejected = [task.cancelled() for task in runs[0].tasks]
+        run.cancel()
+        return created, rejected
+
+    created, rejected = asyncio.run(scenario())
+    assert created == plan
+    # The first echo step started speculatively, then was cancelled with its plan
+    assert started[0] == 1 and rejected == [True]
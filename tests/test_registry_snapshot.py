@@ -0,0 +1,98 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from src.registry.registry import Tool, ToolRegistry
+from src.registry.snapshot import CatalogSnapshot, SharedCatalog
+from src.registry.storage import LocalRegistryStorage
+
+def make_tool(number: int) -> Tool:
+    return Tool(f"tool_{number}", f"Tool {number}", {"type": "object"}, {}, "", "http://tool",
+                timeout=10 + number if number % 2 else None)
+
+def test_follower_builds_the_catalog_without_decoding_tools(tmp_path):
+    storage = LocalRegistryStorage(str(tmp_path / "registry"))
+    snapshot_path = str(tmp_path / "catalog.snapshot")
+    publisher = ToolRegistry(storage, snapshot_path=snapshot_path, snapshot_wait=0)
+    for number in range(5):
+        asyncio.run(publisher.register_tool(make_tool(number)))
+    publisher.refresh()
+
+    follower = ToolRegistry(storage, snapshot_path=snapshot_path, snapshot_wait=1)
+
+    assert isinstance(follower.tools, CatalogSnapshot)
+    catalog = follower.catalog()
+    assert catalog.fingerprint == publisher.catalog().fingerprint
+    assert catalog.timeouts == {"tool_1": 11, "tool_3": 13}
+    assert follower.list_tools() == publisher.list_tools()
+    assert follower.tools._decoded == {}
+
+    assert follower.get_tool("tool_3").timeout == 13
+    assert list(follower.tools._decoded) == ["tool_3"]
+    assert follower.storage_syncs == 0 and os.path.exists(snapshot_path)
+
+# Publishes the catalog of the registry directory, then holds the lock until its stdin is closed
+PUBLISH = """
+import sys
+from src.registry.registry import ToolRegistry
+from src.registry.storage import LocalRegistryStorage
+registry = ToolRegistry(LocalRegistryStorage(sys.argv[1]), snapshot_path=sys.argv[2], snapshot_wait=0)
+assert registry.stats()["snapshot"]["publisher"]
+print("published", flush=True)
+sys.stdin.read()
+"""
+
+def start_publisher(registry_dir: str, snapshot_path: str) -> subprocess.Popen:
+    """A publishing process in its own right, as processes of one host do not share a lock."""
+    process = subprocess.Popen([sys.executable, "-c", PUBLISH, registry_dir, snapshot_path],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert process.stdout.readline() == b"published\n"
+    return process
+
+def stop_publisher(process: subprocess.Popen):
+    process.stdin.close()
+    assert process.wait(timeout=10) == 0
+
+def test_follower_takes_over_when_the_publisher_exits(tmp_path):
+    storage = LocalRegistryStorage(str(tmp_path / "registry"))
+    snapshot_path = str(tmp_path / "catalog.snapshot")
+    asyncio.run(ToolRegistry(storage, lazy=True).register_tool(make_tool(1)))
+    publisher = start_publisher(str(tmp_path / "registry"), snapshot_path)
+    try:
+        follower = ToolRegistry(storage, snapshot_path=snapshot_path, snapshot_wait=1)
+        assert isinstance(follower.tools, CatalogSnapshot) and follower.storage_syncs == 0
+        assert not follower.refresh() and follower.storage_syncs == 0
+    finally:
+        stop_publisher(publisher)
+
+    asyncio.run(ToolRegistry(storage, lazy=True).register_tool(make_tool(2)))
+    # Nobody holds the lock any more, so the next refresh reads storage and publishes
+    assert follower.refresh()
+    assert sorted(follower.tools) == ["tool_1", "tool_2"]
+    assert follower.stats()["snapshot"]["publisher"] and follower.snapshot_publishes == 1
+
+    other = ToolRegistry(storage, snapshot_path=snapshot_path, snapshot_wait=1)
+    assert sorted(other.tools) == ["tool_1", "tool_2"] and not other.stats()["snapshot"]["publisher"]
+
+def test_snapshot_older_than_the_lock_stamp_is_ignored(tmp_path):
+    storage = LocalRegistryStorage(str(tmp_path / "registry"))
+    snapshot_path = str(tmp_path / "catalog.snapshot")
+    asyncio.run(ToolRegistry(storage, lazy=True).register_tool(make_tool(1)))
+    stop_publisher(start_publisher(str(tmp_path / "registry"), snapshot_path))
+    shared = SharedCatalog(snapshot_path)
+    # Timestamps well in the past, so the new stamp is later whatever the file system's resolution
+    past = time.time() - 60
+    os.utime(shared.lock_path, (past, past))
+    os.utime(snapshot_path, (past + 1, past + 1))
+    assert shared.current() is not None
+
+    assert shared.try_lead()
+    # Left by the previous publisher, and possibly older than storage
+    assert shared.current() is None
+
+    shared.publish({"tool_1": make_tool(1).to_dict()}, {"tool_1": "revision"})
+    assert shared.current() is not None
+    assert shared.load(Tool.from_dict)["tool_1"].timeout == 11
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from src.registry.registry import Tool, ToolRegistry
+from src.registry.storage import (
+    INDEX_BLOB, BlobConflictError, BlobNotFoundError, LocalRegistryStorage, tool_blob_name
+)
+
+class RecordingStorage(LocalRegistryStorage):
+    """Local storage recording the blobs read, optionally running a hook right after an index read."""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.reads = []
+        self.after_index_read = None
+
+    def get(self, name, if_none_match=None):
+        response = super().get(name, if_none_match)
+        self.reads.append(name)
+        hook, self.after_index_read = (self.after_index_read, None) if name == INDEX_BLOB else (None, None)
+        if hook is not None:
+            hook()
+        return response
+
+def make_tool(name: str) -> Tool:
+    return Tool(name, f"The {name} tool", {"type": "object"}, {}, "", f"http://{name}")
+
+def test_local_storage_conditional_reads_and_writes(tmp_path):
+    storage = LocalRegistryStorage(str(tmp_path))
+
+    with pytest.raises(BlobNotFoundError):
+        storage.get("tools/missing.json")
+
+    etag = storage.create("index.json", b"{}")
+    assert storage.get("index.json") == (b"{}", etag)
+    assert storage.get("index.json", if_none_match=etag) is None
+    with pytest.raises(BlobConflictError):
+        storage.create("index.json", b"{}")
+
+    new_etag = storage.put("index.json", b'{"tools": {}}', if_match=etag)
+    assert new_etag != etag
+    with pytest.raises(BlobConflictError):
+        # Written concurrently since the etag was read
+        storage.put("index.json", b"{}", if_match=etag)
+    assert storage.get("index.json", if_none_match=etag) == (b'{"tools": {}}', new_etag)
+    assert list(tmp_path.glob("*.tmp")) == []
+
+def test_refresh_downloads_only_changed_tools(tmp_path):
+    storage = RecordingStorage(str(tmp_path))
+    writer = ToolRegistry(storage, lazy=True)
+    asyncio.run(writer.register_tool(make_tool("first")))
+    reader = ToolRegistry(storage, lazy=True)
+
+    storage.reads.clear()
+    assert reader.refresh()
+    assert storage.reads == [INDEX_BLOB, tool_blob_name("first")]
+
+    storage.reads.clear()
+    # The index is unchanged, so only the conditional read of it is made
+    assert not reader.refresh()
+    assert storage.reads == [INDEX_BLOB]
+
+    asyncio.run(writer.register_tool(make_tool("second")))
+    storage.reads.clear()
+    assert reader.refresh()
+    assert storage.reads == [INDEX_BLOB, tool_blob_name("second")]
+    assert sorted(reader.tools) == ["first", "second"]
+
+def test_refresh_that_read_an_older_index_keeps_a_registered_tool(tmp_path):
+    storage = RecordingStorage(str(tmp_path))
+    registry = ToolRegistry(storage, lazy=True)
+    asyncio.run(registry.register_tool(make_tool("first")))
+    other = ToolRegistry(storage, lazy=True)
+    asyncio.run(other.register_tool(make_tool("other")))
+
+    # The tool is registered while the refresh is between reading the index and swapping in its tools
+    storage.after_index_read = lambda: asyncio.run(registry.register_tool(make_tool("second")))
+    assert not registry.refresh()
+    assert sorted(registry.tools) == ["first", "second"]
+
+    assert registry.refresh()
+    assert sorted(registry.tools) == ["first", "other", "second"]
+
+def test_registering_does_not_block_the_event_loop(tmp_path):
+    storage = RecordingStorage(str(tmp_path))
+    registry = ToolRegistry(storage, lazy=True)
+    put = storage.put
+
+    def slow_put(name, data, if_match=None):
+        # Storage clients block; the event loop keeps running meanwhile
+        time.sleep(0.2)
+        return put(name, data, if_match)
+
+    storage.put = slow_put
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        assert await registry.register_tool(make_tool("slow"))
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 5
+    assert registry.get_tool("slow").endpoint == "http://slow"
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from src.orchestrator.result_cache import ToolResultCache
+
+class CountingTool:
+    """A tool execution that counts its calls and finishes when released."""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {"items": [self.calls]}
+
+def test_identical_calls_share_one_execution():
+    cache = ToolResultCache()
+
+    async def scenario():
+        tool = CountingTool()
+        calls = [asyncio.ensure_future(cache.get_or_execute("tool", {"q": 1}, 60, tool)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tool.release.set()
+        results = await asyncio.gather(*calls)
+        return tool.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1 and results == [{"items": [1]}] * 3
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 2
+
+def test_execution_is_cancelled_when_its_last_caller_leaves():
+    cache = ToolResultCache()
+
+    async def scenario():
+        tool = CountingTool()
+        calls = [asyncio.ensure_future(cache.get_or_execute("tool", {}, 60, tool)) for _ in range(2)]
+        await asyncio.sleep(0)
+        calls[0].cancel()
+        await asyncio.sleep(0)
+        # Still running for the other caller
+        assert tool.cancelled == 0
+        calls[1].cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        await asyncio.sleep(0)
+        return tool.cancelled
+
+    assert asyncio.run(scenario()) == 1
+    assert cache.stats()["in_flight"] == 0 and cache.stats()["entries"] == 0
+    assert cache.stats()["abandoned"] == 1
+
+def test_callers_cannot_change_the_cached_result():
+    cache = ToolResultCache()
+
+    async def scenario():
+        tool = CountingTool()
+        tool.release.set()
+        first = await cache.get_or_execute("tool", {}, 60, tool)
+        first["items"].append("changed")
+        second = await cache.get_or_execute("tool", {}, 60, tool)
+        second["items"].append("changed")
+        return await cache.get_or_execute("tool", {}, 60, tool)
+
+    assert asyncio.run(scenario()) == {"items": [1]}
+    assert cache.stats()["hits"] == 2
+
+def test_expired_result_is_executed_again(monkeypatch):
+    cache = ToolResultCache()
+    now = [100.0]
+    monkeypatch.setattr("src.orchestrator.result_cache.time.monotonic", lambda: now[0])
+
+    async def scenario():
+        tool = CountingTool()
+        tool.release.set()
+        await cache.get_or_execute("tool", {}, 10, tool)
+        now[0] += 9
+        await cache.get_or_execute("tool", {}, 10, tool)
+        now[0] += 2
+        return await cache.get_or_execute("tool", {}, 10, tool)
+
+    assert asyncio.run(scenario()) == {"items": [2]}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_failures_are_not_cached():
+    cache = ToolResultCache()
+
+    async def scenario():
+        tool = CountingTool(error=RuntimeError("tool failed"))
+        tool.release.set()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_execute("tool", {}, 60, tool)
+        tool.error = None
+        return await cache.get_or_execute("tool", {}, 60, tool)
+
+    assert asyncio.run(scenario()) == {"items": [2]}
+    assert cache.stats()["entries"] == 1
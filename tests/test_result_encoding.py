@@ -0,0 +1,51 @@
+import json
+
+from src.ai.result_encoding import ResultEncoder
+
+PLAN = [
+    {"tool_name": "search", "parameters": {"query": "weather"}, "depends_on": []},
+    {"tool_name": "summarize", "parameters": {"text": "${steps.1.result}"}, "depends_on": [1]},
+    {"tool_name": "send_email", "parameters": {}, "depends_on": [2]}
+]
+
+def test_steps_merge_plan_and_results():
+    results = [{"result": {"status": "success", "result": {"hits": 2}}}, {"error": "timed out"}]
+
+    steps = json.loads(ResultEncoder().encode_run(PLAN, results))
+
+    assert steps == [
+        {"step": 1, "tool": "search", "parameters": {"query": "weather"}, "depends_on": [], "status": "ok",
+         "result": {"hits": 2}},
+        {"step": 2, "tool": "summarize", "parameters": {"text": "${steps.1.result}"}, "depends_on": [1],
+         "status": "error", "error": "timed out"},
+        {"step": 3, "tool": "send_email", "parameters": {}, "depends_on": [2], "status": "not run"}
+    ]
+
+def test_long_values_are_cut_with_markers():
+    encoder = ResultEncoder(max_string=5, max_items=2, max_depth=2)
+
+    assert encoder.encode_value("abcdefgh", 5, 2) == "abcde...[3 more chars]"
+    assert encoder.encode_value([1, 2, 3, 4], 5, 2) == [1, 2, "[2 more items]"]
+    assert encoder.encode_value({"a": 1, "b": 2, "c": 3}, 5, 2) == {"a": 1, "b": 2, "...": "[1 more keys]"}
+    assert encoder.encode_value({"a": {"b": {"c": 1}}}, 5, 2) == {"a": {"b": "[dict nested too deep, omitted]"}}
+
+def test_limits_are_halved_until_the_run_fits():
+    results = [{"result": {"items": ["x" * 400] * 20}}]
+    encoder = ResultEncoder(max_total_chars=2000)
+
+    encoded = encoder.encode_run(PLAN[:1], results)
+    items = json.loads(encoded)[0]["result"]["items"]
+
+    # 500 chars and 20 items, then 250 and 10, then 125 and 5 fit
+    assert len(encoded) <= 2000
+    assert items[:5] == ["x" * 125 + "...[275 more chars]"] * 5 and items[5] == "[15 more items]"
+
+def test_run_is_cut_when_the_tightest_limits_do_not_fit():
+    plan = [{"tool_name": f"tool_{index}", "parameters": {}} for index in range(100)]
+    encoder = ResultEncoder(max_total_chars=500)
+
+    encoded = encoder.encode_run(plan, [])
+
+    assert encoded.startswith('[{"step":1,"tool":"tool_0"')
+    assert len(encoded) < 530 and encoded.endswith("more chars]")
+    assert encoded[:500] == encoder._encode_steps(plan, [], encoder.min_string, encoder.min_items)[:500]
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+
+from src.api.run_queue import QUEUED, RUNNING, SUCCEEDED, RedisRunQueueBackend, RunQueue
+
+async def echo(record, emit):
+    return record["request"]
+
+async def abandon_run(backend: RedisRunQueueBackend, status: str) -> str:
+    """Submit a run and pop it as a replica that then stops, leaving the run claimed and unacknowledged."""
+    record = await RunQueue(backend).submit({"request": "abandoned"})
+    run_id = await backend.pop(timeout=1)
+    record.update(status=status)
+    await backend.save(record)
+    await backend.client.hset(backend.claims_key, run_id, time.time() - 2 * backend.claim_timeout)
+    return run_id
+
+async def wait_for_status(queue: RunQueue, run_id: str, status: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while (await queue.get(run_id))["status"] != status:
+        assert time.monotonic() < deadline, f"run did not reach {status}"
+        await asyncio.sleep(0.01)
+
+def test_run_abandoned_by_stopped_replica_is_requeued_and_processed(redis):
+    backend = RedisRunQueueBackend(redis, claim_timeout=1.0)
+
+    async def scenario():
+        run_id = await abandon_run(backend, RUNNING)
+        queue = RunQueue(backend, workers=1, poll_timeout=0.1)
+        queue.start(echo)
+        try:
+            await wait_for_status(queue, run_id, SUCCEEDED)
+        finally:
+            await queue.stop()
+        return run_id
+
+    run_id = asyncio.run(scenario())
+    assert json.loads(backend.client.strings[backend._run_key(run_id)])["result"] == {"request": "abandoned"}
+    assert backend.client.lists[backend.processing_key] == []
+    assert backend.client.hashes[backend.claims_key] == {}
+
+def test_finished_but_unacknowledged_run_is_dropped_not_requeued(redis):
+    backend = RedisRunQueueBackend(redis, claim_timeout=1.0)
+
+    async def scenario():
+        await abandon_run(backend, SUCCEEDED)
+        return await backend.requeue_stale()
+
+    assert asyncio.run(scenario()) == 0
+    assert backend.client.lists[backend.processing_key] == []
+    assert backend.client.lists[backend.queue_key] == []
+
+def test_renewed_claim_is_not_requeued(redis):
+    backend = RedisRunQueueBackend(redis, claim_timeout=1.0)
+
+    async def scenario():
+        run_id = await abandon_run(backend, RUNNING)
+        await backend.touch(run_id)
+        requeued = await backend.requeue_stale()
+        return requeued, (await backend.load(run_id))["status"]
+
+    assert asyncio.run(scenario()) == (0, RUNNING)
+    assert len(backend.client.lists[backend.processing_key]) == 1
+
+def test_unclaimed_processing_entry_gets_a_claim_first(redis):
+    backend = RedisRunQueueBackend(redis, claim_timeout=1.0)
+
+    async def scenario():
+        run_id = await abandon_run(backend, QUEUED)
+        # The replica stopped between moving the run and claiming it
+        await backend.client.hdel(backend.claims_key, run_id)
+        first = await backend.requeue_stale()
+        await backend.client.hset(backend.claims_key, run_id, time.time() - 2 * backend.claim_timeout)
+        return first, await backend.requeue_stale()
+
+    assert asyncio.run(scenario()) == (0, 1)
+    assert len(backend.client.lists[backend.queue_key]) == 1
+
+def test_run_interrupted_by_shutdown_is_requeued_and_continues_its_events(redis):
+    backend = RedisRunQueueBackend(redis, claim_timeout=1.0)
+    started = []
+
+    async def slow(record, emit):
+        await emit("step", {"attempt": len(started)})
+        started.append(record["run_id"])
+        if len(started) == 1:
+            await asyncio.sleep(60)
+        return record["request"]
+
+    async def scenario():
+        first = RunQueue(backend, workers=1, poll_timeout=0.1)
+        first.start(slow)
+        run_id = (await first.submit({"request": "interrupted"}))["run_id"]
+        while not started:
+            await asyncio.sleep(0.01)
+        await first.stop()
+        interrupted = await backend.load(run_id)
+
+        second = RunQueue(backend, workers=1, poll_timeout=0.1)
+        second.start(slow)
+        try:
+            await wait_for_status(second, run_id, SUCCEEDED)
+        finally:
+            await second.stop()
+        return interrupted, [event async for event in backend.subscribe(run_id)]
+
+    interrupted, events = asyncio.run(scenario())
+    assert interrupted["status"] == QUEUED
+    assert [event["event"] for event in events] == ["step", "requeued", "step", "done"]
+    assert [event["seq"] for event in events] == [1, 2, 3, 4]
+    assert backend.client.lists[backend.processing_key] == []
+
+def test_subscribe_skips_repeated_sequence_numbers(redis):
+    backend = RedisRunQueueBackend(redis)
+
+    async def scenario():
+        # A replica that stopped before saving its record emitted seq 2 again
+        for seq, event in [(1, "step"), (2, "step"), (2, "step"), (3, "done")]:
+            await backend.append_event("run", {"seq": seq, "event": event, "data": {}})
+        return [event["seq"] async for event in backend.subscribe("run")]
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from src.ai.planning import PlanningModule
+from src.registry.registry import Tool, ToolCatalog, ToolRegistry
+from src.registry.storage import LocalRegistryStorage
+
+TOOLS = [
+    {"name": "echo", "description": "Echo the parameters", "parameters": {"text": "string"}, "returns": {}},
+    {"name": "search", "description": "Search documents", "parameters": {}, "returns": {}}
+]
+
+def test_catalog_views():
+    catalog = ToolCatalog(3, TOOLS, timeouts={"search": 30})
+
+    assert catalog.names == frozenset({"echo", "search"}) and isinstance(catalog.names, frozenset)
+    assert "echo" in catalog and "missing" not in catalog and len(catalog) == 2
+    assert catalog.prompt_fragments["echo"] == (
+        'Tool: echo\nDescription: Echo the parameters\nParameters: {"text": "string"}\n'
+    )
+    assert catalog.prompt == "\n".join(catalog.prompt_fragments.values())
+    # Timeouts do not change the catalog the planner sees
+    assert catalog.fingerprint == ToolCatalog(4, TOOLS).fingerprint
+    assert catalog.fingerprint != ToolCatalog(3, TOOLS[:1]).fingerprint
+
+def test_registry_catalog_is_rebuilt_only_when_the_catalog_changes(tmp_path):
+    registry = ToolRegistry(LocalRegistryStorage(str(tmp_path)), lazy=True)
+    changes = []
+    registry.add_listener(lambda: changes.append(registry.version))
+
+    first = registry.catalog()
+    assert registry.catalog() is first and len(first) == 0
+
+    tool = Tool("slow", "A slow tool", {}, {}, "", "http://slow", timeout=120)
+    assert asyncio.run(registry.register_tool(tool))
+    second = registry.catalog()
+    assert second is not first and second.version == first.version + 1 == changes[-1]
+    assert second.names == {"slow"} and second.timeouts == {"slow": 120}
+    assert registry.list_tools() == [{"name": "slow", "description": "A slow tool", "parameters": {}, "returns": {}}]
+    assert registry.fingerprint() == second.fingerprint
+
+    assert not asyncio.run(registry.register_tool(tool))
+    assert registry.catalog() is second
+
+@pytest.mark.parametrize("plan, valid", [
+    ([{"tool_name": "echo", "parameters": {}}, {"tool_name": "search", "parameters": {}}], True),
+    ([{"tool_name": "echo", "parameters": {}}, {"tool_name": "Echo", "parameters": {}}], False),
+    ([{"tool_name": "delete_everything", "parameters": {}}], False)
+], ids=["known", "wrong-case", "unknown"])
+def test_plan_is_validated_against_the_catalog_names(plan, valid):
+    planning = PlanningModule("", "", llm=object())
+
+    if valid:
+        planning._validate_plan(plan, ToolCatalog(1, TOOLS))
+    else:
+        with pytest.raises(ValueError, match="is not available"):
+            planning._validate_plan(plan, ToolCatalog(1, TOOLS))
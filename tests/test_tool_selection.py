@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from src.ai.planning import PlanningModule
+from src.ai.tool_selection import ToolIndex, ToolSelector, estimate_tokens, tokenize
+from src.registry.registry import ToolCatalog
+
+def make_catalog(extra: int = 40) -> ToolCatalog:
+    tools = [
+        {"name": "send_email", "description": "Send a message to a recipient", "returns": {},
+         "parameters": {"properties": {"recipient": {"description": "Email address"}}}},
+        {"name": "get_weather", "description": "Current conditions for a city", "returns": {},
+         "parameters": {"properties": {"city": {"description": "City name"}}}},
+        {"name": "lookupOrder", "description": "Find an order by its identifier", "returns": {}, "parameters": {}}
+    ]
+    tools += [{"name": f"filler_{number}", "description": f"Unrelated tool number {number}", "returns": {},
+               "parameters": {}} for number in range(extra)]
+    return ToolCatalog(1, tools)
+
+def names(catalog: ToolCatalog) -> list:
+    return [tool["name"] for tool in catalog.tools]
+
+def test_tokenize_splits_identifiers_and_folds_plurals():
+    assert tokenize("Please lookupOrder for the send_email Orders, class") == [
+        "lookup", "order", "send", "email", "order", "class"
+    ]
+
+def test_name_matches_rank_above_description_matches():
+    catalog = ToolCatalog(1, [
+        {"name": "archive", "description": "Store weather reports", "parameters": {}},
+        {"name": "weather", "description": "Current conditions", "parameters": {}}
+    ])
+
+    matches = ToolIndex(catalog).search("weather", limit=5)
+
+    assert [doc for _, doc in matches] == [1, 0]
+    assert ToolIndex(catalog).search("nothing relevant", limit=5) == []
+
+def test_selection_keeps_the_relevant_tools():
+    selector = ToolSelector(top_k=2)
+    catalog = make_catalog()
+
+    selected = selector.select("What is the weather in the city of Oslo?", catalog)
+
+    assert names(selected)[0] == "get_weather" and len(selected) <= 2
+    # Parameter names and descriptions are indexed too
+    assert names(selector.select("Write to this recipient", catalog))[0] == "send_email"
+
+def test_selection_falls_back_to_the_full_catalog():
+    selector = ToolSelector(min_catalog_size=30)
+
+    # Small catalogs are sent whole, and so are requests matching no tool
+    assert selector.select("weather", make_catalog(extra=10)) is None
+    assert selector.select("xyzzy", make_catalog()) is None
+
+def test_token_budget_limits_the_selection_but_keeps_the_best_tool():
+    catalog = make_catalog()
+    ranked = [catalog.tools[doc]["name"] for _, doc in ToolIndex(catalog).search("tool number", limit=40)]
+    costs = [estimate_tokens(catalog.prompt_fragments[name]) for name in ranked]
+
+    assert names(ToolSelector(top_k=40, token_budget=sum(costs[:3])).select("tool number", catalog)) == ranked[:3]
+    assert names(ToolSelector(top_k=40, token_budget=1).select("tool number", catalog)) == ranked[:1]
+    assert names(ToolSelector(top_k=5).select("tool number", catalog)) == ranked[:5]
+
+def test_index_is_rebuilt_only_for_a_new_catalog():
+    selector = ToolSelector()
+    catalog = make_catalog()
+
+    index = selector.index(catalog)
+    assert selector.index(make_catalog()) is index
+    assert selector.index(make_catalog(extra=41)) is not index
+
+def test_plan_needing_an_unselected_tool_is_generated_again_with_all_tools(stub_llm):
+    catalog = make_catalog()
+    prompts = []
+
+    def reply(prompt: str) -> str:
+        prompts.append(prompt)
+        # The request needs a tool that selection leaves out
+        return json.dumps([{"tool_name": "send_email", "parameters": {"recipient": "a@example.com"}}])
+
+    planning = PlanningModule("", "", llm=stub_llm(reply), tool_selector=ToolSelector(top_k=3))
+    plan = asyncio.run(planning.create_plan("Report the weather in Oslo", catalog))
+
+    assert plan[0]["tool_name"] == "send_email"
+    assert "Tool: send_email" not in prompts[0] and "Tool: send_email" in prompts[1]
+    assert "Tool: filler_0" in prompts[1]
@@ -0,0 +1,160 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from kubernetes.client.rest import ApiException
+
+from benchmarks.fakes import FakeKubernetes
+from src.orchestrator.job_tracker import JobTracker
+from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.worker_pool import (
+    KubernetesWorkerBackend, SubprocessWorkerBackend, ToolExecutionError, WarmPoolManager, Worker,
+    WorkerCallError, WorkerError, WorkerPool
+)
+from src.registry.registry import Tool
+
+TOOL = Tool("tool", "A tool", {}, {}, "tool:latest", "", warm_pool={"max_workers": 1})
+
+class StubCoreApi:
+    def __init__(self, create_error: Exception = None):
+        self.create_error = create_error
+        self.deleted = []
+
+    def create_namespaced_pod(self, namespace: str, body):
+        if self.create_error is not None:
+            raise self.create_error
+
+    def read_namespaced_pod_status(self, name: str, namespace: str):
+        condition = SimpleNamespace(type="Ready", status="True")
+        return SimpleNamespace(status=SimpleNamespace(phase="Running", pod_ip="10.0.0.1", conditions=[condition]))
+
+    def delete_namespaced_pod(self, name: str, namespace: str):
+        self.deleted.append(name)
+
+class StubHTTPClient:
+    """Answers every POST with the response, or raises the error."""
+
+    def __init__(self, response: httpx.Response = None, error: Exception = None):
+        self.response = response
+        self.error = error
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+def response(status_code: int, content: bytes) -> httpx.Response:
+    return httpx.Response(status_code, content=content, request=httpx.Request("POST", "http://10.0.0.1/invoke"))
+
+def call(http_client: StubHTTPClient):
+    backend = KubernetesWorkerBackend(StubCoreApi(), http_client)
+    return asyncio.run(backend.call(Worker("tool-worker", "http://10.0.0.1:8080"), {}, timeout=1.0))
+
+def test_api_error_starting_a_worker_is_a_worker_error():
+    backend = KubernetesWorkerBackend(StubCoreApi(create_error=ApiException(status=403)), StubHTTPClient())
+
+    with pytest.raises(WorkerError):
+        asyncio.run(WorkerPool(TOOL, backend).execute({}, timeout=1.0))
+
+def test_unreachable_worker_is_a_worker_error():
+    with pytest.raises(WorkerError):
+        call(StubHTTPClient(error=httpx.ConnectError("connection refused")))
+
+@pytest.mark.parametrize("http_client", [
+    StubHTTPClient(error=httpx.ReadTimeout("timed out")),
+    StubHTTPClient(error=httpx.RemoteProtocolError("connection closed")),
+    StubHTTPClient(response=response(200, b"<html>not json</html>"))
+], ids=["timeout", "dropped", "invalid-json"])
+def test_failures_after_dispatch_are_worker_call_errors(http_client):
+    with pytest.raises(WorkerCallError):
+        call(http_client)
+
+def test_tool_errors_still_propagate():
+    with pytest.raises(ToolExecutionError):
+        call(StubHTTPClient(response=response(500, b"tool failed")))
+    with pytest.raises(httpx.HTTPStatusError):
+        call(StubHTTPClient(response=response(400, b"bad parameters")))
+
+def test_worker_sending_invalid_json_is_discarded():
+    core_api = StubCoreApi()
+    pool = WorkerPool(TOOL, KubernetesWorkerBackend(core_api, StubHTTPClient(response=response(200, b"{"))))
+
+    with pytest.raises(WorkerCallError):
+        asyncio.run(pool.execute({}, timeout=1.0))
+
+    assert pool.size == 0 and len(core_api.deleted) == 1
+
+def make_orchestrator(command: list) -> tuple:
+    """An orchestrator with subprocess warm workers and a fake Kubernetes API for its jobs."""
+    kubernetes = FakeKubernetes(latency=0.0)
+    orchestrator = Orchestrator(worker_pools=WarmPoolManager(SubprocessWorkerBackend(command)), lazy=True)
+    orchestrator.k8s_api = kubernetes
+    orchestrator.k8s_batch_api = kubernetes
+    orchestrator.job_tracker = JobTracker(kubernetes, kubernetes, watch_factory=kubernetes.watch)
+    return orchestrator, kubernetes
+
+def run_warm_tool(orchestrator: Orchestrator, tool: Tool):
+    async def scenario():
+        try:
+            return await orchestrator.execute_tool(tool, {"i": 1})
+        finally:
+            orchestrator.job_tracker.stop()
+            await orchestrator.worker_pools.close()
+
+    return asyncio.run(scenario())
+
+def test_hanging_worker_does_not_fall_back_to_a_job():
+    orchestrator, kubernetes = make_orchestrator([sys.executable, "-c", "import time; time.sleep(60)"])
+    tool = Tool("hang", "Hangs", {}, {}, "hang:latest", "", timeout=0.3, warm_pool={"max_workers": 1})
+
+    with pytest.raises(WorkerCallError):
+        run_warm_tool(orchestrator, tool)
+
+    assert kubernetes.created == 0
+
+def test_worker_that_cannot_start_falls_back_to_a_job():
+    orchestrator, kubernetes = make_orchestrator(["/nonexistent/worker"])
+    tool = Tool("echo", "Echoes", {}, {}, "echo:latest", "", timeout=5, warm_pool={"max_workers": 1})
+
+    assert run_warm_tool(orchestrator, tool) == {"echo": {"i": 1}}
+    assert kubernetes.created == 1
+
+class StubBackend:
+    """Starts numbered workers and records the ones stopped."""
+
+    def __init__(self):
+        self.started = 0
+        self.stopped = []
+
+    async def start_worker(self, tool: Tool) -> Worker:
+        self.started += 1
+        return Worker(f"{tool.container_image}-{self.started}", "")
+
+    async def stop_worker(self, worker: Worker):
+        self.stopped.append(worker.worker_id)
+
+def test_pool_is_replaced_and_drained_when_its_settings_change():
+    backend = StubBackend()
+    pools = WarmPoolManager(backend)
+    tool = Tool("tool", "A tool", {}, {}, "tool:1", "", warm_pool={"max_workers": 2})
+
+    async def scenario():
+        pool = pools.get_pool(tool)
+        idle, busy = await pool.acquire(), await pool.acquire()
+        await pool.release(idle)
+        assert pools.get_pool(Tool("tool", "A tool", {}, {}, "tool:1", "", warm_pool={"max_workers": 2})) is pool
+
+        updated = pools.get_pool(Tool("tool", "A tool", {}, {}, "tool:2", "", warm_pool={"max_workers": 2}))
+        await asyncio.sleep(0)
+        assert updated is not pool and backend.stopped == [idle.worker_id]
+        # The call on the old image finishes, then its worker is stopped rather than reused
+        await pool.release(busy)
+        resized = pools.get_pool(Tool("tool", "A tool", {}, {}, "tool:2", "", warm_pool={"max_workers": 3}))
+        await pools.close()
+        return pool, updated, resized
+
+    pool, updated, resized = asyncio.run(scenario())
+    assert backend.stopped == ["tool:1-1", "tool:1-2"]
+    assert pool.size == 0 and resized is not updated and resized.max_workers == 3